@@ -1,15 +1,26 @@
-from flask import Flask, request, jsonify
-from main import TouristAttractionRecommender
+from flask import Flask, Response, g, request, jsonify
+from flask.json import JSONEncoder
+from main import TouristAttractionRecommender, find_data_file
+from cache import ResponseCache
+from db import ConnectionPool
+from recommendation_store import RecommendationStore
+from travel_time import TravelTimeCache
+from validation import is_valid_admin_token, parse_batch_request
 import logging
 import os
 import json
-import mysql.connector
-from mysql.connector import Error
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Imported after load_dotenv so PROMETHEUS_MULTIPROC_DIR from .env takes effect
+import metrics
+import tracing
+from profiler import SamplingProfiler
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,57 +30,232 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Initialize recommender
+def observe_stage(stage, seconds):
+    # Stage timings feed the Prometheus histograms and, when enabled, the request's trace
+    metrics.observe_stage(stage, seconds)
+    tracing.record_stage(stage, seconds)
+
+class TimedJSONEncoder(JSONEncoder):
+    # Times response serialization as the 'serialization' recommender stage
+    def encode(self, o):
+        start = time.perf_counter()
+        try:
+            return super().encode(o)
+        finally:
+            observe_stage('serialization', time.perf_counter() - start)
+
+app.json_encoder = TimedJSONEncoder
+
+# Currently published recommender snapshot. Loaded state is never mutated in
+# place: reloads and refreshes build a new instance and swap this reference, so
+# handlers read it once per request and always see a complete model.
 recommender = TouristAttractionRecommender()
 
-# Database connection
+# Serializes snapshot builds triggered at startup, by the scheduler and by admin endpoints
+build_lock = threading.Lock()
+
+def create_response_cache():
+    redis_client = None
+    if os.getenv('CACHE_BACKEND', 'memory') == 'redis':
+        try:
+            import redis
+            redis_client = redis.Redis(
+                host=os.getenv('REDIS_HOST', 'localhost'),
+                port=int(os.getenv('REDIS_PORT', 6379)),
+                socket_timeout=float(os.getenv('REDIS_TIMEOUT_SECONDS', 0.1))
+            )
+            redis_client.ping()
+            logger.info("Using Redis response cache")
+        except Exception as e:
+            logger.warning(f"Redis cache unavailable, falling back to in-process cache: {e}")
+            redis_client = None
+    
+    return ResponseCache(
+        max_entries=int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        ttl_seconds=int(os.getenv('CACHE_TTL_SECONDS', 300)),
+        redis_client=redis_client
+    )
+
+response_cache = create_response_cache()
+metrics.register_cache(response_cache)
+
+def get_cached(endpoint, snapshot, params, compute):
+    # Keys carry the data version, so entries from before a refresh are never served.
+    # Traced requests always compute, so their stage breakdown is meaningful.
+    if snapshot.data_version is None or tracing.is_tracing():
+        return compute()
+    
+    key = (endpoint, snapshot.data_version) + tuple(params)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    result = compute()
+    response_cache.set(key, result)
+    return result
+
+# Database connection pool, sized by DB_POOL_SIZE
+db_pool = ConnectionPool.from_env()
+
 def get_db_connection():
-    try:
-        connection = mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            database=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD')
-        )
-        if connection.is_connected():
-            logger.info("Connected to MySQL database")
-            return connection
-    except Error as e:
-        logger.error(f"Error connecting to MySQL database: {e}")
-        return None
+    # Borrowed connections go back to the pool on close()
+    return db_pool.get_connection()
 
-# Load data on startup
-@app.before_first_request
-def load_data():
+# Persistent travel-time cache used to schedule itineraries, enabled by TRAVEL_TIME_CACHE_PATH
+travel_time_cache = TravelTimeCache.from_env()
+
+# Hybrid recommendations precomputed by materialize_recommendations.py, enabled by RECOMMENDATION_STORE_DIR
+recommendation_store = RecommendationStore.from_env()
+
+def is_admin_request():
+    return is_valid_admin_token(request.headers.get('X-Admin-Token'))
+
+def load_models(snapshot):
+    # Load offline-trained models so the API never trains at startup
+    als_model_path = os.getenv('ALS_MODEL_PATH', os.path.join(os.getenv('DATA_DIR', 'data'), 'als_model.npz'))
+    if os.path.exists(als_model_path):
+        snapshot.load_als_model(als_model_path)
+    else:
+        logger.info(f"No ALS model found at {als_model_path}, method=als is disabled")
+
+def build_snapshot(use_artifact=True):
+    # The recommender borrows pool connections per table, so tables load concurrently
+    snapshot = TouristAttractionRecommender(
+        connection_factory=get_db_connection,
+        travel_time_cache=travel_time_cache,
+        recommendation_store=recommendation_store,
+        stage_observer=observe_stage,
+        neighbour_method=os.getenv('NEIGHBOUR_METHOD', 'exact'),
+        lsh_tables=int(os.getenv('LSH_TABLES', 8)),
+        lsh_bits=int(os.getenv('LSH_BITS', 16)),
+        lsh_block_size=int(os.getenv('LSH_BLOCK_SIZE', 512)),
+        content_weight=float(os.getenv('HYBRID_CONTENT_WEIGHT', 0.5)),
+        collaborative_weight=float(os.getenv('HYBRID_COLLABORATIVE_WEIGHT', 0.5))
+    )
+    
+    # Prefer a prebuilt model artifact, which is memory-mapped instead of rebuilt.
+    # The connection factory stays so incremental refreshes continue from its watermarks.
+    artifact_dir = os.getenv('MODEL_ARTIFACT_DIR')
+    if use_artifact and artifact_dir and os.path.exists(os.path.join(artifact_dir, 'manifest.json')):
+        if snapshot.load_artifact(artifact_dir):
+            logger.info("Data loaded from model artifact")
+            return snapshot
+    
     # Try to load from database
-    connection = get_db_connection()
-    if connection:
-        recommender.db_connection = connection
-        success = recommender.load_data_from_db()
+    if db_pool.is_healthy():
+        success = snapshot.load_data_from_db()
         if success:
             logger.info("Data loaded from database")
-            return
+            load_models(snapshot)
+            return snapshot
         
     # If database loading fails, try loading from files
     logger.info("Trying to load data from files")
+    snapshot.connection_factory = None
     data_dir = os.getenv('DATA_DIR', 'data')
-    attractions_file = os.path.join(data_dir, 'attractions.json')
-    preferences_file = os.path.join(data_dir, 'preferences.json')
-    reviews_file = os.path.join(data_dir, 'reviews.json')
+    attractions_file = find_data_file(data_dir, 'attractions')
+    preferences_file = find_data_file(data_dir, 'preferences')
+    reviews_file = find_data_file(data_dir, 'reviews')
     
     if (os.path.exists(attractions_file) and 
         os.path.exists(preferences_file) and 
         os.path.exists(reviews_file)):
-        success = recommender.load_data_from_files(
+        success = snapshot.load_data_from_files(
             attractions_file,
             preferences_file,
             reviews_file
         )
         if success:
             logger.info("Data loaded from files")
-            return
+            load_models(snapshot)
+            return snapshot
     
     logger.error("Failed to load data")
+    return None
+
+def publish_snapshot(snapshot):
+    global recommender
+    snapshot.snapshot_version = recommender.snapshot_version + 1
+    # A single reference assignment is atomic, so requests see either snapshot in full
+    recommender = snapshot
+    response_cache.clear()
+    metrics.record_snapshot(snapshot)
+    logger.info(f"Published recommender snapshot version {snapshot.snapshot_version}")
+
+def reload_snapshot():
+    with build_lock:
+        snapshot = build_snapshot()
+        if snapshot is None:
+            return False
+        publish_snapshot(snapshot)
+        return True
+
+def refresh_data():
+    with build_lock:
+        if recommender.connection_factory is None:
+            return False
+        snapshot = recommender.clone()
+        if not snapshot.refresh_data_from_db():
+            return False
+        publish_snapshot(snapshot)
+        return True
+
+def start_refresh_scheduler():
+    interval = int(os.getenv('REFRESH_INTERVAL_SECONDS', 0))
+    if interval <= 0:
+        return
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            refresh_data()
+    
+    threading.Thread(target=run, name='data-refresh', daemon=True).start()
+    logger.info(f"Incremental data refresh scheduled every {interval} seconds")
+
+# Load data on startup
+@app.before_first_request
+def load_data():
+    if reload_snapshot() and recommender.connection_factory is not None:
+        start_refresh_scheduler()
+
+# On-demand profiler started by the admin profile endpoint, writing under PROFILE_DIR
+sampling_profiler = SamplingProfiler(os.getenv('PROFILE_DIR', 'profiles'))
+
+def is_trace_request():
+    # Opt-in with ?trace=1 or X-Debug-Trace: 1, for admins or when DEBUG_TRACE_ENABLED is set
+    requested = request.args.get('trace') == '1' or request.headers.get('X-Debug-Trace') == '1'
+    return requested and (os.getenv('DEBUG_TRACE_ENABLED') == '1' or is_admin_request())
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.trace_token = tracing.start_trace() if is_trace_request() else None
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by URL rule rather than path to keep the number of series bounded
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - g.request_start)
+    
+    if g.trace_token is not None:
+        trace = tracing.finish_trace(g.trace_token)
+        g.trace_token = None
+        if response.is_json:
+            payload = response.get_json()
+            payload['trace'] = trace
+            response.set_data(json.dumps(payload, default=str))
+    
+    if route != '/api/admin/profile':
+        sampling_profiler.request_finished()
+    return response
+
+@app.teardown_request
+def discard_trace(exception=None):
+    # after_request is skipped on unhandled errors; never leak a trace into the next request
+    if g.get('trace_token') is not None:
+        tracing.finish_trace(g.trace_token)
+        g.trace_token = None
 
 @app.route('/api/recommendations', methods=['GET'])
 def get_recommendations():
@@ -83,13 +269,19 @@ def get_recommendations():
                 'message': 'User ID is required'
             }), 400
         
-        recommendations = recommender.get_hybrid_recommendations(user_id, top_n=limit)
+        snapshot = recommender
+        recommendations, source = get_cached(
+            'recommendations', snapshot, (user_id, limit),
+            lambda: snapshot.get_recommendations(user_id, top_n=limit)
+        )
         
         return jsonify({
             'status': 'success',
             'data': {
                 'recommendations': recommendations,
-                'type': 'hybrid'
+                'type': 'hybrid',
+                'source': source,
+                'snapshot_version': snapshot.snapshot_version
             }
         })
     
@@ -100,6 +292,39 @@ def get_recommendations():
             'message': 'An error occurred while fetching recommendations'
         }), 500
 
+@app.route('/api/recommendations/batch', methods=['POST'])
+def get_batch_recommendations():
+    try:
+        data = request.get_json()
+        
+        user_ids, limit, error = parse_batch_request(data)
+        if error:
+            return jsonify({
+                'status': 'error',
+                'message': error
+            }), 400
+        
+        snapshot = recommender
+        recommendations = snapshot.get_batch_recommendations(user_ids, top_n=limit)
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'recommendations': {
+                    str(user_id): recs for user_id, recs in recommendations.items()
+                },
+                'type': 'hybrid',
+                'snapshot_version': snapshot.snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_batch_recommendations: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'An error occurred while fetching batch recommendations'
+        }), 500
+
 @app.route('/api/recommendations/content-based', methods=['GET'])
 def get_content_based_recommendations():
     try:
@@ -112,13 +337,18 @@ def get_content_based_recommendations():
                 'message': 'User ID is required'
             }), 400
         
-        recommendations = recommender.get_content_based_recommendations(user_id, top_n=limit)
+        snapshot = recommender
+        recommendations = get_cached(
+            'content_based', snapshot, (user_id, limit),
+            lambda: snapshot.get_content_based_recommendations(user_id, top_n=limit)
+        )
         
         return jsonify({
             'status': 'success',
             'data': {
                 'recommendations': recommendations,
-                'type': 'content_based'
+                'type': 'content_based',
+                'snapshot_version': snapshot.snapshot_version
             }
         })
     
@@ -134,6 +364,7 @@ def get_collaborative_recommendations():
     try:
         user_id = request.args.get('user_id', type=int)
         limit = request.args.get('limit', default=5, type=int)
+        method = request.args.get('method', default='user')
         
         if not user_id:
             return jsonify({
@@ -141,13 +372,25 @@ def get_collaborative_recommendations():
                 'message': 'User ID is required'
             }), 400
         
-        recommendations = recommender.get_collaborative_recommendations(user_id, top_n=limit)
+        if method not in ('user', 'item', 'als'):
+            return jsonify({
+                'status': 'error',
+                'message': 'Method must be one of user, item or als'
+            }), 400
+        
+        snapshot = recommender
+        recommendations = get_cached(
+            'collaborative', snapshot, (user_id, limit, method),
+            lambda: snapshot.get_collaborative_recommendations(user_id, top_n=limit, method=method)
+        )
         
         return jsonify({
             'status': 'success',
             'data': {
                 'recommendations': recommendations,
-                'type': 'collaborative'
+                'type': 'collaborative',
+                'method': method,
+                'snapshot_version': snapshot.snapshot_version
             }
         })
     
@@ -181,18 +424,43 @@ def generate_itinerary():
         start_date = data['start_date']
         end_date = data['end_date']
         location = data.get('location')
+        optimize_route = bool(data.get('optimize_route', False))
+        latitude = data.get('latitude')
+        longitude = data.get('longitude')
+        radius_km = data.get('radius_km')
+        bbox = data.get('bbox')
+        
+        if bbox is not None and (not isinstance(bbox, list) or len(bbox) != 4):
+            return jsonify({
+                'status': 'error',
+                'message': 'Field bbox must be [min_lat, min_lon, max_lat, max_lon]'
+            }), 400
+        if bbox is not None:
+            # Hashable, as part of the cache key
+            bbox = tuple(bbox)
         
-        itinerary = recommender.generate_itinerary(
-            user_id=user_id,
-            start_date=start_date,
-            end_date=end_date,
-            location=location
+        snapshot = recommender
+        itinerary = get_cached(
+            'itinerary', snapshot,
+            (user_id, start_date, end_date, location, optimize_route, latitude, longitude, radius_km, bbox),
+            lambda: snapshot.generate_itinerary(
+                user_id=user_id,
+                start_date=start_date,
+                end_date=end_date,
+                location=location,
+                optimize_route=optimize_route,
+                latitude=latitude,
+                longitude=longitude,
+                radius_km=radius_km,
+                bbox=bbox
+            )
         )
         
         return jsonify({
             'status': 'success',
             'data': {
-                'itinerary': itinerary
+                'itinerary': itinerary,
+                'snapshot_version': snapshot.snapshot_version
             }
         })
     
@@ -203,6 +471,189 @@ def generate_itinerary():
             'message': 'An error occurred while generating itinerary'
         }), 500
 
+@app.route('/api/attractions/nearby', methods=['GET'])
+def get_nearby_attractions():
+    try:
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lon', type=float)
+        radius_km = request.args.get('radius', default=10, type=float)
+        category = request.args.get('category')
+        limit = request.args.get('limit', default=20, type=int)
+        
+        if latitude is None or longitude is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Parameters lat and lon are required'
+            }), 400
+        
+        snapshot = recommender
+        attractions = get_cached(
+            'nearby', snapshot, (latitude, longitude, radius_km, category, limit),
+            lambda: snapshot.get_nearby_attractions(
+                latitude, longitude, radius_km=radius_km, category=category, limit=limit
+            )
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'attractions': attractions,
+                'snapshot_version': snapshot.snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_nearby_attractions: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'An error occurred while fetching nearby attractions'
+        }), 500
+
+@app.route('/api/attractions/<int:attraction_id>/similar', methods=['GET'])
+def get_similar_attractions(attraction_id):
+    try:
+        limit = request.args.get('limit', default=10, type=int)
+        
+        # Served from the similarity index precomputed at load time, so no response cache is needed
+        snapshot = recommender
+        attractions = snapshot.get_similar_attractions(attraction_id, limit=limit)
+        if attractions is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Attraction not found'
+            }), 404
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'attraction_id': attraction_id,
+                'attractions': attractions,
+                'snapshot_version': snapshot.snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_similar_attractions: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'An error occurred while fetching similar attractions'
+        }), 500
+
+@app.route('/api/admin/refresh', methods=['POST'])
+def refresh_recommender_data():
+    if not is_admin_request():
+        return jsonify({
+            'status': 'error',
+            'message': 'Admin token is required'
+        }), 403
+    
+    if recommender.connection_factory is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Incremental refresh requires a database connection'
+        }), 400
+    
+    try:
+        if not refresh_data():
+            return jsonify({
+                'status': 'error',
+                'message': 'Data refresh failed'
+            }), 500
+        
+        snapshot = recommender
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'snapshot_version': snapshot.snapshot_version,
+                'watermarks': {
+                    table: str(watermark) for table, watermark in snapshot.watermarks.items()
+                }
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in refresh_recommender_data: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'An error occurred while refreshing data'
+        }), 500
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_recommender():
+    if not is_admin_request():
+        return jsonify({
+            'status': 'error',
+            'message': 'Admin token is required'
+        }), 403
+    
+    if build_lock.locked():
+        return jsonify({
+            'status': 'error',
+            'message': 'A reload is already in progress'
+        }), 409
+    
+    # Build the new snapshot in the background; requests keep using the current one
+    threading.Thread(target=reload_snapshot, name='snapshot-reload', daemon=True).start()
+    
+    return jsonify({
+        'status': 'success',
+        'message': 'Reload started',
+        'data': {
+            'snapshot_version': recommender.snapshot_version
+        }
+    }), 202
+
+@app.route('/api/admin/profile', methods=['POST'])
+def start_profile():
+    if not is_admin_request():
+        return jsonify({
+            'status': 'error',
+            'message': 'Admin token is required'
+        }), 403
+    
+    data = request.get_json(silent=True) or {}
+    seconds = data.get('seconds')
+    requests = data.get('requests')
+    
+    if (seconds is None) == (requests is None):
+        return jsonify({
+            'status': 'error',
+            'message': 'Exactly one of seconds or requests is required'
+        }), 400
+    
+    if not isinstance(seconds or requests, (int, float)) or (seconds or requests) <= 0:
+        return jsonify({
+            'status': 'error',
+            'message': 'Field seconds or requests must be a positive number'
+        }), 400
+    
+    path = sampling_profiler.start(seconds=seconds, requests=requests)
+    if path is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'A profile is already running'
+        }), 409
+    
+    return jsonify({
+        'status': 'success',
+        'message': 'Profiling started',
+        'data': {
+            'output': path
+        }
+    }), 202
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        'status': 'success',
+        'data': response_cache.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -0,0 +1,502 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse as StarletteJSONResponse, Response
+from starlette.routing import Route
+from dotenv import load_dotenv
+from validation import is_valid_admin_token, parse_batch_request
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Imported after load_dotenv so PROMETHEUS_MULTIPROC_DIR from .env takes effect
+import metrics
+
+# Loaded Flask app module of each worker process, holding its snapshot and response cache
+worker_api = None
+# Refresh generation shared with the parent, bumped by the admin refresh endpoint
+worker_refresh_generation = None
+worker_seen_generation = 0
+
+# Methods whose results are cached per worker, matching the endpoints the Flask app caches
+CACHED_METHODS = {
+    'get_recommendations',
+    'get_content_based_recommendations',
+    'get_collaborative_recommendations',
+    'generate_itinerary',
+    'get_nearby_attractions'
+}
+
+def init_worker(refresh_generation):
+    # Imported here so only worker processes pay for loading the Flask app module
+    import api
+    
+    global worker_api, worker_refresh_generation, worker_seen_generation
+    worker_api = api
+    worker_refresh_generation = refresh_generation
+    worker_seen_generation = refresh_generation.value
+    if not api.reload_snapshot():
+        logger.error("Worker started without recommender data")
+    elif api.recommender.connection_factory is not None:
+        api.start_refresh_scheduler()
+
+def warm_worker():
+    # Holds the worker briefly so warm-up calls spread over every process
+    time.sleep(0.05)
+    return os.getpid()
+
+def refresh_worker_data():
+    # Refresh in the background so the request that noticed it is not delayed
+    global worker_seen_generation
+    generation = worker_refresh_generation.value
+    if generation == worker_seen_generation:
+        return
+    worker_seen_generation = generation
+    threading.Thread(target=worker_api.refresh_data, name='data-refresh', daemon=True).start()
+
+def run_in_worker(method_name, kwargs):
+    if worker_api is None or worker_api.recommender.data_version is None:
+        raise RuntimeError("Recommender data not loaded")
+    refresh_worker_data()
+    
+    snapshot = worker_api.recommender
+    compute = lambda: getattr(snapshot, method_name)(**kwargs)
+    if method_name in CACHED_METHODS:
+        params = (json.dumps(kwargs, sort_keys=True, default=str),)
+        result = worker_api.get_cached(method_name, snapshot, params, compute)
+    else:
+        result = compute()
+    return snapshot.snapshot_version, result
+
+class JSONResponse(StarletteJSONResponse):
+    def render(self, content):
+        # Match Flask's jsonify, which allows NaN in attraction records
+        start = time.perf_counter()
+        try:
+            return json.dumps(content, ensure_ascii=False, default=str).encode('utf-8')
+        finally:
+            metrics.observe_stage('serialization', time.perf_counter() - start)
+
+def error_response(message, status_code):
+    return JSONResponse({
+        'status': 'error',
+        'message': message
+    }, status_code=status_code)
+
+class RecommenderPool:
+    def __init__(self, processes, max_concurrency):
+        """
+        Process pool whose workers each hold a loaded recommender
+        
+        Args:
+            processes: Number of worker processes
+            max_concurrency: Maximum number of requests dispatched at once
+        """
+        self.processes = processes
+        self.max_concurrency = max_concurrency
+        self.executor = None
+        self.semaphore = None
+        self.reload_lock = None
+        context = multiprocessing.get_context('spawn')
+        self.refresh_generation = context.Value('i', 0)
+    
+    def _create_executor(self):
+        # spawn avoids forking the event loop's threads into the workers
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(self.refresh_generation,)
+        )
+    
+    async def _warm_up(self, executor):
+        """
+        Wait until every worker of an executor has loaded its data
+        
+        Workers are started lazily on submit and load data in their
+        initializer, so without this the first requests would wait for it.
+        
+        Args:
+            executor: Newly created executor
+        """
+        loop = asyncio.get_running_loop()
+        worker_pids = set()
+        while len(worker_pids) < self.processes:
+            pids = await asyncio.gather(*[
+                loop.run_in_executor(executor, warm_worker) for _ in range(self.processes)
+            ])
+            worker_pids.update(pids)
+    
+    async def start(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.reload_lock = asyncio.Lock()
+        executor = self._create_executor()
+        await self._warm_up(executor)
+        self.executor = executor
+        logger.info(f"Recommender pool started with {self.processes} processes, "
+                    f"max concurrency {self.max_concurrency}")
+    
+    async def reload(self):
+        # New workers load fresh data while the old pool keeps serving requests
+        async with self.reload_lock:
+            try:
+                executor = self._create_executor()
+                await self._warm_up(executor)
+            except Exception as e:
+                logger.error(f"Error reloading recommender pool: {str(e)}")
+                return
+            
+            old_executor = self.executor
+            self.executor = executor
+            old_executor.shutdown(wait=False)
+            logger.info("Recommender pool reloaded")
+    
+    def refresh(self):
+        # Each worker starts an incremental refresh on its next call
+        with self.refresh_generation.get_lock():
+            self.refresh_generation.value += 1
+    
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+    
+    async def call(self, method_name, **kwargs):
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, run_in_worker, method_name, kwargs)
+
+pool = RecommenderPool(
+    processes=int(os.getenv('ASGI_WORKER_PROCESSES', os.cpu_count() or 1)),
+    max_concurrency=int(os.getenv('ASGI_MAX_CONCURRENCY', 64))
+)
+
+def parse_int(value, default=None):
+    # Same semantics as Flask's request.args.get(..., type=int)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def parse_float(value, default=None):
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+async def get_recommendations(request):
+    try:
+        user_id = parse_int(request.query_params.get('user_id'))
+        limit = parse_int(request.query_params.get('limit'), default=5)
+        
+        if not user_id:
+            return error_response('User ID is required', 400)
+        
+        snapshot_version, (recommendations, source) = await pool.call(
+            'get_recommendations', user_id=user_id, top_n=limit
+        )
+        
+        return JSONResponse({
+            'status': 'success',
+            'data': {
+                'recommendations': recommendations,
+                'type': 'hybrid',
+                'source': source,
+                'snapshot_version': snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_recommendations: {str(e)}")
+        return error_response('An error occurred while fetching recommendations', 500)
+
+async def get_batch_recommendations(request):
+    try:
+        data = await request.json()
+        
+        user_ids, limit, error = parse_batch_request(data)
+        if error:
+            return error_response(error, 400)
+        
+        snapshot_version, recommendations = await pool.call(
+            'get_batch_recommendations', user_ids=user_ids, top_n=limit
+        )
+        
+        return JSONResponse({
+            'status': 'success',
+            'data': {
+                'recommendations': {
+                    str(user_id): recs for user_id, recs in recommendations.items()
+                },
+                'type': 'hybrid',
+                'snapshot_version': snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_batch_recommendations: {str(e)}")
+        return error_response('An error occurred while fetching batch recommendations', 500)
+
+async def get_content_based_recommendations(request):
+    try:
+        user_id = parse_int(request.query_params.get('user_id'))
+        limit = parse_int(request.query_params.get('limit'), default=5)
+        
+        if not user_id:
+            return error_response('User ID is required', 400)
+        
+        snapshot_version, recommendations = await pool.call(
+            'get_content_based_recommendations', user_id=user_id, top_n=limit
+        )
+        
+        return JSONResponse({
+            'status': 'success',
+            'data': {
+                'recommendations': recommendations,
+                'type': 'content_based',
+                'snapshot_version': snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_content_based_recommendations: {str(e)}")
+        return error_response('An error occurred while fetching content-based recommendations', 500)
+
+async def get_collaborative_recommendations(request):
+    try:
+        user_id = parse_int(request.query_params.get('user_id'))
+        limit = parse_int(request.query_params.get('limit'), default=5)
+        method = request.query_params.get('method', 'user')
+        
+        if not user_id:
+            return error_response('User ID is required', 400)
+        
+        if method not in ('user', 'item', 'als'):
+            return error_response('Method must be one of user, item or als', 400)
+        
+        snapshot_version, recommendations = await pool.call(
+            'get_collaborative_recommendations', user_id=user_id, top_n=limit, method=method
+        )
+        
+        return JSONResponse({
+            'status': 'success',
+            'data': {
+                'recommendations': recommendations,
+                'type': 'collaborative',
+                'method': method,
+                'snapshot_version': snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_collaborative_recommendations: {str(e)}")
+        return error_response('An error occurred while fetching collaborative recommendations', 500)
+
+async def generate_itinerary(request):
+    try:
+        data = await request.json()
+        
+        if not data:
+            return error_response('No data provided', 400)
+        
+        required_fields = ['user_id', 'start_date', 'end_date']
+        for field in required_fields:
+            if field not in data:
+                return error_response(f'Field {field} is required', 400)
+        
+        bbox = data.get('bbox')
+        if bbox is not None and (not isinstance(bbox, list) or len(bbox) != 4):
+            return error_response('Field bbox must be [min_lat, min_lon, max_lat, max_lon]', 400)
+        
+        snapshot_version, itinerary = await pool.call(
+            'generate_itinerary',
+            user_id=data['user_id'],
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+            location=data.get('location'),
+            optimize_route=bool(data.get('optimize_route', False)),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude'),
+            radius_km=data.get('radius_km'),
+            bbox=bbox
+        )
+        
+        return JSONResponse({
+            'status': 'success',
+            'data': {
+                'itinerary': itinerary,
+                'snapshot_version': snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in generate_itinerary: {str(e)}")
+        return error_response('An error occurred while generating itinerary', 500)
+
+async def get_nearby_attractions(request):
+    try:
+        latitude = parse_float(request.query_params.get('lat'))
+        longitude = parse_float(request.query_params.get('lon'))
+        radius_km = parse_float(request.query_params.get('radius'), default=10)
+        category = request.query_params.get('category')
+        limit = parse_int(request.query_params.get('limit'), default=20)
+        
+        if latitude is None or longitude is None:
+            return error_response('Parameters lat and lon are required', 400)
+        
+        snapshot_version, attractions = await pool.call(
+            'get_nearby_attractions', latitude=latitude, longitude=longitude,
+            radius_km=radius_km, category=category, limit=limit
+        )
+        
+        return JSONResponse({
+            'status': 'success',
+            'data': {
+                'attractions': attractions,
+                'snapshot_version': snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_nearby_attractions: {str(e)}")
+        return error_response('An error occurred while fetching nearby attractions', 500)
+
+async def get_similar_attractions(request):
+    try:
+        attraction_id = request.path_params['attraction_id']
+        limit = parse_int(request.query_params.get('limit'), default=10)
+        
+        snapshot_version, attractions = await pool.call(
+            'get_similar_attractions', attraction_id=attraction_id, limit=limit
+        )
+        if attractions is None:
+            return error_response('Attraction not found', 404)
+        
+        return JSONResponse({
+            'status': 'success',
+            'data': {
+                'attraction_id': attraction_id,
+                'attractions': attractions,
+                'snapshot_version': snapshot_version
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error in get_similar_attractions: {str(e)}")
+        return error_response('An error occurred while fetching similar attractions', 500)
+
+def is_admin_request(request):
+    return is_valid_admin_token(request.headers.get('X-Admin-Token'))
+
+async def refresh_recommender_data(request):
+    if not is_admin_request(request):
+        return error_response('Admin token is required', 403)
+    
+    pool.refresh()
+    
+    return JSONResponse({
+        'status': 'success',
+        'message': 'Refresh started'
+    }, status_code=202)
+
+async def reload_recommender(request):
+    if not is_admin_request(request):
+        return error_response('Admin token is required', 403)
+    
+    asyncio.get_running_loop().create_task(pool.reload())
+    
+    return JSONResponse({
+        'status': 'success',
+        'message': 'Reload started'
+    }, status_code=202)
+
+async def get_metrics(request):
+    # Worker process metrics are included when PROMETHEUS_MULTIPROC_DIR is set
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
+async def health_check(request):
+    # Answered on the event loop, so it stays responsive while workers are busy
+    return JSONResponse({
+        'status': 'success',
+        'message': 'Recommendation API is running'
+    })
+
+# /api/admin/profile and /api/cache/stats are Flask-only: the sampling profiler
+# and the in-process response cache belong to a single worker process here, so
+# they would only describe whichever worker happened to take the request.
+app = Starlette(
+    routes=[
+        Route('/api/recommendations', get_recommendations, methods=['GET']),
+        Route('/api/recommendations/batch', get_batch_recommendations, methods=['POST']),
+        Route('/api/recommendations/content-based', get_content_based_recommendations, methods=['GET']),
+        Route('/api/recommendations/collaborative', get_collaborative_recommendations, methods=['GET']),
+        Route('/api/itinerary/generate', generate_itinerary, methods=['POST']),
+        Route('/api/attractions/nearby', get_nearby_attractions, methods=['GET']),
+        Route('/api/attractions/{attraction_id:int}/similar', get_similar_attractions, methods=['GET']),
+        Route('/api/admin/refresh', refresh_recommender_data, methods=['POST']),
+        Route('/api/admin/reload', reload_recommender, methods=['POST']),
+        Route('/metrics', get_metrics, methods=['GET']),
+        Route('/api/health', health_check, methods=['GET']),
+    ],
+    on_startup=[pool.start],
+    on_shutdown=[pool.shutdown]
+)
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        """
+        ASGI middleware recording request counts and latency per route
+        
+        Args:
+            app: Wrapped ASGI application
+        """
+        self.app = app
+        self.route_paths = {}
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status = {'code': 500}
+        
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched endpoint in the scope; label by its route path
+            endpoint = scope.get('endpoint')
+            if endpoint is not None and not self.route_paths:
+                self.route_paths = {route.endpoint: route.path for route in app.routes}
+            route = self.route_paths.get(endpoint, 'unmatched')
+            metrics.observe_request(route, scope['method'], status['code'], time.perf_counter() - start)
+
+app.add_middleware(RequestMetricsMiddleware)
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    port = int(os.getenv('PORT', 5000))
+    uvicorn.run(app, host='0.0.0.0', port=port)
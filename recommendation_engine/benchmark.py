@@ -0,0 +1,250 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import time
+import numpy as np
+from main import TouristAttractionRecommender, find_data_file
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the recommendation engine on a dataset')
+    parser.add_argument('--data-dir', default='data/synthetic',
+                        help='Directory with attractions/preferences/reviews files (see generate_synthetic_data.py)')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Number of sampled users timed per recommendation method')
+    parser.add_argument('--batch-size', type=int, default=512,
+                        help='Number of users per get_batch_recommendations call')
+    parser.add_argument('--neighbour-method', choices=['exact', 'lsh'], default='lsh',
+                        help='User neighbour search; exact scores every user pair, which is slow at benchmark scale')
+    parser.add_argument('--als-model', default=None,
+                        help='Trained ALS model (.npz) to also benchmark method=als')
+    parser.add_argument('--baseline', default='benchmark_baseline.json',
+                        help='Stored baseline report to compare against')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative slowdown or memory growth before flagging a regression')
+    parser.add_argument('--output', default=None,
+                        help='Also write the report to this JSON file')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed used to sample users')
+    return parser.parse_args()
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def time_once(stage, function, items=None):
+    """
+    Time a single call of a load/build stage
+    
+    Args:
+        stage: Stage name
+        function: Callable to time
+        items: Number of items processed, used to report throughput (optional)
+    
+    Returns:
+        Stage result dictionary
+    """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    
+    result = {'stage': stage, 'calls': 1, 'total_s': elapsed, 'peak_rss_mb': peak_rss_mb()}
+    if items:
+        result['throughput_per_s'] = items / elapsed
+    logger.info(f"{stage}: {elapsed:.3f}s")
+    return result
+
+def time_calls(stage, function, arguments, items_per_call=1):
+    """
+    Time repeated calls and summarize their latency distribution
+    
+    Args:
+        stage: Stage name
+        function: Callable to time
+        arguments: List of argument tuples, one per call
+        items_per_call: Number of users served per call
+    
+    Returns:
+        Stage result dictionary
+    """
+    latencies = np.empty(len(arguments))
+    for i, args in enumerate(arguments):
+        start = time.perf_counter()
+        function(*args)
+        latencies[i] = time.perf_counter() - start
+    
+    total = latencies.sum()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    result = {
+        'stage': stage,
+        'calls': len(arguments),
+        'total_s': float(total),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(latencies.max() * 1000),
+        'throughput_per_s': len(arguments) * items_per_call / total if total else 0.0,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    logger.info(f"{stage}: p50 {p50:.2f}ms, p95 {p95:.2f}ms, p99 {p99:.2f}ms")
+    return result
+
+def run_benchmarks(args):
+    recommender = TouristAttractionRecommender(neighbour_method=args.neighbour_method)
+    files = [find_data_file(args.data_dir, name) for name in ('attractions', 'preferences', 'reviews')]
+    
+    results = []
+    results.append(time_once('load_data_from_files', lambda: recommender.load_data_from_files(*files)))
+    if recommender.reviews_df is None:
+        raise SystemExit(f"Failed to load data from {args.data_dir}")
+    num_reviews = len(recommender.reviews_df)
+    results[-1]['throughput_per_s'] = num_reviews / results[-1]['total_s']
+    
+    results.append(time_once(
+        '_create_user_attraction_matrix', recommender._create_user_attraction_matrix, items=num_reviews
+    ))
+    
+    if args.als_model and not recommender.load_als_model(args.als_model):
+        raise SystemExit(f"Failed to load ALS model from {args.als_model}")
+    
+    # Quiet per-request logging so it doesn't dominate the timings
+    logging.getLogger('main').setLevel(logging.WARNING)
+    
+    rng = np.random.default_rng(args.seed)
+    user_ids = [int(user_id) for user_id in rng.choice(
+        recommender.matrix_user_ids, size=args.requests, replace=len(recommender.matrix_user_ids) < args.requests
+    )]
+    per_user = [(user_id,) for user_id in user_ids]
+    
+    results.append(time_calls(
+        'get_content_based_recommendations', recommender.get_content_based_recommendations, per_user
+    ))
+    collaborative_methods = ['user', 'item'] + (['als'] if args.als_model else [])
+    for method in collaborative_methods:
+        results.append(time_calls(
+            f'get_collaborative_recommendations[{method}]',
+            lambda user_id, method=method: recommender.get_collaborative_recommendations(user_id, method=method),
+            per_user
+        ))
+    results.append(time_calls(
+        'get_hybrid_recommendations', recommender.get_hybrid_recommendations, per_user
+    ))
+    
+    batches = [
+        (user_ids[start:start + args.batch_size],)
+        for start in range(0, len(user_ids), args.batch_size)
+    ]
+    results.append(time_calls(
+        'get_batch_recommendations', recommender.get_batch_recommendations, batches,
+        items_per_call=min(args.batch_size, len(user_ids))
+    ))
+    
+    results.append(time_calls(
+        'generate_itinerary',
+        lambda user_id: recommender.generate_itinerary(user_id, '2024-07-01', '2024-07-03'),
+        per_user
+    ))
+    
+    return {
+        'dataset': {
+            'data_dir': args.data_dir,
+            'attractions': len(recommender.attractions_df),
+            'users': len(recommender.user_preferences_df),
+            'reviews': num_reviews,
+            'matrix_shape': list(recommender.user_attraction_matrix.shape),
+            'matrix_nnz': int(recommender.user_attraction_matrix.nnz)
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'neighbour_method': args.neighbour_method,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': results
+    }
+
+def compare_to_baseline(report, baseline, tolerance):
+    """
+    Find stages that got slower, or peak memory that grew, beyond the tolerance
+    
+    Per-request stages are compared on p95 latency and one-shot stages on
+    total time.
+    
+    Returns:
+        List of regression descriptions
+    """
+    if baseline.get('dataset') != report['dataset']:
+        logger.warning("Baseline was recorded on a different dataset, comparison may be meaningless")
+    if baseline.get('neighbour_method', 'exact') != report['neighbour_method']:
+        logger.warning(f"Baseline used neighbour method {baseline.get('neighbour_method', 'exact')}, "
+                       f"this run used {report['neighbour_method']}")
+    
+    baseline_stages = {stage['stage']: stage for stage in baseline.get('stages', [])}
+    regressions = []
+    for stage in report['stages']:
+        previous = baseline_stages.get(stage['stage'])
+        if previous is None:
+            continue
+        metric = 'p95_ms' if 'p95_ms' in stage else 'total_s'
+        if stage[metric] > previous[metric] * (1 + tolerance):
+            regressions.append(
+                f"{stage['stage']}: {metric} {stage[metric]:.3f} vs baseline {previous[metric]:.3f}"
+            )
+    
+    if report['peak_rss_mb'] > baseline.get('peak_rss_mb', float('inf')) * (1 + tolerance):
+        regressions.append(
+            f"peak_rss_mb: {report['peak_rss_mb']:.1f} vs baseline {baseline['peak_rss_mb']:.1f}"
+        )
+    return regressions
+
+def print_report(report):
+    print(f"{'stage':<45} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'total s':>9} {'per s':>11} {'rss MB':>8}")
+    for stage in report['stages']:
+        percentiles = [
+            f"{stage[key]:>9.2f}" if key in stage else f"{'-':>9}"
+            for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        ]
+        throughput = f"{stage['throughput_per_s']:>11.1f}" if 'throughput_per_s' in stage else f"{'-':>11}"
+        print(f"{stage['stage']:<45} {stage['calls']:>6} {' '.join(percentiles)} "
+              f"{stage['total_s']:>9.3f} {throughput} {stage['peak_rss_mb']:>8.1f}")
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = run_benchmarks(args)
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            for regression in regressions:
+                logger.error(f"Regression: {regression}")
+            raise SystemExit(1)
+        logger.info(f"No regressions against {args.baseline}")
+    else:
+        logger.info(f"No baseline at {args.baseline}, run with --save-baseline to store one")
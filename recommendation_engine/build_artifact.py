@@ -0,0 +1,28 @@
+import argparse
+import logging
+import os
+from api import build_snapshot
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export the recommender state as a memory-mappable model artifact')
+    parser.add_argument('--output', default=os.getenv('MODEL_ARTIFACT_DIR', 'data/artifact'),
+                        help='Destination artifact directory')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    
+    # Load from the database or JSON files exactly like the API does, never from an old artifact
+    recommender = build_snapshot(use_artifact=False)
+    if recommender is None:
+        raise SystemExit("Failed to load data")
+    
+    if not recommender.export_artifact(args.output):
+        raise SystemExit("Failed to export model artifact")
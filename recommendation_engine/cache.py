@@ -0,0 +1,120 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    def __init__(self, max_entries=10000, ttl_seconds=300, redis_client=None, key_prefix='jalanyuk:rec'):
+        """
+        LRU + TTL cache for API response payloads
+
+        Entries live in process memory, or in Redis when a client is given so
+        that all workers share them. Keys should include the data version, so a
+        data refresh makes old entries unreachable and they simply expire.
+
+        Args:
+            max_entries: Maximum number of in-process entries before LRU eviction
+            ttl_seconds: Time to live of an entry
+            redis_client: redis.Redis instance for the shared backend (optional)
+            key_prefix: Prefix of Redis keys
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return 'redis' if self.redis_client is not None else 'memory'
+
+    def _redis_key(self, key):
+        return f"{self.key_prefix}:{json.dumps(key, separators=(',', ':'), default=str)}"
+
+    def get(self, key):
+        """
+        Look up a cached payload
+
+        Args:
+            key: Tuple of JSON-serializable parts
+
+        Returns:
+            Cached payload, or None on a miss
+        """
+        value = None
+        if self.redis_client is not None:
+            try:
+                raw = self.redis_client.get(self._redis_key(key))
+                value = json.loads(raw) if raw is not None else None
+            except Exception as e:
+                logger.warning(f"Redis cache read failed: {str(e)}")
+        else:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    expires_at, payload = entry
+                    if expires_at > time.monotonic():
+                        self._entries.move_to_end(key)
+                        value = payload
+                    else:
+                        del self._entries[key]
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Store a payload
+
+        Args:
+            key: Tuple of JSON-serializable parts
+            value: JSON-serializable payload
+        """
+        if self.redis_client is not None:
+            try:
+                self.redis_client.setex(
+                    self._redis_key(key), self.ttl_seconds, json.dumps(value, default=str)
+                )
+            except Exception as e:
+                logger.warning(f"Redis cache write failed: {str(e)}")
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop all in-process entries; Redis entries are left to expire by TTL
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            Dictionary with hit/miss counters and the current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds
+            }
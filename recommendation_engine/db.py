@@ -0,0 +1,158 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from mysql.connector import Error, pooling
+
+logger = logging.getLogger(__name__)
+
+class PooledConnection:
+    def __init__(self, connection, on_close):
+        """
+        Borrowed pool connection that frees its pool slot when closed
+
+        Args:
+            connection: mysql.connector pooled connection
+            on_close: Callback releasing the slot
+        """
+        self._connection = connection
+        self._on_close = on_close
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            # Returns the connection to the mysql.connector pool
+            self._connection.close()
+        finally:
+            self._on_close()
+
+class ConnectionPool:
+    def __init__(self, pool_size=5, acquire_timeout=10, connect_timeout=5, reconnect_attempts=3,
+                 **connect_args):
+        """
+        Bounded MySQL connection pool with health checks and reconnects
+
+        Borrowers wait up to acquire_timeout seconds for a free connection
+        instead of failing immediately when the pool is exhausted. Every
+        borrowed connection is pinged and reconnected if the server dropped it.
+
+        Args:
+            pool_size: Maximum number of open connections
+            acquire_timeout: Seconds to wait for a free connection
+            connect_timeout: Seconds to wait when opening a connection
+            reconnect_attempts: Reconnect attempts for a dead connection
+            connect_args: Arguments passed to mysql.connector (host, database, ...)
+
+        Raises:
+            ValueError: If pool_size is outside what mysql.connector supports
+        """
+        # Checked here rather than when the pool is first used, where the error
+        # would only surface as a failed borrow
+        if not 1 <= pool_size <= pooling.CNX_POOL_MAXSIZE:
+            raise ValueError(f"Database pool size must be between 1 and {pooling.CNX_POOL_MAXSIZE}, "
+                             f"got {pool_size} (DB_POOL_SIZE)")
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.connect_args = dict(connect_args, connection_timeout=connect_timeout)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+            acquire_timeout=float(os.getenv('DB_POOL_TIMEOUT_SECONDS', 10)),
+            connect_timeout=int(os.getenv('DB_CONNECT_TIMEOUT_SECONDS', 5)),
+            reconnect_attempts=int(os.getenv('DB_RECONNECT_ATTEMPTS', 3)),
+            host=os.getenv('DB_HOST'),
+            database=os.getenv('DB_NAME'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD')
+        )
+
+    def _get_pool(self):
+        # Created lazily so the API can start, and retry later, while MySQL is down
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name='recommendation',
+                    pool_size=self.pool_size,
+                    **self.connect_args
+                )
+                logger.info(f"MySQL connection pool created with size {self.pool_size}")
+            return self._pool
+
+    def get_connection(self):
+        """
+        Borrow a healthy connection; close() returns it to the pool
+
+        Returns:
+            PooledConnection, or None if no connection could be obtained
+        """
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            logger.error(f"Timed out after {self.acquire_timeout}s waiting for a database connection")
+            return None
+
+        try:
+            connection = self._borrow()
+        except BaseException:
+            # Free the slot whatever went wrong, or the pool shrinks for good
+            self._slots.release()
+            raise
+
+        if connection is None:
+            self._slots.release()
+            return None
+        return PooledConnection(connection, self._slots.release)
+
+    def _borrow(self):
+        """
+        Take a connection from the mysql.connector pool and health-check it
+
+        Returns:
+            mysql.connector pooled connection, or None if it could not be obtained
+        """
+        try:
+            connection = self._get_pool().get_connection()
+        except Error as e:
+            logger.error(f"Error connecting to MySQL database: {e}")
+            return None
+
+        try:
+            connection.ping(reconnect=True, attempts=self.reconnect_attempts, delay=1)
+        except Error as e:
+            logger.error(f"Database connection failed health check: {e}")
+            connection.close()
+            return None
+        except BaseException:
+            connection.close()
+            raise
+
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with block
+
+        Yields:
+            PooledConnection, or None if no connection could be obtained
+        """
+        connection = self.get_connection()
+        try:
+            yield connection
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def is_healthy(self):
+        with self.connection() as connection:
+            return connection is not None and connection.is_connected()
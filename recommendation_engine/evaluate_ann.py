@@ -0,0 +1,138 @@
+import argparse
+import json
+import logging
+import os
+import time
+import numpy as np
+from main import TouristAttractionRecommender, find_data_file
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Measure recall and build time of LSH user neighbours against exact cosine neighbours'
+    )
+    parser.add_argument('--data-dir', default=os.getenv('DATA_DIR', 'data'),
+                        help='Directory with attractions/preferences/reviews files')
+    parser.add_argument('--k', type=int, default=20,
+                        help='Number of neighbours per user')
+    parser.add_argument('--tables', default='4,8,16',
+                        help='Comma-separated LSH table counts to evaluate')
+    parser.add_argument('--block-sizes', default='256,512,1024',
+                        help='Comma-separated LSH block sizes to evaluate')
+    parser.add_argument('--bits', type=int, default=16,
+                        help='LSH bits per table')
+    parser.add_argument('--sample', type=int, default=1000,
+                        help='Number of users whose exact neighbours are computed for recall')
+    parser.add_argument('--output', default=None,
+                        help='Also write the results to this JSON file')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed used to sample users')
+    return parser.parse_args()
+
+def recall_at_k(approximate_rows, approximate_scores, exact_rows, exact_scores):
+    """
+    Fraction of exact neighbours that the approximate index also returned
+    
+    Exact neighbours with a similarity of zero or less are ties with any
+    unrelated user, so only positively similar neighbours are counted.
+    
+    Returns:
+        Mean recall over users that have at least one positive exact neighbour
+    """
+    recalls = []
+    for approximate, approximate_score, exact, exact_score in zip(
+        approximate_rows, approximate_scores, exact_rows, exact_scores
+    ):
+        relevant = set(exact[exact_score > 0])
+        if relevant:
+            found = set(approximate[np.isfinite(approximate_score)])
+            recalls.append(len(relevant & found) / len(relevant))
+    return float(np.mean(recalls)) if recalls else 0.0
+
+def similarity_ratio(approximate_scores, exact_scores):
+    """
+    Mean similarity of the approximate neighbours relative to the exact ones
+    
+    Recall undercounts when many users are almost equally similar; this shows
+    how much neighbour quality is actually lost.
+    
+    Returns:
+        Ratio of summed approximate to summed exact similarity, at most 1
+    """
+    approximate = np.where(np.isfinite(approximate_scores), approximate_scores, 0).clip(min=0).sum()
+    exact = np.where(np.isfinite(exact_scores), exact_scores, 0).clip(min=0).sum()
+    return float(approximate / exact) if exact else 0.0
+
+def evaluate(args):
+    # Load with LSH so the exact all-users pass is never run
+    recommender = TouristAttractionRecommender(neighbour_k=args.k, neighbour_method='lsh')
+    files = [find_data_file(args.data_dir, name) for name in ('attractions', 'preferences', 'reviews')]
+    if not recommender.load_data_from_files(*files):
+        raise SystemExit(f"Failed to load data from {args.data_dir}")
+    matrix = recommender.user_attraction_matrix
+    
+    rng = np.random.default_rng(args.seed)
+    sample = np.sort(rng.choice(matrix.shape[0], size=min(args.sample, matrix.shape[0]), replace=False))
+    
+    start = time.perf_counter()
+    exact_rows, exact_scores = recommender._top_k_similar_rows(matrix, args.k, row_positions=sample)
+    exact_seconds = time.perf_counter() - start
+    # Extrapolate the sampled exact pass to the whole matrix for comparison
+    exact_full_seconds = exact_seconds * matrix.shape[0] / len(sample)
+    logger.info(f"Exact neighbours for {len(sample)} users in {exact_seconds:.2f}s "
+                f"(~{exact_full_seconds:.1f}s for all {matrix.shape[0]} users)")
+    
+    results = []
+    for num_tables in [int(value) for value in args.tables.split(',')]:
+        for block_size in [int(value) for value in args.block_sizes.split(',')]:
+            start = time.perf_counter()
+            rows, scores = recommender._lsh_top_k_similar_rows(
+                matrix, args.k, num_tables=num_tables, num_bits=args.bits, block_size=block_size
+            )
+            build_seconds = time.perf_counter() - start
+            
+            result = {
+                'tables': num_tables,
+                'block_size': block_size,
+                'recall': recall_at_k(rows[sample], scores[sample], exact_rows, exact_scores),
+                'similarity_ratio': similarity_ratio(scores[sample], exact_scores),
+                'build_s': build_seconds,
+                'users_per_s': matrix.shape[0] / build_seconds,
+                'speedup': exact_full_seconds / build_seconds,
+                'filled': float(np.isfinite(scores).mean())
+            }
+            results.append(result)
+            logger.info(f"tables={num_tables} block_size={block_size}: recall@{args.k} {result['recall']:.3f}, "
+                        f"similarity ratio {result['similarity_ratio']:.3f} "
+                        f"in {build_seconds:.2f}s")
+    
+    return {
+        'matrix_shape': list(matrix.shape),
+        'k': args.k,
+        'bits': args.bits,
+        'sample': len(sample),
+        'exact_sample_s': exact_seconds,
+        'exact_full_estimate_s': exact_full_seconds,
+        'results': results
+    }
+
+def print_report(report):
+    print(f"{'tables':>6} {'block':>6} {'recall':>8} {'sim':>6} {'build s':>9} {'users/s':>11} {'speedup':>8} {'filled':>7}")
+    for result in report['results']:
+        print(f"{result['tables']:>6} {result['block_size']:>6} {result['recall']:>8.3f} {result['similarity_ratio']:>6.3f} {result['build_s']:>9.2f} "
+              f"{result['users_per_s']:>11.0f} {result['speedup']:>8.1f} {result['filled']:>7.2f}")
+
+if __name__ == '__main__':
+    args = parse_args()
+    report = evaluate(args)
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,51 @@
+import argparse
+import logging
+import os
+import numpy as np
+from api import build_snapshot
+from travel_time import TravelTimeCache
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Bulk-fill the travel-time cache from an OSRM /table endpoint')
+    parser.add_argument('--cache', default=os.getenv('TRAVEL_TIME_CACHE_PATH', 'data/travel_times.sqlite'),
+                        help='SQLite travel-time cache file')
+    parser.add_argument('--osrm-url', default=os.getenv('OSRM_API_URL', 'http://localhost:5001'),
+                        help='Base URL of the OSRM server')
+    parser.add_argument('--profile', default=os.getenv('OSRM_PROFILE', 'driving'),
+                        help='OSRM routing profile')
+    parser.add_argument('--table-size', type=int, default=100,
+                        help='Maximum sources and destinations per /table request')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Re-request pairs that are already cached')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    
+    recommender = build_snapshot()
+    if recommender is None:
+        raise SystemExit("Failed to load data")
+    
+    attractions = recommender.attractions_df[['id', 'latitude', 'longitude']].dropna()
+    cache = TravelTimeCache(
+        args.cache,
+        osrm_url=args.osrm_url,
+        profile=args.profile,
+        table_size=args.table_size
+    )
+    
+    stored = cache.fill(
+        attractions['id'].to_numpy(np.int64),
+        attractions['latitude'].to_numpy(np.float64),
+        attractions['longitude'].to_numpy(np.float64),
+        refresh=args.refresh
+    )
+    cache.close()
+    logger.info(f"Travel-time cache {args.cache} updated with {stored} pairs")
@@ -0,0 +1,165 @@
+import argparse
+import json
+import logging
+import os
+import time
+import numpy as np
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ['Pantai', 'Budaya', 'Alam', 'Kuliner', 'Belanja', 'Sejarah', 'Religi', 'Hiburan']
+
+# (name, latitude, longitude, spread in degrees) of the regions attractions cluster around
+REGIONS = [
+    ('Bali', -8.45, 115.20, 0.25),
+    ('Yogyakarta', -7.80, 110.37, 0.20),
+    ('Jakarta', -6.20, 106.82, 0.15),
+    ('Bandung', -6.91, 107.61, 0.20),
+    ('Lombok', -8.65, 116.32, 0.25),
+    ('Labuan Bajo', -8.50, 119.89, 0.20),
+    ('Malang', -7.98, 112.63, 0.20),
+    ('Medan', 3.59, 98.67, 0.20)
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate synthetic attractions, preferences and reviews for benchmarking')
+    parser.add_argument('--output-dir', default='data/synthetic',
+                        help='Directory the JSON Lines files are written to')
+    parser.add_argument('--attractions', type=int, default=10000,
+                        help='Number of attractions')
+    parser.add_argument('--users', type=int, default=500000,
+                        help='Number of users')
+    parser.add_argument('--reviews', type=int, default=20000000,
+                        help='Number of reviews')
+    parser.add_argument('--activity-exponent', type=float, default=1.1,
+                        help='Power-law exponent of user activity and attraction popularity')
+    parser.add_argument('--chunk-size', type=int, default=1000000,
+                        help='Rows generated and written per chunk')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed')
+    return parser.parse_args()
+
+def power_law_weights(n, exponent, rng):
+    """
+    Zipf-like sampling weights assigned to entities in random order
+    
+    Args:
+        n: Number of entities
+        exponent: Power-law exponent
+        rng: numpy Generator
+    
+    Returns:
+        Array of n probabilities
+    """
+    weights = np.arange(1, n + 1, dtype=np.float64) ** -exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+def write_attractions(path, count, rng):
+    """
+    Write attractions clustered around tourist regions
+    
+    Returns:
+        Array of attraction quality used to draw ratings
+    """
+    categories = rng.integers(len(CATEGORIES), size=count)
+    regions = rng.integers(len(REGIONS), size=count)
+    quality = np.clip(rng.normal(4.0, 0.5, size=count), 1, 5)
+    total_reviews = rng.zipf(1.5, size=count).clip(max=100000)
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            region_name, latitude, longitude, spread = REGIONS[regions[i]]
+            category = CATEGORIES[categories[i]]
+            record = {
+                'id': i + 1,
+                'name': f"{category} {region_name} {i + 1}",
+                'description': f"Wisata {category.lower()} di {region_name}",
+                'address': f"{region_name}, Indonesia",
+                'latitude': round(float(rng.normal(latitude, spread)), 6),
+                'longitude': round(float(rng.normal(longitude, spread)), 6),
+                'category': category,
+                'images': [],
+                'avg_rating': round(float(quality[i]), 1),
+                'total_reviews': int(total_reviews[i])
+            }
+            f.write(json.dumps(record) + '\n')
+    
+    return quality
+
+def write_preferences(path, count, rng, chunk_size):
+    """
+    Write one preference record per user with 1-3 preferred and 0-1 avoided categories
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, count, chunk_size):
+            lines = []
+            for user_id in range(start + 1, min(start + chunk_size, count) + 1):
+                shuffled = rng.permutation(len(CATEGORIES))
+                num_preferred = int(rng.integers(1, 4))
+                num_avoided = int(rng.integers(0, 2))
+                lines.append(json.dumps({
+                    'user_id': user_id,
+                    'preferred_categories': [CATEGORIES[c] for c in shuffled[:num_preferred]],
+                    'avoided_categories': [
+                        CATEGORIES[c] for c in shuffled[num_preferred:num_preferred + num_avoided]
+                    ],
+                    'budget_level': int(rng.integers(1, 4)),
+                    'activity_level': int(rng.integers(1, 4))
+                }))
+            f.write('\n'.join(lines) + '\n')
+
+def write_reviews(path, count, num_users, num_attractions, quality, exponent, rng, chunk_size):
+    """
+    Write reviews with power-law user activity and attraction popularity
+    
+    Ratings combine the attraction's quality, a per-user bias and noise, so
+    collaborative signals exist; repeated (user, attraction) pairs are kept,
+    as in real review data.
+    """
+    user_weights = power_law_weights(num_users, exponent, rng)
+    attraction_weights = power_law_weights(num_attractions, exponent, rng)
+    user_bias = rng.normal(0, 0.5, size=num_users)
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            users = rng.choice(num_users, size=size, p=user_weights)
+            attractions = rng.choice(num_attractions, size=size, p=attraction_weights)
+            ratings = np.rint(
+                quality[attractions] + user_bias[users] + rng.normal(0, 0.7, size=size)
+            ).clip(1, 5)
+            
+            rows = np.column_stack([
+                np.arange(start + 1, start + size + 1), users + 1, attractions + 1, ratings
+            ]).astype(np.int64)
+            np.savetxt(
+                f, rows,
+                fmt='{"id": %d, "user_id": %d, "tourist_attraction_id": %d, "rating": %d}'
+            )
+            logger.info(f"Wrote {start + size}/{count} reviews")
+
+if __name__ == '__main__':
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    start_time = time.perf_counter()
+    quality = write_attractions(
+        os.path.join(args.output_dir, 'attractions.jsonl'), args.attractions, rng
+    )
+    write_preferences(
+        os.path.join(args.output_dir, 'preferences.jsonl'), args.users, rng, args.chunk_size
+    )
+    write_reviews(
+        os.path.join(args.output_dir, 'reviews.jsonl'), args.reviews, args.users, args.attractions,
+        quality, args.activity_exponent, rng, args.chunk_size
+    )
+    
+    logger.info(f"Generated {args.attractions} attractions, {args.users} users and {args.reviews} "
+                f"reviews in {args.output_dir} in {time.perf_counter() - start_time:.1f}s")
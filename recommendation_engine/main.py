@@ -1,11 +1,23 @@
 import numpy as np
 import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
+from sklearn.preprocessing import MinMaxScaler, normalize
 import logging
 import json
 import os
+import copy
+import shutil
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import heapq
+from itertools import islice
 from datetime import datetime, timedelta
+from travel_time import EARTH_RADIUS_KM, estimate_travel_seconds, haversine_matrix
 
 # Configure logging
 logging.basicConfig(
@@ -14,273 +26,2351 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bump when the layout of exported model artifacts changes
+ARTIFACT_FORMAT_VERSION = 1
+
+def find_data_file(data_dir, name):
+    """
+    Locate an attractions/preferences/reviews export in a data directory
+    
+    JSON Lines exports take precedence over JSON arrays.
+    
+    Args:
+        data_dir: Directory holding the exports
+        name: File name without extension, e.g. 'reviews'
+        
+    Returns:
+        Path of the .jsonl file if it exists, otherwise of the .json file
+    """
+    jsonl_file = os.path.join(data_dir, f'{name}.jsonl')
+    if os.path.exists(jsonl_file):
+        return jsonl_file
+    return os.path.join(data_dir, f'{name}.json')
+
+# Working memory allowed per block of exact neighbour search
+NEIGHBOUR_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+
 class TouristAttractionRecommender:
-    def __init__(self, db_connection=None):
+    def __init__(self, db_connection=None, neighbour_k=20, item_neighbour_n=20,
+                 connection_factory=None, travel_time_cache=None, stage_observer=None,
+                 neighbour_method='exact', lsh_tables=8, lsh_bits=16, lsh_block_size=512,
+                 recommendation_store=None, content_weight=0.5, collaborative_weight=0.5,
+                 similar_attraction_n=20):
+        """
+        Initialize the recommender system
+        
+        Args:
+            db_connection: Database connection object (optional)
+            neighbour_k: Number of similar users kept per user in the neighbour index
+            item_neighbour_n: Number of similar attractions kept per attraction
+            connection_factory: Callable returning a new database connection, used to
+                load tables concurrently (optional)
+            travel_time_cache: TravelTimeCache used to schedule itineraries (optional)
+            stage_observer: Callable receiving (stage, seconds) for each timed stage (optional)
+            neighbour_method: 'exact' for chunked exact cosine neighbours or 'lsh' for
+                approximate neighbours from random-projection LSH
+            lsh_tables: Number of LSH hash tables; more tables raise recall and build time
+            lsh_bits: Hyperplanes per LSH table
+            lsh_block_size: Candidates compared per user and LSH table; larger blocks
+                raise recall and build time
+            recommendation_store: RecommendationStore of precomputed hybrid
+                recommendations served by get_recommendations (optional)
+            content_weight: Default weight of the content score in hybrid ranking
+            collaborative_weight: Default weight of the collaborative score in hybrid ranking
+            similar_attraction_n: Number of content-similar attractions precomputed per attraction
+        """
+        self.db_connection = db_connection
+        self.connection_factory = connection_factory
+        self.travel_time_cache = travel_time_cache
+        self.stage_observer = stage_observer
+        self.recommendation_store = recommendation_store
+        self.attractions_df = None
+        self.user_preferences_df = None
+        self.reviews_df = None
+        self.user_attraction_matrix = None
+        self.matrix_user_ids = None
+        self.matrix_attraction_ids = None
+        self.user_index = {}
+        self.attraction_index = {}
+        self.category_index = {}
+        self.attraction_records = {}
+        self.user_preference_index = {}
+        self.spatial_tree = None
+        self.spatial_attraction_ids = None
+        self.spatial_coordinates = None
+        self.content_weight = content_weight
+        self.collaborative_weight = collaborative_weight
+        self.catalogue_ids = None
+        self.catalogue_category_codes = None
+        self.catalogue_rating_scores = None
+        self.catalogue_column_positions = None
+        self.category_positions = {}
+        self.catalogue_index = {}
+        self.similar_attraction_n = similar_attraction_n
+        self.similar_attraction_rows = None
+        self.similar_attraction_scores = None
+        self.neighbour_k = neighbour_k
+        self.neighbour_method = neighbour_method
+        self.lsh_tables = lsh_tables
+        self.lsh_bits = lsh_bits
+        self.lsh_block_size = lsh_block_size
+        self.user_neighbour_rows = None
+        self.user_neighbour_scores = None
+        self.item_neighbour_n = item_neighbour_n
+        self.item_neighbours = None
+        self.item_neighbour_scores = None
+        self.item_similarity_matrix = None
+        self.als_user_factors = None
+        self.als_item_factors = None
+        self.als_user_index = {}
+        self.als_attraction_ids = None
+        self.watermarks = {}
+        self.snapshot_version = 0
+        self.data_version = None
+        # Users whose ratings or preferences changed through incremental refreshes
+        # since the last full load; their precomputed recommendations are stale
+        self.changed_user_ids = frozenset()
+        logger.info("Recommender system initialized")
+    
+    def clone(self):
+        """
+        Create a shallow copy that shares the loaded state with this recommender
+        
+        Loaded state is never mutated in place, so the clone can be refreshed
+        and published while this instance keeps serving requests.
+        
+        Returns:
+            New TouristAttractionRecommender instance
+        """
+        snapshot = copy.copy(self)
+        snapshot.watermarks = dict(self.watermarks)
+        return snapshot
+    
+    @contextmanager
+    def _stage(self, stage):
+        """
+        Time a block and report it to the stage observer, if one is set
+        
+        Args:
+            stage: Stage name, e.g. 'similarity' or 'candidate_gathering'
+        """
+        if self.stage_observer is None:
+            yield
+            return
+        
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_observer(stage, time.perf_counter() - start)
+    
+    def _compute_data_version(self, *sources):
+        """
+        Derive a short version string identifying the loaded data
+        
+        Unlike snapshot_version, which counts swaps within one process, this is
+        the same in every worker that loaded the same data, so it can key shared
+        caches. Row counts are included because watermarks cannot see deletions.
+        
+        Args:
+            sources: JSON-serializable descriptions of where the data came from
+            
+        Returns:
+            Hex digest string
+        """
+        counts = [
+            len(frame) if frame is not None else 0
+            for frame in (self.attractions_df, self.user_preferences_df, self.reviews_df)
+        ]
+        if self.user_attraction_matrix is not None:
+            counts.append(int(self.user_attraction_matrix.nnz))
+        payload = json.dumps([sources, counts], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+    
+    def load_data_from_db(self):
+        """
+        Load data from database into pandas DataFrames
+        """
+        if not self.db_connection and self.connection_factory is None:
+            logger.error("No database connection provided")
+            return False
+        
+        try:
+            self.watermarks = {}
+            
+            # Load tourist attractions, user preferences and reviews
+            with self._stage('data_load'):
+                frames = self._read_tables()
+                self.attractions_df = frames['tourist_attractions']
+                self.user_preferences_df = frames['user_preferences']
+                self.reviews_df = frames['reviews']
+            
+            # Create user-attraction matrix
+            with self._stage('matrix_build'):
+                self._create_user_attraction_matrix()
+            
+            # Build keyed lookup indexes for the request path
+            with self._stage('index_build'):
+                self._build_lookup_indexes()
+            
+            self.data_version = self._compute_data_version('db', self.watermarks)
+            self.changed_user_ids = frozenset()
+            
+            logger.info(f"Data loaded successfully: {len(self.attractions_df)} attractions, "
+                       f"{len(self.user_preferences_df)} user preferences, "
+                       f"{len(self.reviews_df)} reviews")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error loading data from database: {str(e)}")
+            return False
+    
+    # Columns loaded per table with their compact dtypes, and the key used to upsert
+    # incremental rows. Attraction text columns stay because records are returned
+    # to clients; review comments and unused preference levels are not loaded.
+    DB_TABLES = {
+        'tourist_attractions': {
+            'columns': ['id', 'name', 'description', 'address', 'latitude', 'longitude',
+                        'category', 'images', 'avg_rating', 'total_reviews'],
+            'dtypes': {'id': np.int32, 'latitude': np.float64, 'longitude': np.float64,
+                       'category': 'category', 'avg_rating': np.float32, 'total_reviews': np.int32},
+            'key': 'id',
+        },
+        'user_preferences': {
+            'columns': ['user_id', 'preferred_categories', 'avoided_categories'],
+            'dtypes': {'user_id': np.int32},
+            'key': 'user_id',
+        },
+        'reviews': {
+            'columns': ['id', 'user_id', 'tourist_attraction_id', 'rating'],
+            'dtypes': {'id': np.int64, 'user_id': np.int32,
+                       'tourist_attraction_id': np.int32, 'rating': np.uint8},
+            'key': 'id',
+        },
+    }
+    
+    def _read_tables(self, watermarks=None):
+        """
+        Read every table in DB_TABLES, concurrently when a connection factory is set
+        
+        Concurrent reads need one connection per table, so without a
+        connection_factory the tables are read one after another on db_connection.
+        
+        Args:
+            watermarks: Per-table timestamps to read changes since (optional)
+            
+        Returns:
+            Dictionary mapping table name to DataFrame
+        """
+        watermarks = watermarks or {}
+        
+        if self.connection_factory is None:
+            return {
+                table: self._read_table(table, watermarks.get(table))
+                for table in self.DB_TABLES
+            }
+        
+        def read_with_own_connection(table):
+            connection = self.connection_factory()
+            if connection is None:
+                raise RuntimeError(f"Could not open a database connection for {table}")
+            try:
+                return self._read_table(table, watermarks.get(table), connection=connection)
+            finally:
+                connection.close()
+        
+        with ThreadPoolExecutor(max_workers=len(self.DB_TABLES)) as pool:
+            futures = {table: pool.submit(read_with_own_connection, table) for table in self.DB_TABLES}
+            return {table: future.result() for table, future in futures.items()}
+    
+    def _read_table(self, table, since=None, connection=None, chunk_size=50000):
+        """
+        Stream a table from the database in typed chunks and advance its updated_at watermark
+        
+        Rows are fetched through an unbuffered (server-side) cursor chunk_size
+        rows at a time and cast to compact dtypes as they arrive.
+        
+        Args:
+            table: Table name, one of DB_TABLES
+            since: Only read rows updated at or after this timestamp (optional)
+            connection: Connection to read from, defaults to db_connection
+            chunk_size: Number of rows fetched and converted per chunk
+            
+        Returns:
+            DataFrame with the table's configured columns
+        """
+        config = self.DB_TABLES[table]
+        columns = config['columns'] + ['updated_at']
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        params = None
+        if since is not None:
+            # >= rather than > so rows sharing the watermark second are not missed;
+            # refresh_data_from_db drops the re-read rows that did not change
+            query += " WHERE updated_at >= %s"
+            params = (since,)
+        
+        started = time.perf_counter()
+        chunks = []
+        cursor = (connection or self.db_connection).cursor(buffered=False)
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                chunk = pd.DataFrame.from_records(rows, columns=columns)
+                chunks.append(chunk.astype(config['dtypes']))
+        finally:
+            cursor.close()
+        
+        if chunks:
+            frame = pd.concat(chunks, ignore_index=True)
+        else:
+            frame = pd.DataFrame(columns=columns).astype(config['dtypes'])
+        if 'category' in frame.columns and config['dtypes'].get('category') == 'category':
+            # Chunks carry different category sets, which concat widens to object
+            frame['category'] = frame['category'].astype('category')
+        
+        if len(frame) and frame['updated_at'].notna().any():
+            latest = frame['updated_at'].max()
+            current = self.watermarks.get(table)
+            self.watermarks[table] = latest if current is None else max(current, latest)
+        
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        logger.info(f"Loaded {len(frame)} rows from {table} in {elapsed:.2f}s "
+                   f"({len(frame) / elapsed:.0f} rows/s)")
+        return frame.drop(columns=['updated_at'])
+    
+    def refresh_data_from_db(self):
+        """
+        Incrementally apply rows changed since the last load or refresh
+        
+        New and updated rows are upserted into copies of the frames, indexes and
+        sparse matrix, so a recommender obtained from clone() can be refreshed
+        while the original keeps serving requests unchanged. Neighbour lists are
+        recomputed only for affected users; the item neighbour index is rebuilt
+        because the catalogue is small. Deleted rows are not detected and need a
+        full reload.
+        
+        Returns:
+            True if the refresh succeeded, False otherwise
+        """
+        if not self.db_connection and self.connection_factory is None:
+            logger.error("No database connection provided")
+            return False
+        
+        if self.attractions_df is None or not self.watermarks:
+            logger.info("No watermarks recorded, falling back to a full load")
+            return self.load_data_from_db()
+        
+        try:
+            with self._stage('data_load'):
+                frames = self._read_tables(dict(self.watermarks))
+            # The watermark second is re-read on every refresh, so drop rows that
+            # are already loaded unchanged before they mark users as changed
+            attractions = self._drop_unchanged_rows(self.attractions_df, frames['tourist_attractions'], 'id')
+            preferences = self._drop_unchanged_rows(
+                self.user_preferences_df, frames['user_preferences'], 'user_id'
+            )
+            reviews = self._drop_unchanged_rows(self.reviews_df, frames['reviews'], 'id')
+            
+            if len(attractions):
+                self.attractions_df = self._upsert_frame(self.attractions_df, attractions, 'id')
+                self.attraction_records = dict(self.attraction_records)
+                for record in attractions.to_dict('records'):
+                    self.attraction_records[record['id']] = record
+                self._build_category_index()
+                self._build_spatial_index()
+            
+            if len(preferences):
+                self.user_preferences_df = self._upsert_frame(
+                    self.user_preferences_df, preferences, 'user_id'
+                )
+                self.user_preference_index = dict(self.user_preference_index)
+                self._index_preferences(preferences.drop_duplicates('user_id', keep='last'))
+            
+            if len(reviews):
+                self.reviews_df = self._upsert_frame(self.reviews_df, reviews, 'id')
+                self._apply_rating_updates(reviews)
+            
+            if len(attractions) or len(reviews):
+                self._build_catalogue_arrays()
+            if len(attractions):
+                self._build_content_similarity_index()
+            
+            self.data_version = self._compute_data_version('db', self.watermarks)
+            self.changed_user_ids = self.changed_user_ids.union(
+                preferences['user_id'].tolist() if len(preferences) else (),
+                reviews['user_id'].tolist() if len(reviews) else ()
+            )
+            
+            logger.info(f"Incremental refresh applied: {len(attractions)} attractions, "
+                       f"{len(preferences)} user preferences, {len(reviews)} reviews")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error refreshing data from database: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _drop_unchanged_rows(frame, updates, key):
+        """
+        Keep only the rows of updates that are new or differ from the loaded frame
+        
+        Args:
+            frame: Existing DataFrame
+            updates: DataFrame of rows read since the watermark
+            key: Column identifying a row
+            
+        Returns:
+            DataFrame with the new and changed rows of updates
+        """
+        if frame is None or not len(updates) or key not in frame.columns:
+            return updates
+        updates = updates.drop_duplicates(subset=[key], keep='last').reset_index(drop=True)
+        columns = [column for column in updates.columns if column != key and column in frame.columns]
+        current = frame.drop_duplicates(subset=[key], keep='last')[[key] + columns]
+        merged = updates[[key] + columns].astype(object).merge(
+            current.astype(object), on=key, how='left', suffixes=('', '_current'), indicator=True
+        )
+        changed = (merged['_merge'] == 'left_only').to_numpy(copy=True)
+        for column in columns:
+            new, old = merged[column], merged[f'{column}_current']
+            same = (new == old) | (new.isna() & old.isna())
+            changed |= ~same.to_numpy(dtype=bool)
+        return updates[changed].reset_index(drop=True)
+    
+    @staticmethod
+    def _upsert_frame(frame, updates, key):
+        """
+        Replace rows of a frame by key and append new ones
+        
+        Args:
+            frame: Existing DataFrame
+            updates: DataFrame of new or changed rows
+            key: Column identifying a row
+            
+        Returns:
+            Updated DataFrame
+        """
+        if frame is None or key not in frame.columns:
+            return updates.reset_index(drop=True)
+        updates = updates.drop_duplicates(subset=[key], keep='last')
+        kept = frame[~frame[key].isin(updates[key])]
+        return pd.concat([kept, updates], ignore_index=True)
+    
+    def _apply_rating_updates(self, reviews):
+        """
+        Patch new or changed ratings into the sparse user-attraction matrix
+        
+        Unknown users and attractions are appended as new rows and columns, so
+        existing row/column positions stay valid.
+        
+        Args:
+            reviews: DataFrame of new or changed reviews
+        """
+        if self.user_attraction_matrix is None:
+            with self._stage('matrix_build'):
+                self._create_user_attraction_matrix()
+            return
+        
+        ratings = reviews.drop_duplicates(subset=['user_id', 'tourist_attraction_id'], keep='last')
+        
+        new_users = pd.unique(ratings.loc[~ratings['user_id'].isin(self.user_index.keys()), 'user_id'])
+        new_attractions = pd.unique(ratings.loc[
+            ~ratings['tourist_attraction_id'].isin(self.attraction_index.keys()), 'tourist_attraction_id'
+        ])
+        self.user_index = dict(self.user_index)
+        self.attraction_index = dict(self.attraction_index)
+        for user_id in new_users:
+            self.user_index[user_id] = len(self.user_index)
+        for attraction_id in new_attractions:
+            self.attraction_index[attraction_id] = len(self.attraction_index)
+        self.matrix_user_ids = np.concatenate([self.matrix_user_ids, new_users])
+        self.matrix_attraction_ids = np.concatenate([self.matrix_attraction_ids, new_attractions])
+        
+        matrix = self.user_attraction_matrix.copy()
+        matrix.resize((len(self.matrix_user_ids), len(self.matrix_attraction_ids)))
+        
+        rows = ratings['user_id'].map(self.user_index).to_numpy(dtype=np.int32)
+        cols = ratings['tourist_attraction_id'].map(self.attraction_index).to_numpy(dtype=np.int32)
+        old_values = np.asarray(matrix[rows, cols]).ravel()
+        delta = sparse.csr_matrix(
+            (ratings['rating'].to_numpy(dtype=np.float32) - old_values, (rows, cols)),
+            shape=matrix.shape
+        )
+        self.user_attraction_matrix = (matrix + delta).tocsr()
+        self.user_attraction_matrix.eliminate_zeros()
+        
+        # Refresh neighbour lists of users whose ratings changed
+        affected_rows = np.unique(rows)
+        neighbours, scores = self._similar_user_rows(row_positions=affected_rows)
+        if self.user_neighbour_rows is None or neighbours.shape[1] != self.user_neighbour_rows.shape[1]:
+            # k grows while the user base is smaller than neighbour_k
+            self._build_user_neighbour_index()
+        else:
+            num_users = len(self.matrix_user_ids)
+            neighbour_rows = np.zeros((num_users, neighbours.shape[1]), dtype=np.int32)
+            neighbour_scores = np.full((num_users, neighbours.shape[1]), -np.inf, dtype=np.float32)
+            neighbour_rows[:len(self.user_neighbour_rows)] = self.user_neighbour_rows
+            neighbour_scores[:len(self.user_neighbour_scores)] = self.user_neighbour_scores
+            neighbour_rows[affected_rows] = neighbours
+            neighbour_scores[affected_rows] = scores
+            self.user_neighbour_rows = neighbour_rows
+            self.user_neighbour_scores = neighbour_scores
+        self._build_item_neighbour_index()
+        
+        logger.info(f"Rating matrix patched with {len(ratings)} ratings, {len(new_users)} new users, "
+                   f"{len(new_attractions)} new attractions; shape: {self.user_attraction_matrix.shape}, "
+                   f"nnz: {self.user_attraction_matrix.nnz}")
+    
+    def export_artifact(self, artifact_dir):
+        """
+        Export the loaded frames and derived state to a versioned binary artifact
+        
+        Arrays are written as individual .npy files so they can be memory-mapped
+        by load_artifact, next to a manifest.json describing the artifact and
+        the small attraction and preference tables.
+        
+        Args:
+            artifact_dir: Destination directory
+            
+        Returns:
+            True if the artifact was written, False otherwise
+        """
+        if self.user_attraction_matrix is None or self.attractions_df is None:
+            logger.error("Data not loaded")
+            return False
+        
+        try:
+            # Write into a staging directory and swap it in at the end: truncating
+            # files that running workers have memory-mapped would crash them
+            artifact_dir = os.path.normpath(artifact_dir)
+            final_dir = artifact_dir
+            artifact_dir = f"{final_dir}.staging-{os.getpid()}"
+            shutil.rmtree(artifact_dir, ignore_errors=True)
+            os.makedirs(artifact_dir)
+            matrix = self.user_attraction_matrix
+            arrays = {
+                'matrix_data': matrix.data,
+                'matrix_indices': matrix.indices,
+                'matrix_indptr': matrix.indptr,
+                'matrix_user_ids': np.asarray(self.matrix_user_ids, dtype=np.int64),
+                'matrix_attraction_ids': np.asarray(self.matrix_attraction_ids, dtype=np.int64),
+                'user_neighbour_rows': self.user_neighbour_rows,
+                'user_neighbour_scores': self.user_neighbour_scores,
+                'item_neighbours': self.item_neighbours,
+                'item_neighbour_scores': self.item_neighbour_scores,
+                'similar_attraction_rows': self.similar_attraction_rows,
+                'similar_attraction_scores': self.similar_attraction_scores,
+            }
+            if self.als_user_factors is not None:
+                user_ids = np.array(list(self.als_user_index.keys()), dtype=np.int64)
+                user_rows = np.array(list(self.als_user_index.values()), dtype=np.int64)
+                arrays.update({
+                    'als_user_factors': self.als_user_factors,
+                    'als_item_factors': self.als_item_factors,
+                    'als_user_ids': user_ids[np.argsort(user_rows)],
+                    'als_attraction_ids': np.asarray(self.als_attraction_ids, dtype=np.int64),
+                })
+            
+            manifest = {
+                'format_version': ARTIFACT_FORMAT_VERSION,
+                'created_at': datetime.now().isoformat(),
+                'matrix_shape': list(matrix.shape),
+                'watermarks': {table: str(watermark) for table, watermark in self.watermarks.items()},
+                'arrays': {},
+            }
+            for name, array in arrays.items():
+                if array is None:
+                    continue
+                array = np.ascontiguousarray(array)
+                np.save(os.path.join(artifact_dir, f'{name}.npy'), array, allow_pickle=False)
+                manifest['arrays'][name] = {'dtype': str(array.dtype), 'shape': list(array.shape)}
+            
+            self.attractions_df.to_json(os.path.join(artifact_dir, 'attractions.json'), orient='records')
+            if self.user_preferences_df is not None:
+                self.user_preferences_df.to_json(os.path.join(artifact_dir, 'preferences.json'), orient='records')
+            
+            with open(os.path.join(artifact_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            
+            # Open mappings of the previous artifact stay valid after its files are unlinked
+            previous_dir = f"{final_dir}.previous-{os.getpid()}"
+            if os.path.exists(final_dir):
+                os.rename(final_dir, previous_dir)
+            os.rename(artifact_dir, final_dir)
+            shutil.rmtree(previous_dir, ignore_errors=True)
+            
+            logger.info(f"Model artifact exported to {final_dir} with {len(manifest['arrays'])} arrays")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error exporting model artifact: {str(e)}")
+            return False
+    
+    def load_artifact(self, artifact_dir):
+        """
+        Load a model artifact written by export_artifact
+        
+        Arrays are opened read-only with memory mapping, so workers start without
+        rebuilding anything and share pages through the OS page cache. Lookup
+        indexes over the attraction and preference tables are rebuilt in memory.
+        
+        Args:
+            artifact_dir: Artifact directory
+            
+        Returns:
+            True if the artifact was loaded, False otherwise
+        """
+        try:
+            with open(os.path.join(artifact_dir, 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+            
+            if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+                logger.error(f"Unsupported artifact format version {manifest.get('format_version')}, "
+                            f"expected {ARTIFACT_FORMAT_VERSION}")
+                return False
+            
+            with self._stage('data_load'):
+                arrays = {
+                    name: np.load(os.path.join(artifact_dir, f'{name}.npy'), mmap_mode='r', allow_pickle=False)
+                    for name in manifest['arrays']
+                }
+                
+                self.attractions_df = self._read_json_frame(os.path.join(artifact_dir, 'attractions.json'))
+                preferences_file = os.path.join(artifact_dir, 'preferences.json')
+                if os.path.exists(preferences_file):
+                    self.user_preferences_df = self._read_json_frame(preferences_file)
+                # Raw reviews are not part of the artifact; the matrix carries the ratings
+                self.reviews_df = None
+            
+            self.user_attraction_matrix = sparse.csr_matrix(
+                (arrays['matrix_data'], arrays['matrix_indices'], arrays['matrix_indptr']),
+                shape=tuple(manifest['matrix_shape']),
+                copy=False
+            )
+            self.matrix_user_ids = arrays['matrix_user_ids']
+            self.matrix_attraction_ids = arrays['matrix_attraction_ids']
+            self.user_index = {user_id: row for row, user_id in enumerate(self.matrix_user_ids.tolist())}
+            self.attraction_index = {
+                attraction_id: col for col, attraction_id in enumerate(self.matrix_attraction_ids.tolist())
+            }
+            
+            self.user_neighbour_rows = arrays.get('user_neighbour_rows')
+            self.user_neighbour_scores = arrays.get('user_neighbour_scores')
+            self.item_neighbours = arrays.get('item_neighbours')
+            self.item_neighbour_scores = arrays.get('item_neighbour_scores')
+            self.item_similarity_matrix = None
+            if self.item_neighbours is not None:
+                self._build_item_similarity_matrix()
+            
+            if 'als_user_factors' in arrays:
+                self.als_user_factors = arrays['als_user_factors']
+                self.als_item_factors = arrays['als_item_factors']
+                self.als_user_index = {
+                    user_id: row for row, user_id in enumerate(arrays['als_user_ids'].tolist())
+                }
+                self.als_attraction_ids = arrays['als_attraction_ids']
+            
+            self.watermarks = {
+                table: pd.Timestamp(watermark) for table, watermark in manifest.get('watermarks', {}).items()
+            }
+            
+            # Exported content neighbours are catalogue positions of the exported attractions table
+            similar_attraction_rows = arrays.get('similar_attraction_rows')
+            has_content_similarity = (
+                similar_attraction_rows is not None and len(similar_attraction_rows) == len(self.attractions_df)
+            )
+            with self._stage('index_build'):
+                self._build_lookup_indexes(build_content_similarity=not has_content_similarity)
+            if has_content_similarity:
+                self.similar_attraction_rows = similar_attraction_rows
+                self.similar_attraction_scores = arrays['similar_attraction_scores']
+            
+            self.data_version = self._compute_data_version('artifact', manifest.get('created_at'), self.watermarks)
+            self.changed_user_ids = frozenset()
+            
+            logger.info(f"Model artifact loaded from {artifact_dir} (created {manifest.get('created_at')}): "
+                       f"{len(self.attractions_df)} attractions, matrix shape: {self.user_attraction_matrix.shape}, "
+                       f"nnz: {self.user_attraction_matrix.nnz}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error loading model artifact: {str(e)}")
+            return False
+    
+    # Review columns kept when loading from files, with their compact dtypes
+    REVIEW_FILE_DTYPES = {
+        'id': np.int64,
+        'user_id': np.int32,
+        'tourist_attraction_id': np.int32,
+        'rating': np.float32,
+    }
+    
+    @staticmethod
+    def _iter_json_records(path, buffer_size=1 << 20):
+        """
+        Stream records from a JSON array file or a JSON Lines file
+        
+        JSON arrays are decoded one element at a time from a sliding buffer, so
+        the whole document is never parsed into memory at once.
+        
+        Args:
+            path: Path to the data file
+            buffer_size: Number of characters read per chunk
+            
+        Yields:
+            One decoded record at a time
+        """
+        decoder = json.JSONDecoder()
+        with open(path, 'r') as f:
+            buffer = f.read(buffer_size)
+            while buffer and not buffer.strip():
+                more = f.read(buffer_size)
+                if not more:
+                    break
+                buffer += more
+            stripped = buffer.lstrip()
+            
+            if not stripped.startswith('['):
+                # JSON Lines: one record per line
+                f.seek(0)
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+                return
+            
+            pos = len(buffer) - len(stripped) + 1
+            while True:
+                # Skip separators, refilling the buffer when it runs out
+                while True:
+                    while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                        pos += 1
+                    if pos < len(buffer):
+                        break
+                    more = f.read(buffer_size)
+                    if not more:
+                        raise ValueError(f"Unexpected end of JSON array in {path}")
+                    buffer, pos = more, 0
+                
+                if buffer[pos] == ']':
+                    return
+                
+                try:
+                    record, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The record straddles the buffer boundary
+                    more = f.read(buffer_size)
+                    if not more:
+                        raise
+                    buffer, pos = buffer[pos:] + more, 0
+                    continue
+                
+                yield record
+                
+                if pos > buffer_size:
+                    buffer, pos = buffer[pos:], 0
+    
+    def _read_json_frame(self, path, dtypes=None, chunk_size=100000):
+        """
+        Build a DataFrame from a JSON or JSON Lines file in typed chunks
+        
+        Records are converted to a frame every chunk_size rows, so peak memory
+        stays close to the final columnar representation.
+        
+        Args:
+            path: Path to the data file
+            dtypes: Mapping of column to dtype; when given, other columns are dropped
+            chunk_size: Number of records converted per chunk
+            
+        Returns:
+            DataFrame with the file's records
+        """
+        started = time.perf_counter()
+        chunks = []
+        records = []
+        
+        def flush():
+            frame = pd.DataFrame(records)
+            if dtypes is not None:
+                frame = frame[[column for column in dtypes if column in frame.columns]]
+                frame = frame.astype({column: dtypes[column] for column in frame.columns})
+            chunks.append(frame)
+            records.clear()
+        
+        for record in self._iter_json_records(path):
+            records.append(record)
+            if len(records) >= chunk_size:
+                flush()
+        if records or not chunks:
+            flush()
+        
+        frame = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        logger.info(f"Loaded {len(frame)} rows from {path} in {elapsed:.2f}s "
+                   f"({len(frame) / elapsed:.0f} rows/s)")
+        return frame
+    
+    def load_data_from_files(self, attractions_file, preferences_file, reviews_file):
+        """
+        Load data from JSON or JSON Lines files into pandas DataFrames
+        
+        Args:
+            attractions_file: Path to attractions JSON file
+            preferences_file: Path to user preferences JSON file
+            reviews_file: Path to reviews JSON file
+        """
+        try:
+            # Load tourist attractions
+            with self._stage('data_load'):
+                self.attractions_df = self._read_json_frame(attractions_file)
+                
+                # Load user preferences
+                self.user_preferences_df = self._read_json_frame(preferences_file)
+                
+                # Load reviews, keeping only the compactly typed columns the recommenders use
+                self.reviews_df = self._read_json_frame(reviews_file, dtypes=self.REVIEW_FILE_DTYPES)
+            
+            # Create user-attraction matrix
+            with self._stage('matrix_build'):
+                self._create_user_attraction_matrix()
+            
+            # Build keyed lookup indexes for the request path
+            with self._stage('index_build'):
+                self._build_lookup_indexes()
+            
+            self.data_version = self._compute_data_version('files', [
+                (path, os.path.getsize(path), os.path.getmtime(path))
+                for path in (attractions_file, preferences_file, reviews_file)
+            ])
+            self.changed_user_ids = frozenset()
+            
+            logger.info(f"Data loaded successfully from files: {len(self.attractions_df)} attractions, "
+                       f"{len(self.user_preferences_df)} user preferences, "
+                       f"{len(self.reviews_df)} reviews")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error loading data from files: {str(e)}")
+            return False
+    
+    def _create_user_attraction_matrix(self):
+        """
+        Create a matrix of users and their ratings for attractions
+        """
+        if self.reviews_df is None:
+            logger.warning("Reviews data not loaded")
+            return None
+        
+        # Build a sparse CSR user-attraction matrix with compact id <-> row/column mappings
+        try:
+            # Keep only the latest rating when a user reviewed the same attraction twice
+            ratings = self.reviews_df.drop_duplicates(
+                subset=['user_id', 'tourist_attraction_id'], keep='last'
+            )
+            user_rows, self.matrix_user_ids = pd.factorize(ratings['user_id'], sort=True)
+            attraction_cols, self.matrix_attraction_ids = pd.factorize(
+                ratings['tourist_attraction_id'], sort=True
+            )
+            self.matrix_user_ids = np.asarray(self.matrix_user_ids)
+            self.matrix_attraction_ids = np.asarray(self.matrix_attraction_ids)
+            self.user_index = {user_id: row for row, user_id in enumerate(self.matrix_user_ids)}
+            self.attraction_index = {
+                attraction_id: col for col, attraction_id in enumerate(self.matrix_attraction_ids)
+            }
+            
+            self.user_attraction_matrix = sparse.csr_matrix(
+                (
+                    ratings['rating'].to_numpy(dtype=np.float32),
+                    (user_rows.astype(np.int32), attraction_cols.astype(np.int32))
+                ),
+                shape=(len(self.matrix_user_ids), len(self.matrix_attraction_ids))
+            )
+            
+            matrix = self.user_attraction_matrix
+            memory_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+            logger.info(f"User-attraction matrix created with shape: {matrix.shape}, "
+                       f"nnz: {matrix.nnz}, memory: {memory_bytes / 1024 ** 2:.2f} MB")
+        except Exception as e:
+            logger.error(f"Error creating user-attraction matrix: {str(e)}")
+            return None
+        
+        # The neighbour indexes depend on the matrix, so refresh them whenever the data changes
+        self._build_user_neighbour_index()
+        self._build_item_neighbour_index()
+    
+    def _build_lookup_indexes(self, build_content_similarity=True):
+        """
+        Build the keyed indexes used on the request path instead of DataFrame scans
+        
+        Ratings per user are served from the CSR matrix rows via user_index, so
+        only attraction records, parsed preferences and categories are indexed here.
+        
+        Args:
+            build_content_similarity: Also rebuild the content similarity index;
+                skipped when it was loaded from an artifact
+        """
+        self.attraction_records = {}
+        self.user_preference_index = {}
+        
+        try:
+            if self.attractions_df is not None:
+                self.attraction_records = {
+                    record['id']: record for record in self.attractions_df.to_dict('records')
+                }
+            
+            if self.user_preferences_df is not None:
+                # The first row wins for users with duplicate preference rows
+                self._index_preferences(self.user_preferences_df.drop_duplicates('user_id', keep='first'))
+            
+            logger.info(f"Lookup indexes built for {len(self.attraction_records)} attractions "
+                       f"and {len(self.user_preference_index)} user preferences")
+        except Exception as e:
+            logger.error(f"Error building lookup indexes: {str(e)}")
+            self.attraction_records = {}
+            self.user_preference_index = {}
+        
+        self._build_category_index()
+        self._build_catalogue_arrays()
+        if build_content_similarity:
+            self._build_content_similarity_index()
+        self._build_spatial_index()
+    
+    def _index_preferences(self, preferences):
+        """
+        Parse preference rows into the user_id -> (preferred, avoided) index
+        
+        Args:
+            preferences: DataFrame of user preference rows, one per user
+        """
+        for user_id, preferred, avoided in zip(
+            preferences['user_id'],
+            preferences['preferred_categories'],
+            preferences['avoided_categories']
+        ):
+            self.user_preference_index[user_id] = (
+                list(dict.fromkeys(self._parse_categories(preferred))),
+                set(self._parse_categories(avoided))
+            )
+    
+    def _get_attraction_records(self, attraction_ids):
+        """
+        Materialize attraction records for a list of attraction IDs
+        
+        Args:
+            attraction_ids: Iterable of attraction IDs
+            
+        Returns:
+            List of attraction dictionaries, skipping unknown IDs
+        """
+        return [
+            dict(self.attraction_records[attraction_id])
+            for attraction_id in attraction_ids
+            if attraction_id in self.attraction_records
+        ]
+    
+    def _build_category_index(self):
+        """
+        Build an inverted index from category to attractions pre-sorted by avg_rating
+        
+        Each entry is a list of (negated rating, attraction id) tuples so that
+        heapq.merge can lazily combine several categories in rating order.
+        """
+        self.category_index = {}
+        if self.attractions_df is None:
+            logger.warning("Attractions data not loaded")
+            return
+        
+        try:
+            # Unrated attractions sort last, as sort_values(na_position='last') did
+            sort_keys = -self.attractions_df['avg_rating'].astype(float).fillna(-np.inf).to_numpy()
+            attraction_ids = self.attractions_df['id'].to_numpy()
+            positions = np.arange(len(self.attractions_df))
+            for category, group in pd.Series(positions).groupby(self.attractions_df['category'].to_numpy()):
+                group_positions = group.to_numpy()
+                order = np.argsort(sort_keys[group_positions], kind='stable')
+                self.category_index[category] = list(zip(
+                    sort_keys[group_positions[order]].tolist(),
+                    attraction_ids[group_positions[order]].tolist()
+                ))
+            
+            logger.info(f"Category index built for {len(self.category_index)} categories")
+        except Exception as e:
+            logger.error(f"Error building category index: {str(e)}")
+            self.category_index = {}
+    
+    def _build_catalogue_arrays(self):
+        """
+        Build the catalogue-aligned arrays used by score-blended hybrid ranking
+        
+        Hybrid scores are dense vectors in attractions_df order. Category codes
+        and normalized ratings give the content score directly, and matrix
+        columns are mapped onto catalogue positions so collaborative scores can
+        be scattered into the same vector.
+        """
+        self.catalogue_ids = None
+        self.catalogue_category_codes = None
+        self.catalogue_rating_scores = None
+        self.catalogue_column_positions = None
+        self.category_positions = {}
+        self.catalogue_index = {}
+        if self.attractions_df is None:
+            return
+        
+        try:
+            catalogue_ids = self.attractions_df['id'].to_numpy(dtype=np.int64)
+            codes, categories = pd.factorize(self.attractions_df['category'])
+            ratings = self.attractions_df['avg_rating'].astype(float).fillna(0).to_numpy(dtype=np.float32)
+            if len(ratings) and ratings.max() > 0:
+                ratings = ratings / ratings.max()
+            
+            if self.matrix_attraction_ids is not None:
+                self.catalogue_column_positions = pd.Index(catalogue_ids).get_indexer(self.matrix_attraction_ids)
+            self.category_positions = {category: code for code, category in enumerate(categories)}
+            self.catalogue_category_codes = codes
+            self.catalogue_rating_scores = ratings
+            self.catalogue_index = {attraction_id: position for position, attraction_id in enumerate(catalogue_ids.tolist())}
+            self.catalogue_ids = catalogue_ids
+        except Exception as e:
+            logger.error(f"Error building catalogue arrays: {str(e)}")
+            self.catalogue_ids = None
+    
+    @staticmethod
+    def _split_address(address):
+        # Address parts such as district, regency and province act as region tokens
+        return [part.strip() for part in address.lower().split(',') if part.strip()]
+    
+    def _build_content_features(self, text_weight=1.0, category_weight=0.5, region_weight=0.5):
+        """
+        Build a sparse feature matrix describing each attraction's content
+        
+        Three blocks are stacked, each L2-normalized and scaled by its weight:
+        TF-IDF over name and description words, a one-hot category and TF-IDF
+        over comma-separated address parts, so attractions sharing a regency or
+        province are closer and ubiquitous parts like the country count little.
+        
+        Args:
+            text_weight: Weight of the name/description block
+            category_weight: Weight of the category block
+            region_weight: Weight of the address block
+            
+        Returns:
+            CSR matrix with one L2-normalized row per attraction, in attractions_df order
+        """
+        frame = self.attractions_df
+        blocks = []
+        
+        text = frame['name'].fillna('').astype(str) + ' ' + frame['description'].fillna('').astype(str)
+        if text.str.strip().any():
+            blocks.append(text_weight * normalize(
+                TfidfVectorizer(sublinear_tf=True, dtype=np.float32).fit_transform(text)
+            ))
+        
+        codes = self.catalogue_category_codes
+        known = codes >= 0
+        blocks.append(category_weight * sparse.csr_matrix(
+            (np.ones(known.sum(), dtype=np.float32), (np.flatnonzero(known), codes[known])),
+            shape=(len(frame), max(len(self.category_positions), 1))
+        ))
+        
+        addresses = frame['address'].fillna('').astype(str)
+        if addresses.str.strip().any():
+            blocks.append(region_weight * normalize(
+                TfidfVectorizer(tokenizer=self._split_address, token_pattern=None, lowercase=False,
+                                dtype=np.float32).fit_transform(addresses)
+            ))
+        
+        return normalize(sparse.hstack(blocks, format='csr'))
+    
+    def _build_content_similarity_index(self):
+        """
+        Precompute the top-N content-similar attractions for every attraction
+        
+        Neighbours are stored as dense (attractions, N) arrays of catalogue
+        positions and cosine scores, so serving "more like this" is a row lookup.
+        """
+        self.similar_attraction_rows = None
+        self.similar_attraction_scores = None
+        if self.catalogue_ids is None or len(self.catalogue_ids) < 2:
+            return
+        
+        try:
+            features = self._build_content_features()
+            self.similar_attraction_rows, self.similar_attraction_scores = self._top_k_similar_rows(
+                features, self.similar_attraction_n
+            )
+            
+            logger.info(f"Content similarity index built for {features.shape[0]} attractions "
+                       f"with {features.shape[1]} features and n={self.similar_attraction_rows.shape[1]}")
+        except Exception as e:
+            logger.error(f"Error building content similarity index: {str(e)}")
+            self.similar_attraction_rows = None
+            self.similar_attraction_scores = None
+    
+    def _top_k_similar_rows(self, matrix, k, memory_budget=NEIGHBOUR_MEMORY_BUDGET_BYTES, row_positions=None):
+        """
+        Find the top-K most cosine-similar rows for every row of a matrix
+        
+        Similarities are computed in row chunks so the full rows x rows matrix
+        is never held in memory at once. Each chunk row costs a float64
+        similarity and an int64 partition index per matrix row, so the chunk
+        size is derived from memory_budget.
+        
+        Args:
+            matrix: Sparse or dense matrix whose rows are compared
+            k: Number of neighbours kept per row
+            memory_budget: Approximate bytes of working memory per chunk
+            row_positions: Only compute neighbours for these rows (optional)
+            
+        Returns:
+            Tuple of (neighbour row positions, similarity scores), each of shape
+            (rows, k) and sorted by descending similarity
+        """
+        if row_positions is None:
+            row_positions = np.arange(matrix.shape[0])
+        num_rows = len(row_positions)
+        num_columns = matrix.shape[0]
+        k = min(k, num_columns - 1)
+        if k <= 0:
+            return (np.empty((num_rows, 0), dtype=np.int32),
+                    np.empty((num_rows, 0), dtype=np.float32))
+        
+        chunk_size = max(1, memory_budget // (num_columns * 16))
+        neighbours = np.empty((num_rows, k), dtype=np.int32)
+        scores = np.empty((num_rows, k), dtype=np.float32)
+        for start in range(0, num_rows, chunk_size):
+            chunk = row_positions[start:start + chunk_size]
+            block = cosine_similarity(matrix[chunk], matrix)
+            rows = np.arange(block.shape[0])
+            # Exclude each row from its own neighbour list
+            block[rows, chunk] = -np.inf
+            
+            # The k largest end up after position num_columns - k; no negated copy is made
+            top = np.argpartition(block, num_columns - k, axis=1)[:, num_columns - k:]
+            top_scores = block[rows[:, None], top]
+            order = np.argsort(-top_scores, axis=1)
+            neighbours[start:start + len(rows)] = top[rows[:, None], order]
+            scores[start:start + len(rows)] = top_scores[rows[:, None], order]
+        
+        return neighbours, scores
+    
+    def _lsh_top_k_similar_rows(self, matrix, k, num_tables=8, num_bits=16, block_size=512,
+                                seed=42, row_positions=None):
+        """
+        Find approximate top-K cosine-similar rows with random-projection LSH
+        
+        Each table hashes the L2-normalized rows by the signs of num_bits random
+        projections, so rows at a small angle tend to share a long code prefix.
+        Rows are sorted by code and only compared exactly within consecutive
+        blocks of block_size rows, which replaces the rows x rows pass with
+        rows x block_size work per table. Block boundaries are shifted at random
+        per table so rows near a boundary meet both sides.
+        
+        Args:
+            matrix: Sparse or dense matrix whose rows are compared
+            k: Number of neighbours kept per row
+            num_tables: Number of hash tables; more tables raise recall and cost
+            num_bits: Random hyperplanes per table
+            block_size: Candidates compared per row and table; larger blocks raise
+                recall and cost
+            seed: Random seed for the hyperplanes
+            row_positions: Only compute neighbours for these rows (optional)
+            
+        Returns:
+            Tuple of (neighbour row positions, similarity scores), each of shape
+            (rows, k) and sorted by descending similarity. Slots without a
+            candidate hold row 0 with a score of -inf.
+        """
+        num_rows = matrix.shape[0]
+        if row_positions is None:
+            row_positions = np.arange(num_rows)
+        k = min(k, num_rows - 1)
+        if k <= 0:
+            return (np.empty((len(row_positions), 0), dtype=np.int32),
+                    np.empty((len(row_positions), 0), dtype=np.float32))
+        
+        normalized = normalize(sparse.csr_matrix(matrix, dtype=np.float32))
+        query_slots = np.full(num_rows, -1, dtype=np.int64)
+        query_slots[row_positions] = np.arange(len(row_positions))
+        
+        # Empty slots hold -1 while merging so they never collide with row 0
+        neighbours = np.full((len(row_positions), k), -1, dtype=np.int32)
+        scores = np.full((len(row_positions), k), -np.inf, dtype=np.float32)
+        
+        rng = np.random.default_rng(seed)
+        mean_row = np.asarray(normalized.mean(axis=0)).ravel()
+        bit_values = (1 << np.arange(num_bits - 1, -1, -1)).astype(np.int64)
+        for _ in range(num_tables):
+            hyperplanes = rng.standard_normal((matrix.shape[1], num_bits)).astype(np.float32)
+            # Ratings are non-negative, so hyperplanes through the origin would put
+            # most rows on the same side; projecting around the mean row balances the bits
+            projections = np.asarray(normalized @ hyperplanes) - mean_row @ hyperplanes
+            codes = (projections > 0) @ bit_values
+            
+            # Shuffle first so rows with equal codes are split at random
+            shuffled = rng.permutation(num_rows)
+            order = shuffled[np.argsort(codes[shuffled], kind='stable')]
+            offset = int(rng.integers(block_size))
+            for start in range(-offset, num_rows, block_size):
+                members = order[max(start, 0):start + block_size]
+                queries = members[query_slots[members] >= 0]
+                if len(members) < 2 or len(queries) == 0:
+                    continue
+                self._merge_block_neighbours(
+                    normalized, queries, members, query_slots[queries], neighbours, scores
+                )
+        
+        neighbours[neighbours < 0] = 0
+        return neighbours, scores
+    
+    @staticmethod
+    def _merge_block_neighbours(normalized, queries, members, slots, neighbours, scores):
+        """
+        Score queries against one block and merge the best into the running top-K
+        
+        Args:
+            normalized: L2-normalized CSR matrix
+            queries: Row positions to find neighbours for
+            members: Row positions in the block
+            slots: Output rows of the queries in neighbours/scores
+            neighbours: (queries, K) running neighbour rows, updated in place
+            scores: (queries, K) running scores, updated in place
+        """
+        k = neighbours.shape[1]
+        block = (normalized[queries] @ normalized[members].T).toarray()
+        # Exclude each row from its own neighbour list
+        block[queries[:, None] == members[None, :]] = -np.inf
+        
+        take = min(k, len(members))
+        top = np.argpartition(-block, take - 1, axis=1)[:, :take]
+        rows = np.arange(len(queries))[:, None]
+        candidate_rows = np.concatenate([neighbours[slots], members[top].astype(np.int32)], axis=1)
+        candidate_scores = np.concatenate([scores[slots], block[rows, top]], axis=1)
+        
+        # A pair found by several tables must only be kept once
+        by_row = np.argsort(candidate_rows, axis=1, kind='stable')
+        sorted_rows = np.take_along_axis(candidate_rows, by_row, axis=1)
+        duplicate = np.zeros_like(sorted_rows, dtype=bool)
+        duplicate[:, 1:] = sorted_rows[:, 1:] == sorted_rows[:, :-1]
+        np.put_along_axis(
+            candidate_scores, by_row, np.where(duplicate, -np.inf, np.take_along_axis(candidate_scores, by_row, axis=1)),
+            axis=1
+        )
+        
+        best = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+        neighbours[slots] = np.take_along_axis(candidate_rows, best, axis=1)
+        scores[slots] = np.take_along_axis(candidate_scores, best, axis=1)
+    
+    def _similar_user_rows(self, row_positions=None):
+        """
+        Compute user neighbours with the configured exact or LSH method
+        
+        Args:
+            row_positions: Only compute neighbours for these matrix rows (optional)
+            
+        Returns:
+            Tuple of (neighbour row positions, similarity scores)
+        """
+        if self.neighbour_method == 'lsh':
+            return self._lsh_top_k_similar_rows(
+                self.user_attraction_matrix, self.neighbour_k,
+                num_tables=self.lsh_tables, num_bits=self.lsh_bits,
+                block_size=self.lsh_block_size, row_positions=row_positions
+            )
+        return self._top_k_similar_rows(
+            self.user_attraction_matrix, self.neighbour_k, row_positions=row_positions
+        )
+    
+    def _build_user_neighbour_index(self):
+        """
+        Precompute the top-K most similar users for every user
+        
+        Neighbours are stored as (users, K) arrays of matrix row positions and
+        scores, addressed by user_index, so they can be exported as flat arrays.
+        """
+        self.user_neighbour_rows = None
+        self.user_neighbour_scores = None
+        if self.user_attraction_matrix is None or self.user_attraction_matrix.shape[0] == 0:
+            return
+        
+        try:
+            self.user_neighbour_rows, self.user_neighbour_scores = self._similar_user_rows()
+            
+            logger.info(f"User neighbour index built for {self.user_neighbour_rows.shape[0]} users "
+                       f"with k={self.user_neighbour_rows.shape[1]} ({self.neighbour_method})")
+        except Exception as e:
+            logger.error(f"Error building user neighbour index: {str(e)}")
+            self.user_neighbour_rows = None
+            self.user_neighbour_scores = None
+    
+    def _build_item_neighbour_index(self):
+        """
+        Precompute the top-N most similar attractions for every attraction
+        
+        Neighbour lists are stored as dense (attractions, N) arrays of column
+        positions and scores so a user can be scored with a single scatter-add.
+        """
+        self.item_neighbours = None
+        self.item_neighbour_scores = None
+        self.item_similarity_matrix = None
+        if self.user_attraction_matrix is None or self.user_attraction_matrix.shape[1] == 0:
+            return
+        
+        try:
+            attraction_matrix = self.user_attraction_matrix.T.tocsr()
+            neighbours, scores = self._top_k_similar_rows(attraction_matrix, self.item_neighbour_n)
+            # Negative similarities would push candidates down for liking a dissimilar item
+            self.item_neighbours = neighbours
+            self.item_neighbour_scores = np.maximum(scores, 0)
+            
+            self._build_item_similarity_matrix()
+            
+            logger.info(f"Item neighbour index built for {attraction_matrix.shape[0]} attractions "
+                       f"with n={neighbours.shape[1]}")
+        except Exception as e:
+            logger.error(f"Error building item neighbour index: {str(e)}")
+            self.item_neighbours = None
+            self.item_neighbour_scores = None
+            self.item_similarity_matrix = None
+    
+    def _build_item_similarity_matrix(self):
+        """
+        Expand the item neighbour lists into a sparse attractions x attractions matrix for batch scoring
+        """
+        num_items, num_neighbours = self.item_neighbours.shape
+        self.item_similarity_matrix = sparse.csr_matrix(
+            (
+                np.asarray(self.item_neighbour_scores).ravel(),
+                (np.repeat(np.arange(num_items), num_neighbours), np.asarray(self.item_neighbours).ravel())
+            ),
+            shape=(num_items, num_items)
+        )
+    
+    def _get_user_ratings(self, user_id):
+        """
+        Read a user's rated attractions directly from the sparse matrix row
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Tuple of (attraction ids, ratings) as NumPy arrays
+        """
+        row = self.user_index.get(user_id)
+        if row is None:
+            return self.matrix_attraction_ids[:0], np.empty(0, dtype=np.float32)
+        
+        matrix = self.user_attraction_matrix
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        return self.matrix_attraction_ids[matrix.indices[start:end]], matrix.data[start:end]
+    
+    @staticmethod
+    def _parse_categories(categories):
+        """
+        Normalize a stored category list to a Python list
+        
+        Args:
+            categories: JSON array or comma-separated string (database) or list (JSON files)
+            
+        Returns:
+            List of category names
+        """
+        if isinstance(categories, str):
+            # JSON columns arrive from MySQL as JSON-encoded strings
+            if categories.lstrip().startswith('['):
+                return json.loads(categories)
+            return categories.split(',')
+        if categories is None or (isinstance(categories, float) and np.isnan(categories)):
+            return []
+        return list(categories)
+    
+    @staticmethod
+    def _allowed_mask(attraction_ids, allowed_ids):
+        """
+        Boolean mask of which attraction IDs are in an allowed set
+        
+        Args:
+            attraction_ids: Array of attraction IDs
+            allowed_ids: Set of allowed attraction IDs
+            
+        Returns:
+            Boolean array aligned with attraction_ids
+        """
+        return np.isin(attraction_ids, np.fromiter(allowed_ids, dtype=np.int64, count=len(allowed_ids)))
+    
+    def _build_spatial_index(self):
+        """
+        Build a KD-tree over attraction coordinates for radius and bounding-box queries
+        
+        Points are mapped to unit-sphere 3D coordinates, where straight-line
+        (chord) distance is monotonic in great-circle distance, so radius
+        queries are exact without any projection.
+        """
+        self.spatial_tree = None
+        self.spatial_attraction_ids = None
+        self.spatial_coordinates = None
+        if self.attractions_df is None:
+            return
+        
+        try:
+            coordinates = self.attractions_df[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+            located = np.isfinite(coordinates).all(axis=1)
+            coordinates = coordinates[located]
+            
+            lat, lon = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+            points = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+            
+            self.spatial_tree = cKDTree(points)
+            self.spatial_attraction_ids = self.attractions_df['id'].to_numpy()[located]
+            self.spatial_coordinates = coordinates
+            
+            logger.info(f"Spatial index built for {len(points)} attractions")
+        except Exception as e:
+            logger.error(f"Error building spatial index: {str(e)}")
+            self.spatial_tree = None
+    
+    def _query_radius(self, latitude, longitude, radius_km):
+        """
+        Find attractions within a great-circle radius of a point
+        
+        Args:
+            latitude: Centre latitude in degrees
+            longitude: Centre longitude in degrees
+            radius_km: Radius in kilometres
+            
+        Returns:
+            Tuple of (spatial index positions, distances in km)
+        """
+        lat, lon = np.radians(latitude), np.radians(longitude)
+        centre = [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+        # Chord length on the unit sphere for the requested arc length
+        chord = 2 * np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2)
+        positions = np.array(self.spatial_tree.query_ball_point(centre, chord), dtype=np.int64)
+        
+        # Great-circle distance from the chord length of each match
+        chords = np.linalg.norm(self.spatial_tree.data[positions] - centre, axis=1)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chords / 2, 0, 1))
+        return positions, distances
+    
+    def get_attraction_ids_in_area(self, latitude=None, longitude=None, radius_km=None, bbox=None):
+        """
+        Select attraction IDs by radius and/or bounding box using the spatial index
+        
+        Args:
+            latitude: Centre latitude for a radius filter
+            longitude: Centre longitude for a radius filter
+            radius_km: Radius in kilometres
+            bbox: (min_lat, min_lon, max_lat, max_lon) bounding box
+            
+        Returns:
+            Set of attraction IDs, or None when no area filter was given
+        """
+        if self.spatial_tree is None:
+            return None
+        
+        positions = None
+        if latitude is not None and longitude is not None and radius_km is not None:
+            positions, _ = self._query_radius(latitude, longitude, radius_km)
+        
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            candidates = self.spatial_coordinates if positions is None else self.spatial_coordinates[positions]
+            inside = (
+                (candidates[:, 0] >= min_lat) & (candidates[:, 0] <= max_lat) &
+                (candidates[:, 1] >= min_lon) & (candidates[:, 1] <= max_lon)
+            )
+            positions = np.flatnonzero(inside) if positions is None else positions[inside]
+        
+        if positions is None:
+            return None
+        return set(self.spatial_attraction_ids[positions].tolist())
+    
+    def get_nearby_attractions(self, latitude, longitude, radius_km=10, category=None, limit=20):
+        """
+        Find attractions near a point, closest first
+        
+        Args:
+            latitude: Centre latitude in degrees
+            longitude: Centre longitude in degrees
+            radius_km: Radius in kilometres
+            category: Optional category filter
+            limit: Maximum number of attractions to return
+            
+        Returns:
+            List of attraction dictionaries with an added distance_km
+        """
+        if self.spatial_tree is None:
+            logger.error("Spatial index not built")
+            return []
+        
+        try:
+            positions, distances = self._query_radius(latitude, longitude, radius_km)
+            order = np.argsort(distances, kind='stable')
+            
+            nearby_attractions = []
+            for index in order:
+                record = self.attraction_records.get(self.spatial_attraction_ids[positions[index]])
+                if record is None or (category is not None and record['category'] != category):
+                    continue
+                record = dict(record)
+                record['distance_km'] = round(float(distances[index]), 3)
+                nearby_attractions.append(record)
+                if len(nearby_attractions) >= limit:
+                    break
+            
+            logger.info(f"Found {len(nearby_attractions)} attractions within {radius_km} km of "
+                       f"({latitude}, {longitude})")
+            return nearby_attractions
+        
+        except Exception as e:
+            logger.error(f"Error finding nearby attractions: {str(e)}")
+            return []
+    
+    def get_similar_attractions(self, attraction_id, limit=10):
+        """
+        Get attractions with similar description, category and region
+        
+        Served from the precomputed content similarity index; no feature or
+        similarity computation happens per request.
+        
+        Args:
+            attraction_id: Attraction ID
+            limit: Maximum number of attractions to return
+            
+        Returns:
+            List of attraction dictionaries with a 'similarity' score, most similar
+            first, or None if the attraction is unknown
+        """
+        position = self.catalogue_index.get(attraction_id)
+        if position is None:
+            logger.warning(f"Attraction {attraction_id} not found")
+            return None
+        if self.similar_attraction_rows is None:
+            return []
+        
+        try:
+            rows = self.similar_attraction_rows[position, :max(limit, 0)]
+            scores = self.similar_attraction_scores[position, :max(limit, 0)]
+            keep = scores > 0
+            
+            similar_attractions = []
+            for similar_id, score in zip(self.catalogue_ids[rows[keep]].tolist(), scores[keep].tolist()):
+                record = self.attraction_records.get(similar_id)
+                if record is not None:
+                    similar_attractions.append(dict(record, similarity=round(score, 4)))
+            return similar_attractions
+        
+        except Exception as e:
+            logger.error(f"Error getting similar attractions: {str(e)}")
+            return []
+    
+    def get_content_based_recommendations(self, user_id, top_n=5, allowed_ids=None):
+        """
+        Generate content-based recommendations based on user preferences
+        
+        Args:
+            user_id: User ID
+            top_n: Number of recommendations to return
+            allowed_ids: Only recommend attractions in this set of IDs (optional)
+            
+        Returns:
+            List of recommended attractions
+        """
+        if self.attractions_df is None or self.user_preferences_df is None:
+            logger.error("Data not loaded")
+            return []
+        
+        try:
+            # Get user preferences
+            with self._stage('preference_lookup'):
+                user_prefs = self.user_preference_index.get(user_id)
+            
+            if user_prefs is None:
+                logger.warning(f"No preferences found for user {user_id}")
+                return []
+            
+            preferred_categories, avoided_categories = user_prefs
+            
+            with self._stage('candidate_gathering'):
+                # K-way merge of the pre-sorted preferred category lists, skipping avoided ones
+                category_lists = [
+                    self.category_index[category]
+                    for category in preferred_categories
+                    if category not in avoided_categories and category in self.category_index
+                ]
+                ranked_ids = (attraction_id for _, attraction_id in heapq.merge(*category_lists))
+                if allowed_ids is not None:
+                    ranked_ids = (attraction_id for attraction_id in ranked_ids if attraction_id in allowed_ids)
+                top_ids = list(islice(ranked_ids, max(top_n, 0)))
+                recommended_attractions = self._get_attraction_records(top_ids)
+            
+            logger.info(f"Generated {len(recommended_attractions)} content-based recommendations for user {user_id}")
+            return recommended_attractions
+        
+        except Exception as e:
+            logger.error(f"Error generating content-based recommendations: {str(e)}")
+            return []
+    
+    def get_collaborative_recommendations(self, user_id, top_n=5, method='user', allowed_ids=None):
+        """
+        Generate collaborative filtering recommendations based on similar users
+        
+        Args:
+            user_id: User ID
+            top_n: Number of recommendations to return
+            method: 'user' for user-user filtering, 'item' for item-item filtering
+                or 'als' for the matrix factorization model
+            allowed_ids: Only recommend attractions in this set of IDs (optional)
+            
+        Returns:
+            List of recommended attractions
+        """
+        if method == 'item':
+            return self.get_item_based_recommendations(user_id, top_n=top_n, allowed_ids=allowed_ids)
+        if method == 'als':
+            return self.get_als_recommendations(user_id, top_n=top_n, allowed_ids=allowed_ids)
+        
+        if self.user_attraction_matrix is None:
+            logger.error("User-attraction matrix not created")
+            return []
+        
+        try:
+            row = self.user_index.get(user_id)
+            if row is None or self.user_neighbour_rows is None:
+                logger.warning(f"User {user_id} not found in the matrix")
+                return []
+            
+            with self._stage('similarity'):
+                # Get similar users from the precomputed neighbour index, skipping empty slots
+                neighbour_rows = self.user_neighbour_rows[row][np.isfinite(self.user_neighbour_scores[row])]
+                similar_users = self.matrix_user_ids[neighbour_rows[:5]]
+            
+            with self._stage('candidate_gathering'):
+                # Get attractions rated highly by similar users but not visited by the current user
+                user_attractions = set(self._get_user_ratings(user_id)[0])
+                
+                recommended_attractions = []
+                for similar_user_id in similar_users:
+                    attraction_ids, ratings = self._get_user_ratings(similar_user_id)
+                    similar_user_attractions = attraction_ids[ratings >= 4]
+                    
+                    for attraction_id in similar_user_attractions:
+                        if allowed_ids is not None and attraction_id not in allowed_ids:
+                            continue
+                        if attraction_id not in user_attractions:
+                            attraction_data = self.attraction_records.get(attraction_id)
+                            if attraction_data is not None:
+                                recommended_attractions.append(dict(attraction_data))
+                                if len(recommended_attractions) >= top_n:
+                                    break
+                    
+                    if len(recommended_attractions) >= top_n:
+                        break
+            
+            logger.info(f"Generated {len(recommended_attractions)} collaborative recommendations for user {user_id}")
+            return recommended_attractions
+        
+        except Exception as e:
+            logger.error(f"Error generating collaborative recommendations: {str(e)}")
+            return []
+    
+    def get_item_based_recommendations(self, user_id, top_n=5, allowed_ids=None):
         """
-        Initialize the recommender system
+        Generate item-item collaborative filtering recommendations
+        
+        Each attraction the user rated contributes its precomputed neighbour list,
+        weighted by the user's rating, and the scores are summed per attraction.
         
         Args:
-            db_connection: Database connection object (optional)
+            user_id: User ID
+            top_n: Number of recommendations to return
+            allowed_ids: Only recommend attractions in this set of IDs (optional)
+            
+        Returns:
+            List of recommended attractions
         """
-        self.db_connection = db_connection
-        self.attractions_df = None
-        self.user_preferences_df = None
-        self.reviews_df = None
-        self.user_attraction_matrix = None
-        logger.info("Recommender system initialized")
+        if self.item_neighbours is None:
+            logger.error("Item neighbour index not created")
+            return []
+        
+        try:
+            row = self.user_index.get(user_id)
+            if row is None:
+                logger.warning(f"User {user_id} not found in the matrix")
+                return []
+            
+            with self._stage('similarity'):
+                matrix = self.user_attraction_matrix
+                start, end = matrix.indptr[row], matrix.indptr[row + 1]
+                rated_cols = matrix.indices[start:end]
+                ratings = matrix.data[start:end]
+                
+                # Scatter-add rating-weighted neighbour similarities into one score vector
+                neighbour_cols = self.item_neighbours[rated_cols]
+                weights = self.item_neighbour_scores[rated_cols] * ratings[:, None]
+                scores = np.bincount(
+                    neighbour_cols.ravel(), weights=weights.ravel(), minlength=matrix.shape[1]
+                )
+                scores[rated_cols] = 0
+                if allowed_ids is not None:
+                    scores[~self._allowed_mask(self.matrix_attraction_ids, allowed_ids)] = 0
+            
+            with self._stage('candidate_gathering'):
+                candidates = np.flatnonzero(scores > 0)
+                if len(candidates) > top_n:
+                    candidates = candidates[np.argpartition(-scores[candidates], top_n - 1)[:top_n]]
+                candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+                
+                recommended_attractions = self._get_attraction_records(self.matrix_attraction_ids[candidates].tolist())
+            
+            logger.info(f"Generated {len(recommended_attractions)} item-based recommendations for user {user_id}")
+            return recommended_attractions
+        
+        except Exception as e:
+            logger.error(f"Error generating item-based recommendations: {str(e)}")
+            return []
     
-    def load_data_from_db(self):
+    def _als_solve(self, fixed_factors, ratings, regularization):
         """
-        Load data from database into pandas DataFrames
+        Solve one ALS half-step for every row of a rating matrix
+        
+        Args:
+            fixed_factors: Factor matrix of the side held fixed
+            ratings: CSR matrix whose rows are the entities being solved for
+            regularization: L2 penalty, scaled by each row's number of ratings
+            
+        Returns:
+            Factor matrix for the rows of `ratings`
         """
-        if not self.db_connection:
-            logger.error("No database connection provided")
+        num_factors = fixed_factors.shape[1]
+        identity = np.eye(num_factors, dtype=np.float32)
+        solved = np.zeros((ratings.shape[0], num_factors), dtype=np.float32)
+        
+        for row in range(ratings.shape[0]):
+            start, end = ratings.indptr[row], ratings.indptr[row + 1]
+            if start == end:
+                continue
+            factors = fixed_factors[ratings.indices[start:end]]
+            gram = factors.T @ factors + regularization * (end - start) * identity
+            solved[row] = np.linalg.solve(gram, factors.T @ ratings.data[start:end])
+        
+        return solved
+    
+    def train_als_model(self, factors=32, regularization=0.1, iterations=15, seed=42):
+        """
+        Train an explicit-feedback ALS matrix factorization model on the rating matrix
+        
+        Args:
+            factors: Number of latent factors
+            regularization: L2 regularization strength
+            iterations: Number of alternating passes
+            seed: Random seed for the item factor initialization
+            
+        Returns:
+            True if training succeeded, False otherwise
+        """
+        if self.user_attraction_matrix is None:
+            logger.error("User-attraction matrix not created")
             return False
         
         try:
-            # Load tourist attractions
-            attractions_query = """
-                SELECT id, name, description, address, latitude, longitude, 
-                       category, images, avg_rating, total_reviews
-                FROM tourist_attractions
-            """
-            self.attractions_df = pd.read_sql(attractions_query, self.db_connection)
-            
-            # Load user preferences
-            preferences_query = """
-                SELECT user_id, preferred_categories, avoided_categories, 
-                       budget_level, activity_level
-                FROM user_preferences
-            """
-            self.user_preferences_df = pd.read_sql(preferences_query, self.db_connection)
-            
-            # Load reviews
-            reviews_query = """
-                SELECT user_id, tourist_attraction_id, rating, comment
-                FROM reviews
-            """
-            self.reviews_df = pd.read_sql(reviews_query, self.db_connection)
+            user_matrix = self.user_attraction_matrix
+            item_matrix = user_matrix.T.tocsr()
+            coo = user_matrix.tocoo()
             
-            # Create user-attraction matrix
-            self._create_user_attraction_matrix()
+            rng = np.random.default_rng(seed)
+            item_factors = rng.normal(
+                scale=0.1, size=(user_matrix.shape[1], factors)
+            ).astype(np.float32)
             
-            logger.info(f"Data loaded successfully: {len(self.attractions_df)} attractions, "
-                       f"{len(self.user_preferences_df)} user preferences, "
-                       f"{len(self.reviews_df)} reviews")
+            for iteration in range(iterations):
+                user_factors = self._als_solve(item_factors, user_matrix, regularization)
+                item_factors = self._als_solve(user_factors, item_matrix, regularization)
+                
+                predictions = np.einsum('ij,ij->i', user_factors[coo.row], item_factors[coo.col])
+                rmse = np.sqrt(np.mean((predictions - coo.data) ** 2))
+                logger.info(f"ALS iteration {iteration + 1}/{iterations}: train RMSE {rmse:.4f}")
+            
+            self.als_user_factors = user_factors
+            self.als_item_factors = item_factors
+            self.als_user_index = dict(self.user_index)
+            self.als_attraction_ids = self.matrix_attraction_ids.copy()
+            
+            logger.info(f"ALS model trained with {factors} factors for "
+                       f"{user_matrix.shape[0]} users and {user_matrix.shape[1]} attractions")
             return True
         
         except Exception as e:
-            logger.error(f"Error loading data from database: {str(e)}")
+            logger.error(f"Error training ALS model: {str(e)}")
             return False
     
-    def load_data_from_files(self, attractions_file, preferences_file, reviews_file):
+    def save_als_model(self, path):
         """
-        Load data from JSON files into pandas DataFrames
+        Persist the trained ALS factors and their id mappings
         
         Args:
-            attractions_file: Path to attractions JSON file
-            preferences_file: Path to user preferences JSON file
-            reviews_file: Path to reviews JSON file
+            path: Destination .npz file
+            
+        Returns:
+            True if the model was saved, False otherwise
         """
+        if self.als_user_factors is None:
+            logger.error("ALS model not trained")
+            return False
+        
         try:
-            # Load tourist attractions
-            with open(attractions_file, 'r') as f:
-                attractions_data = json.load(f)
-            self.attractions_df = pd.DataFrame(attractions_data)
-            
-            # Load user preferences
-            with open(preferences_file, 'r') as f:
-                preferences_data = json.load(f)
-            self.user_preferences_df = pd.DataFrame(preferences_data)
-            
-            # Load reviews
-            with open(reviews_file, 'r') as f:
-                reviews_data = json.load(f)
-            self.reviews_df = pd.DataFrame(reviews_data)
-            
-            # Create user-attraction matrix
-            self._create_user_attraction_matrix()
-            
-            logger.info(f"Data loaded successfully from files: {len(self.attractions_df)} attractions, "
-                       f"{len(self.user_preferences_df)} user preferences, "
-                       f"{len(self.reviews_df)} reviews")
+            user_ids = np.array(list(self.als_user_index.keys()))
+            user_rows = np.array(list(self.als_user_index.values()), dtype=np.int64)
+            np.savez(
+                path,
+                user_factors=self.als_user_factors,
+                item_factors=self.als_item_factors,
+                user_ids=user_ids[np.argsort(user_rows)],
+                attraction_ids=self.als_attraction_ids
+            )
+            logger.info(f"ALS model saved to {path}")
             return True
         
         except Exception as e:
-            logger.error(f"Error loading data from files: {str(e)}")
+            logger.error(f"Error saving ALS model: {str(e)}")
             return False
     
-    def _create_user_attraction_matrix(self):
-        """
-        Create a matrix of users and their ratings for attractions
+    def load_als_model(self, path):
         """
-        if self.reviews_df is None:
-            logger.warning("Reviews data not loaded")
-            return None
+        Load ALS factors previously written by save_als_model
         
-        # Pivot the reviews dataframe to create a user-attraction matrix
+        Args:
+            path: Source .npz file
+            
+        Returns:
+            True if the model was loaded, False otherwise
+        """
         try:
-            self.user_attraction_matrix = self.reviews_df.pivot(
-                index='user_id',
-                columns='tourist_attraction_id',
-                values='rating'
-            ).fillna(0)
+            with np.load(path, allow_pickle=False) as model:
+                self.als_user_factors = model['user_factors']
+                self.als_item_factors = model['item_factors']
+                self.als_user_index = {
+                    user_id: row for row, user_id in enumerate(model['user_ids'].tolist())
+                }
+                self.als_attraction_ids = model['attraction_ids']
             
-            logger.info(f"User-attraction matrix created with shape: {self.user_attraction_matrix.shape}")
+            logger.info(f"ALS model loaded from {path} with {self.als_item_factors.shape[1]} factors")
+            return True
+        
         except Exception as e:
-            logger.error(f"Error creating user-attraction matrix: {str(e)}")
+            logger.error(f"Error loading ALS model: {str(e)}")
+            return False
     
-    def get_content_based_recommendations(self, user_id, top_n=5):
+    def get_als_recommendations(self, user_id, top_n=5, allowed_ids=None):
         """
-        Generate content-based recommendations based on user preferences
+        Generate recommendations from the ALS latent-factor model
         
         Args:
             user_id: User ID
             top_n: Number of recommendations to return
+            allowed_ids: Only recommend attractions in this set of IDs (optional)
             
         Returns:
             List of recommended attractions
         """
-        if self.attractions_df is None or self.user_preferences_df is None:
-            logger.error("Data not loaded")
+        if self.als_user_factors is None:
+            logger.error("ALS model not trained or loaded")
             return []
         
         try:
-            # Get user preferences
-            user_prefs = self.user_preferences_df[self.user_preferences_df['user_id'] == user_id]
-            
-            if len(user_prefs) == 0:
-                logger.warning(f"No preferences found for user {user_id}")
+            row = self.als_user_index.get(user_id)
+            if row is None:
+                logger.warning(f"User {user_id} not found in the ALS model")
                 return []
             
-            # Extract preferred categories
-            preferred_categories = user_prefs['preferred_categories'].iloc[0]
-            if isinstance(preferred_categories, str):
-                preferred_categories = preferred_categories.split(',')
-            
-            # Extract avoided categories
-            avoided_categories = user_prefs['avoided_categories'].iloc[0]
-            if isinstance(avoided_categories, str):
-                avoided_categories = avoided_categories.split(',')
-            elif avoided_categories is None:
-                avoided_categories = []
-            
-            # Filter attractions by preferred categories and exclude avoided categories
-            filtered_attractions = self.attractions_df[
-                (self.attractions_df['category'].isin(preferred_categories)) &
-                (~self.attractions_df['category'].isin(avoided_categories))
-            ]
+            with self._stage('similarity'):
+                scores = self.als_item_factors @ self.als_user_factors[row]
+                
+                # Mask attractions the user has already rated
+                if self.user_attraction_matrix is not None:
+                    rated_ids = self._get_user_ratings(user_id)[0]
+                    scores[np.isin(self.als_attraction_ids, rated_ids)] = -np.inf
+                if allowed_ids is not None:
+                    scores[~self._allowed_mask(self.als_attraction_ids, allowed_ids)] = -np.inf
             
-            # Sort by rating and return top N
-            recommended_attractions = filtered_attractions.sort_values(
-                by='avg_rating', ascending=False
-            ).head(top_n)
+            with self._stage('candidate_gathering'):
+                top_n = min(top_n, int(np.isfinite(scores).sum()))
+                if top_n <= 0:
+                    return []
+                candidates = np.argpartition(-scores, top_n - 1)[:top_n]
+                candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+                
+                recommended_attractions = self._get_attraction_records(self.als_attraction_ids[candidates].tolist())
             
-            logger.info(f"Generated {len(recommended_attractions)} content-based recommendations for user {user_id}")
-            return recommended_attractions.to_dict('records')
+            logger.info(f"Generated {len(recommended_attractions)} ALS recommendations for user {user_id}")
+            return recommended_attractions
         
         except Exception as e:
-            logger.error(f"Error generating content-based recommendations: {str(e)}")
+            logger.error(f"Error generating ALS recommendations: {str(e)}")
             return []
     
-    def get_collaborative_recommendations(self, user_id, top_n=5):
+    def _category_flags(self, user_ids):
         """
-        Generate collaborative filtering recommendations based on similar users
+        Per-user preferred and avoided category flags over catalogue category codes
+        
+        Args:
+            user_ids: List of user IDs
+            
+        Returns:
+            Tuple of (users, categories + 1) boolean arrays of preferred and
+            avoided categories; the extra last slot is the code of attractions
+            without a category
+        """
+        preferred = np.zeros((len(user_ids), len(self.category_positions) + 1), dtype=bool)
+        avoided = np.zeros_like(preferred)
+        for i, user_id in enumerate(user_ids):
+            preferred_categories, avoided_categories = self.user_preference_index.get(user_id, ((), ()))
+            for category in preferred_categories:
+                if category in self.category_positions:
+                    preferred[i, self.category_positions[category]] = True
+            for category in avoided_categories:
+                if category in self.category_positions:
+                    avoided[i, self.category_positions[category]] = True
+        return preferred, avoided
+    
+    def _rated_mask(self, rows):
+        """
+        Mark the catalogue positions each user has already rated
+        
+        Args:
+            rows: Array of matrix row positions
+            
+        Returns:
+            (users, attractions) boolean array over the catalogue
+        """
+        rated = np.zeros((len(rows), len(self.catalogue_ids)), dtype=bool)
+        if self.catalogue_column_positions is None or len(rows) == 0:
+            return rated
+        
+        matrix = self.user_attraction_matrix
+        owners, entries = self._row_entries(matrix, rows)
+        positions = self.catalogue_column_positions[matrix.indices[entries]]
+        valid = positions >= 0
+        rated[owners[valid], positions[valid]] = True
+        return rated
+    
+    @staticmethod
+    def _row_entries(matrix, rows):
+        """
+        Gather the CSR entry offsets of several matrix rows
+        
+        Gathering offsets directly is much cheaper than fancy-indexing a
+        handful of rows out of a large matrix.
+        
+        Args:
+            matrix: CSR matrix
+            rows: Array of row positions
+            
+        Returns:
+            Tuple of (index into rows of each entry, entry offsets into
+            matrix.data and matrix.indices)
+        """
+        starts = matrix.indptr[rows]
+        lengths = matrix.indptr[rows + 1] - starts
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.repeat(np.arange(len(rows)), lengths), entries
+    
+    def _collaborative_scores(self, rows):
+        """
+        Score the catalogue for several users from their precomputed neighbours
+        
+        Each neighbour adds similarity x rating to the attractions it rated 4 or
+        higher, and every user's scores are scaled to a maximum of 1.
+        
+        Args:
+            rows: Array of matrix row positions
+            
+        Returns:
+            (users, attractions) array of collaborative scores over the catalogue
+        """
+        num_attractions = len(self.catalogue_ids)
+        if self.user_neighbour_rows is None or self.catalogue_column_positions is None or len(rows) == 0:
+            return np.zeros((len(rows), num_attractions))
+        
+        matrix = self.user_attraction_matrix
+        similarities = self.user_neighbour_scores[rows]
+        keep = np.isfinite(similarities) & (similarities > 0)
+        # Boolean indexing is row-major, so neighbours stay grouped by user
+        users = np.nonzero(keep)[0]
+        neighbour_owners, entries = self._row_entries(matrix, self.user_neighbour_rows[rows][keep])
+        ratings = matrix.data[entries]
+        positions = self.catalogue_column_positions[matrix.indices[entries]]
+        
+        # Scatter-add similarity x rating of highly rated attractions per (user, catalogue position)
+        weights = similarities[keep][neighbour_owners] * ratings
+        liked = (ratings >= 4) & (positions >= 0)
+        bins = users[neighbour_owners[liked]] * num_attractions + positions[liked]
+        scores = np.bincount(
+            bins, weights=weights[liked], minlength=len(rows) * num_attractions
+        ).reshape(len(rows), num_attractions)
+        
+        row_max = scores.max(axis=1, keepdims=True)
+        np.divide(scores, row_max, out=scores, where=row_max > 0)
+        return scores
+    
+    @staticmethod
+    def _top_positions(scores, top_n):
+        """
+        Pick the positions of the top_n positive scores, best first
+        
+        Args:
+            scores: 1-D array of blended scores
+            top_n: Number of positions to return
+            
+        Returns:
+            Array of positions into scores
+        """
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_n:
+            candidates = candidates[np.argpartition(-scores[candidates], top_n - 1)[:top_n]]
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+    
+    def get_hybrid_recommendations(self, user_id, top_n=10, allowed_ids=None,
+                                   content_weight=None, collaborative_weight=None):
+        """
+        Generate hybrid recommendations by blending content and collaborative scores
+        
+        A content score (preferred category x normalized rating) and a user-user
+        collaborative score (neighbour similarity x rating, over attractions the
+        neighbours rated 4 or higher) are computed as vectors over the whole
+        catalogue and blended. Visited, avoided and disallowed attractions are
+        masked, the top_n are picked with argpartition and only those are
+        materialized as records.
         
         Args:
             user_id: User ID
             top_n: Number of recommendations to return
+            allowed_ids: Only recommend attractions in this set of IDs (optional)
+            content_weight: Weight of the content score (defaults to the recommender's)
+            collaborative_weight: Weight of the collaborative score (defaults to the recommender's)
             
         Returns:
             List of recommended attractions
         """
-        if self.user_attraction_matrix is None:
-            logger.error("User-attraction matrix not created")
+        if self.catalogue_ids is None:
+            logger.error("Data not loaded")
             return []
         
+        if content_weight is None:
+            content_weight = self.content_weight
+        if collaborative_weight is None:
+            collaborative_weight = self.collaborative_weight
+        
         try:
-            if user_id not in self.user_attraction_matrix.index:
-                logger.warning(f"User {user_id} not found in the matrix")
-                return []
+            with self._stage('preference_lookup'):
+                preferred, avoided = self._category_flags([user_id])
             
-            # Calculate similarity between users
-            user_similarity = cosine_similarity(self.user_attraction_matrix)
-            user_similarity_df = pd.DataFrame(
-                user_similarity,
-                index=self.user_attraction_matrix.index,
-                columns=self.user_attraction_matrix.index
-            )
-            
-            # Get similar users
-            similar_users = user_similarity_df[user_id].sort_values(ascending=False)[1:6]
-            
-            # Get attractions rated highly by similar users but not visited by the current user
-            user_attractions = set(self.reviews_df[self.reviews_df['user_id'] == user_id]['tourist_attraction_id'])
-            
-            recommended_attractions = []
-            for similar_user_id in similar_users.index:
-                similar_user_attractions = self.reviews_df[
-                    (self.reviews_df['user_id'] == similar_user_id) &
-                    (self.reviews_df['rating'] >= 4)
-                ]['tourist_attraction_id']
+            with self._stage('similarity'):
+                codes = self.catalogue_category_codes
+                content_scores = self.catalogue_rating_scores * preferred[0, codes]
+                excluded = avoided[0, codes]
                 
-                for attraction_id in similar_user_attractions:
-                    if attraction_id not in user_attractions:
-                        attraction_data = self.attractions_df[
-                            self.attractions_df['id'] == attraction_id
-                        ]
-                        if not attraction_data.empty:
-                            recommended_attractions.append(attraction_data.iloc[0].to_dict())
-                            if len(recommended_attractions) >= top_n:
-                                break
+                collaborative_scores = np.zeros(len(self.catalogue_ids))
+                row = self.user_index.get(user_id)
+                if row is not None:
+                    rows = np.array([row])
+                    excluded |= self._rated_mask(rows)[0]
+                    collaborative_scores = self._collaborative_scores(rows)[0]
+            
+            with self._stage('candidate_gathering'):
+                scores = content_weight * content_scores + collaborative_weight * collaborative_scores
+                scores[excluded] = 0
+                if allowed_ids is not None:
+                    scores[~self._allowed_mask(self.catalogue_ids, allowed_ids)] = 0
                 
-                if len(recommended_attractions) >= top_n:
-                    break
+                candidates = self._top_positions(scores, top_n)
+                recommended_attractions = self._get_attraction_records(self.catalogue_ids[candidates].tolist())
             
-            logger.info(f"Generated {len(recommended_attractions)} collaborative recommendations for user {user_id}")
+            logger.info(f"Generated {len(recommended_attractions)} hybrid recommendations for user {user_id}")
             return recommended_attractions
         
         except Exception as e:
-            logger.error(f"Error generating collaborative recommendations: {str(e)}")
+            logger.error(f"Error generating hybrid recommendations: {str(e)}")
             return []
     
-    def get_hybrid_recommendations(self, user_id, top_n=10):
+    def get_recommendations(self, user_id, top_n=10):
         """
-        Generate hybrid recommendations combining content-based and collaborative filtering
+        Serve hybrid recommendations, from the precomputed store when possible
+        
+        Users missing from the store, with ratings or preferences changed since
+        the data was loaded, or asking for more than the store holds are
+        computed online with get_hybrid_recommendations.
         
         Args:
             user_id: User ID
             top_n: Number of recommendations to return
             
         Returns:
-            List of recommended attractions
+            Tuple of (list of recommended attractions, 'precomputed' or 'online')
+        """
+        if self.recommendation_store is not None and user_id not in self.changed_user_ids:
+            try:
+                with self._stage('store_lookup'):
+                    attraction_ids = self.recommendation_store.get(user_id, top_n)
+                    recommendations = None
+                    # Attractions removed since the store was written force an online recompute
+                    if attraction_ids is not None and all(
+                        attraction_id in self.attraction_records for attraction_id in attraction_ids
+                    ):
+                        recommendations = self._get_attraction_records(attraction_ids)
+                if recommendations is not None:
+                    return recommendations, 'precomputed'
+            except Exception as e:
+                logger.error(f"Error reading precomputed recommendations: {str(e)}")
+        
+        return self.get_hybrid_recommendations(user_id, top_n=top_n), 'online'
+    
+    def get_batch_recommendations(self, user_ids, top_n=10, content_weight=None,
+                                  collaborative_weight=None, batch_size=512):
+        """
+        Generate hybrid recommendations for many users in catalogue-sized blocks
+        
+        Scores are the same content and user-neighbour blend as
+        get_hybrid_recommendations, computed for a whole block of users at once
+        from the prebuilt catalogue arrays, so every user gets exactly their
+        single-user hybrid recommendations.
+        
+        Args:
+            user_ids: List of user IDs
+            top_n: Number of recommendations per user
+            content_weight: Weight of the content-based score (defaults to the recommender's)
+            collaborative_weight: Weight of the collaborative score (defaults to the recommender's)
+            batch_size: Number of users scored per block
+            
+        Returns:
+            Dictionary mapping each user ID to its list of recommended attractions
         """
+        if self.catalogue_ids is None:
+            logger.error("Data not loaded")
+            return {}
+        
+        if content_weight is None:
+            content_weight = self.content_weight
+        if collaborative_weight is None:
+            collaborative_weight = self.collaborative_weight
+        
         try:
-            # Get content-based recommendations
-            content_recs = self.get_content_based_recommendations(user_id, top_n=top_n//2)
+            codes = self.catalogue_category_codes
+            results = {}
+            for start in range(0, len(user_ids), batch_size):
+                block_ids = list(user_ids[start:start + batch_size])
+                
+                with self._stage('preference_lookup'):
+                    preferred, avoided = self._category_flags(block_ids)
+                
+                with self._stage('similarity'):
+                    content_scores = self.catalogue_rating_scores * preferred[:, codes]
+                    excluded = avoided[:, codes]
+                    
+                    collaborative_scores = np.zeros((len(block_ids), len(self.catalogue_ids)))
+                    rows = np.array([self.user_index.get(user_id, -1) for user_id in block_ids], dtype=np.int64)
+                    known = np.flatnonzero(rows >= 0)
+                    if len(known):
+                        excluded[known] |= self._rated_mask(rows[known])
+                        collaborative_scores[known] = self._collaborative_scores(rows[known])
+                
+                with self._stage('candidate_gathering'):
+                    scores = content_weight * content_scores + collaborative_weight * collaborative_scores
+                    scores[excluded] = 0
+                    for i, user_id in enumerate(block_ids):
+                        candidates = self._top_positions(scores[i], top_n)
+                        results[user_id] = self._get_attraction_records(self.catalogue_ids[candidates].tolist())
             
-            # Get collaborative recommendations
-            collab_recs = self.get_collaborative_recommendations(user_id, top_n=top_n//2)
+            logger.info(f"Generated batch recommendations for {len(results)} users")
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error generating batch recommendations: {str(e)}")
+            return {}
+    
+    @staticmethod
+    def _sweep_clusters(latitudes, longitudes, num_groups, group_size):
+        """
+        Split points into geographically compact groups of at most group_size
+        
+        Points are swept by bearing around their centroid, starting after the
+        widest angular gap so no group straddles a dense area, and cut into
+        consecutive groups in sweep order.
+        
+        Args:
+            latitudes: Array of latitudes in degrees
+            longitudes: Array of longitudes in degrees
+            num_groups: Number of groups
+            group_size: Maximum points per group
             
-            # Combine recommendations
-            hybrid_recs = content_recs + collab_recs
+        Returns:
+            List of index arrays, one per group
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        # Scale longitude so bearings are not distorted away from the equator
+        bearings = np.arctan2(lat - lat.mean(), (lon - lon.mean()) * np.cos(np.radians(lat.mean())))
+        order = np.argsort(bearings)
+        if len(order) > 1:
+            sorted_bearings = bearings[order]
+            gaps = np.diff(np.append(sorted_bearings, sorted_bearings[0] + 2 * np.pi))
+            order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+        return [order[day * group_size:(day + 1) * group_size] for day in range(num_groups)]
+    
+    @staticmethod
+    def _optimize_route(distances):
+        """
+        Order an open route with nearest-neighbour construction and 2-opt improvement
+        
+        The route starts at node 0, so callers put the attraction that should be
+        visited first (the highest ranked) at index 0.
+        
+        Args:
+            distances: Symmetric (n, n) distance matrix
             
-            # Remove duplicates
-            seen = set()
-            unique_recs = []
-            for rec in hybrid_recs:
-                if rec['id'] not in seen:
-                    seen.add(rec['id'])
-                    unique_recs.append(rec)
+        Returns:
+            Tuple of (visiting order as index array, total route length)
+        """
+        num_nodes = len(distances)
+        if num_nodes <= 2:
+            route = np.arange(num_nodes)
+            return route, float(distances[0, 1]) if num_nodes == 2 else 0.0
+        
+        # Nearest-neighbour construction
+        route = [0]
+        unvisited = np.ones(num_nodes, dtype=bool)
+        unvisited[0] = False
+        for _ in range(num_nodes - 1):
+            candidates = np.where(unvisited, distances[route[-1]], np.inf)
+            next_node = int(np.argmin(candidates))
+            route.append(next_node)
+            unvisited[next_node] = False
+        route = np.array(route)
+        
+        # 2-opt on an open path: reversing route[i:j+1] replaces edges (i-1, i) and
+        # (j, j+1) with (i-1, j) and (i, j+1); the last edge is absent when j is the end
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, num_nodes - 1):
+                j = np.arange(i + 1, num_nodes)
+                before, first = route[i - 1], route[i]
+                last = route[j]
+                after = np.append(route[j[:-1] + 1], -1)
+                has_after = after >= 0
+                old = distances[before, first] + np.where(has_after, distances[last, after], 0)
+                new = distances[before, last] + np.where(has_after, distances[first, after], 0)
+                gains = old - new
+                best = int(np.argmax(gains))
+                if gains[best] > 1e-9:
+                    route[i:j[best] + 1] = route[i:j[best] + 1][::-1]
+                    improved = True
+        
+        length = float(distances[route[:-1], route[1:]].sum())
+        return route, length
+    
+    def _plan_route_days(self, attractions, coordinates, num_days, attractions_per_day):
+        """
+        Cluster attractions into per-day groups and order each day's route
+        
+        Args:
+            attractions: Ranked attraction dictionaries
+            coordinates: (n, 2) array of latitude/longitude
+            num_days: Number of days
+            attractions_per_day: Maximum attractions per day
             
-            logger.info(f"Generated {len(unique_recs)} hybrid recommendations for user {user_id}")
-            return unique_recs[:top_n]
+        Returns:
+            Tuple of (per-day attraction lists, per-day travel distances in km)
+        """
+        distances = haversine_matrix(coordinates[:, 0], coordinates[:, 1])
+        groups = self._sweep_clusters(coordinates[:, 0], coordinates[:, 1], num_days, attractions_per_day)
         
-        except Exception as e:
-            logger.error(f"Error generating hybrid recommendations: {str(e)}")
-            return []
+        day_groups = []
+        day_distances = []
+        for group in groups:
+            if len(group) == 0:
+                day_groups.append([])
+                day_distances.append(0.0)
+                continue
+            # Start each day at its highest ranked attraction
+            group = np.sort(group)
+            route, length = self._optimize_route(distances[np.ix_(group, group)])
+            day_groups.append([attractions[index] for index in group[route]])
+            day_distances.append(length)
+        
+        return day_groups, day_distances
+    
+    def _travel_time_matrix(self, attractions, speed_kmh=30):
+        """
+        Pairwise travel times between attractions
+        
+        Uses the persistent travel-time cache when one is configured and a
+        haversine x speed estimate otherwise.
+        
+        Args:
+            attractions: Attraction dictionaries
+            speed_kmh: Average speed of the estimate when no cache is configured
+            
+        Returns:
+            (n, n) matrix of travel times in seconds
+        """
+        latitudes = [attr['latitude'] for attr in attractions]
+        longitudes = [attr['longitude'] for attr in attractions]
+        
+        if self.travel_time_cache is not None:
+            matrix, hits = self.travel_time_cache.get_matrix(
+                [attr['id'] for attr in attractions], latitudes, longitudes
+            )
+            pairs = len(attractions) * (len(attractions) - 1)
+            if hits < pairs:
+                logger.info(f"Travel time cache missed {pairs - hits} of {pairs} pairs, using estimates")
+        else:
+            matrix = estimate_travel_seconds(latitudes, longitudes, speed_kmh)
+            np.fill_diagonal(matrix, 0)
+        
+        if not np.isfinite(matrix).all():
+            logger.warning("Missing coordinates, scheduling unknown travel times as zero")
+            matrix = np.nan_to_num(matrix, nan=0.0, posinf=0.0)
+        return matrix
+    
+    @staticmethod
+    def _schedule_day(day_positions, travel_seconds, day_start, day_end, visit_minutes):
+        """
+        Fit a day's attractions into time slots in visiting order
+        
+        Each visit starts after travelling from the previous attraction; visits
+        that would end after day_end are left out for the caller to reschedule.
+        
+        Args:
+            day_positions: Positions of the day's attractions in travel_seconds, in visiting order
+            travel_seconds: (n, n) matrix of travel times in seconds
+            day_start: datetime at which the first visit starts
+            day_end: datetime by which the last visit must end
+            visit_minutes: Duration of each visit
+            
+        Returns:
+            List of (position, visit start, visit end, travel minutes from previous)
+        """
+        schedule = []
+        current_time = day_start
+        previous = None
+        for position in day_positions:
+            travel_minutes = 0 if previous is None else int(np.ceil(travel_seconds[previous, position] / 60))
+            visit_start = current_time + timedelta(minutes=travel_minutes)
+            visit_end = visit_start + timedelta(minutes=visit_minutes)
+            if visit_end > day_end:
+                continue
+            schedule.append((position, visit_start, visit_end, travel_minutes))
+            current_time = visit_end
+            previous = position
+        return schedule
     
-    def generate_itinerary(self, user_id, start_date, end_date, location=None):
+    def generate_itinerary(self, user_id, start_date, end_date, location=None,
+                           optimize_route=False, attractions_per_day=3,
+                           latitude=None, longitude=None, radius_km=None, bbox=None,
+                           day_start='09:00', day_end='21:00', visit_minutes=120):
         """
         Generate an itinerary based on user preferences and dates
         
@@ -289,25 +2379,40 @@ class TouristAttractionRecommender:
             start_date: Start date (YYYY-MM-DD)
             end_date: End date (YYYY-MM-DD)
             location: Optional location filter
+            optimize_route: Group attractions into geographically compact days and
+                order each day to minimize travel distance
+            attractions_per_day: Maximum number of attractions per day
+            latitude: Centre latitude of an optional radius filter
+            longitude: Centre longitude of an optional radius filter
+            radius_km: Radius of the radius filter in kilometres
+            bbox: Optional (min_lat, min_lon, max_lat, max_lon) bounding box filter
+            day_start: Time of the first visit each day (HH:MM)
+            day_end: Time by which the last visit must end (HH:MM)
+            visit_minutes: Duration of each visit
             
         Returns:
-            Dictionary containing itinerary details
+            Dictionary containing itinerary details; attractions that fit into
+            no day are listed under unscheduled_attractions
         """
         try:
+            # Restrict candidates before ranking so filters don't starve the itinerary
+            allowed_ids = self.get_attraction_ids_in_area(latitude, longitude, radius_km, bbox)
+            if location:
+                matches = self.attractions_df['address'].fillna('').str.contains(
+                    location, case=False, regex=False
+                )
+                location_ids = set(self.attractions_df.loc[matches, 'id'].tolist())
+                allowed_ids = location_ids if allowed_ids is None else allowed_ids & location_ids
+            
             # Get recommendations for the user
-            recommended_attractions = self.get_hybrid_recommendations(user_id, top_n=20)
+            recommended_attractions = self.get_hybrid_recommendations(
+                user_id, top_n=20, allowed_ids=allowed_ids
+            )
             
             if not recommended_attractions:
                 logger.warning(f"No recommendations found for user {user_id}")
                 return {}
             
-            # Filter by location if provided
-            if location:
-                recommended_attractions = [
-                    attr for attr in recommended_attractions 
-                    if location.lower() in attr['address'].lower()
-                ]
-            
             # Calculate number of days
             start = datetime.strptime(start_date, '%Y-%m-%d')
             end = datetime.strptime(end_date, '%Y-%m-%d')
@@ -323,8 +2428,35 @@ class TouristAttractionRecommender:
                 'days': []
             }
             
-            attractions_per_day = min(3, len(recommended_attractions) // num_days)
+            attractions_per_day = min(attractions_per_day, len(recommended_attractions) // num_days)
+            selected = recommended_attractions[:attractions_per_day * num_days]
+            
+            day_groups = [
+                selected[day*attractions_per_day:(day+1)*attractions_per_day] for day in range(num_days)
+            ]
+            # Distances between selected attractions, set when routes are optimized
+            route_distances = None
+            if optimize_route and selected:
+                coordinates = np.array(
+                    [[attr['latitude'], attr['longitude']] for attr in selected], dtype=np.float64
+                )
+                if np.isfinite(coordinates).all():
+                    with self._stage('route_planning'):
+                        day_groups, _ = self._plan_route_days(
+                            selected, coordinates, num_days, attractions_per_day
+                        )
+                    route_distances = haversine_matrix(coordinates[:, 0], coordinates[:, 1])
+                else:
+                    logger.warning("Missing coordinates, keeping ranked itinerary order")
+            
+            positions = {attr['id']: i for i, attr in enumerate(selected)}
+            with self._stage('travel_times'):
+                travel_seconds = self._travel_time_matrix(selected)
+            day_start_time = datetime.strptime(day_start, '%H:%M').time()
+            day_end_time = datetime.strptime(day_end, '%H:%M').time()
             
+            carried_over = []
+            total_distance = 0.0
             for day in range(num_days):
                 current_date = start + timedelta(days=day)
                 
@@ -334,16 +2466,44 @@ class TouristAttractionRecommender:
                     'attractions': []
                 }
                 
-                # Morning, afternoon, evening slots
-                time_slots = ['09:00 - 11:00', '13:00 - 15:00', '16:00 - 18:00']
+                day_positions = [positions[attr['id']] for attr in day_groups[day]]
+                carried_positions = [positions[attr['id']] for attr in carried_over]
+                if carried_positions and route_distances is not None:
+                    # Route visits that did not fit into earlier days into this day's route,
+                    # which still starts at its planned first stop, instead of ahead of it
+                    day_positions = day_positions[:1] + sorted(day_positions[1:] + carried_positions)
+                    route, _ = self._optimize_route(route_distances[np.ix_(day_positions, day_positions)])
+                    day_positions = [day_positions[i] for i in route]
+                else:
+                    # Carried visits are higher ranked, so in ranked order they come first
+                    day_positions = carried_positions + day_positions
                 
-                day_attractions = recommended_attractions[day*attractions_per_day:(day+1)*attractions_per_day]
+                schedule = self._schedule_day(
+                    day_positions,
+                    travel_seconds,
+                    datetime.combine(current_date.date(), day_start_time),
+                    datetime.combine(current_date.date(), day_end_time),
+                    visit_minutes
+                )[:attractions_per_day]
+                scheduled = [position for position, _, _, _ in schedule]
+                carried_over = [selected[position] for position in day_positions if position not in scheduled]
+                if route_distances is not None:
+                    # Distances describe the visits actually scheduled, not the planned group
+                    day_distance = float(route_distances[scheduled[:-1], scheduled[1:]].sum())
+                    day_plan['travel_distance_km'] = round(day_distance, 2)
+                    total_distance += day_distance
+                if carried_over:
+                    logger.info(f"Carrying {len(carried_over)} attractions that did not fit into "
+                               f"day {day + 1} over to the next day")
+                day_plan['travel_minutes'] = sum(travel_minutes for _, _, _, travel_minutes in schedule)
                 
-                for i, attraction in enumerate(day_attractions):
+                for position, visit_start, visit_end, travel_minutes in schedule:
+                    attraction = selected[position]
                     day_plan['attractions'].append({
                         'attraction_id': attraction['id'],
                         'name': attraction['name'],
-                        'time_slot': time_slots[i] if i < len(time_slots) else '19:00 - 21:00',
+                        'time_slot': f"{visit_start.strftime('%H:%M')} - {visit_end.strftime('%H:%M')}",
+                        'travel_minutes': travel_minutes,
                         'notes': f"Kunjungan ke {attraction['name']}",
                         'category': attraction['category'],
                         'address': attraction['address'],
@@ -353,6 +2513,15 @@ class TouristAttractionRecommender:
                 
                 itinerary['days'].append(day_plan)
             
+            if route_distances is not None:
+                itinerary['total_travel_distance_km'] = round(total_distance, 2)
+            
+            # Visits that fit into no day are listed rather than silently dropped
+            itinerary['unscheduled_attractions'] = [
+                {'attraction_id': attraction['id'], 'name': attraction['name']}
+                for attraction in carried_over
+            ]
+            
             logger.info(f"Generated itinerary for user {user_id} from {start_date} to {end_date}")
             return itinerary
         
@@ -0,0 +1,123 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from api import build_snapshot
+from recommendation_store import write_store
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Recommender shared with forked workers, loaded once in the parent
+job_recommender = None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Precompute hybrid recommendations for every user')
+    parser.add_argument('--output', default=os.getenv('RECOMMENDATION_STORE_DIR', 'data/recommendations'),
+                        help='Destination recommendation store directory')
+    parser.add_argument('--top-n', type=int, default=10,
+                        help='Number of recommendations stored per user')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes')
+    parser.add_argument('--shard-size', type=int, default=5000,
+                        help='Number of users per shard handed to a worker')
+    parser.add_argument('--batch-size', type=int, default=512,
+                        help='Number of users scored per vectorized block within a shard')
+    return parser.parse_args()
+
+def compute_shard(shard, user_ids, top_n, batch_size):
+    """
+    Compute hybrid recommendations for one shard of users in a worker
+    
+    Users are scored in vectorized blocks of batch_size with
+    get_batch_recommendations, which matches get_hybrid_recommendations.
+    
+    Returns:
+        Tuple of (shard number, (users, top_n) attraction ID array padded with -1,
+        seconds spent)
+    """
+    start = time.perf_counter()
+    user_ids = [int(user_id) for user_id in user_ids]
+    batch = job_recommender.get_batch_recommendations(user_ids, top_n=top_n, batch_size=batch_size)
+    if len(batch) != len(user_ids):
+        raise RuntimeError(f"Batch recommendations failed for shard {shard}")
+    
+    recommendations = np.full((len(user_ids), top_n), -1, dtype=np.int64)
+    for i, user_id in enumerate(user_ids):
+        attraction_ids = [rec['id'] for rec in batch[user_id]]
+        recommendations[i, :len(attraction_ids)] = attraction_ids
+    return shard, recommendations, time.perf_counter() - start
+
+def materialize(recommender, top_n, processes, shard_size, batch_size=512):
+    """
+    Compute hybrid top-N for every known user across a process pool
+    
+    Returns:
+        Tuple of (user IDs, recommendations array, per-shard timings)
+    """
+    global job_recommender
+    job_recommender = recommender
+    
+    user_ids = np.asarray(recommender.matrix_user_ids, dtype=np.int64)
+    if recommender.user_preferences_df is not None:
+        # Users with preferences but no ratings still get content-based recommendations
+        user_ids = np.union1d(user_ids, recommender.user_preferences_df['user_id'].to_numpy(dtype=np.int64))
+    shards = [user_ids[start:start + shard_size] for start in range(0, len(user_ids), shard_size)]
+    recommendations = np.full((len(user_ids), top_n), -1, dtype=np.int64)
+    timings = []
+    
+    # fork shares the loaded recommender with workers copy-on-write instead of reloading it per worker
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        futures = [
+            executor.submit(compute_shard, shard, shard_user_ids, top_n, batch_size)
+            for shard, shard_user_ids in enumerate(shards)
+        ]
+        for future in as_completed(futures):
+            shard, shard_recommendations, seconds = future.result()
+            offset = shard * shard_size
+            recommendations[offset:offset + len(shard_recommendations)] = shard_recommendations
+            timings.append({'shard': shard, 'users': len(shard_recommendations), 'seconds': seconds})
+            logger.info(f"Shard {shard + 1}/{len(shards)}: {len(shard_recommendations)} users in {seconds:.2f}s "
+                       f"({len(shard_recommendations) / seconds:.0f} users/s)")
+    
+    return user_ids, recommendations, sorted(timings, key=lambda timing: timing['shard'])
+
+if __name__ == '__main__':
+    args = parse_args()
+    
+    recommender = build_snapshot()
+    if recommender is None:
+        raise SystemExit("Failed to load data")
+    
+    # Quiet per-user logging so it doesn't dominate the job output
+    logging.getLogger('main').setLevel(logging.WARNING)
+    
+    start = time.perf_counter()
+    user_ids, recommendations, timings = materialize(
+        recommender, args.top_n, args.processes, args.shard_size, args.batch_size
+    )
+    elapsed = time.perf_counter() - start
+    
+    shard_seconds = np.array([timing['seconds'] for timing in timings]) if timings else np.zeros(1)
+    summary = {
+        'data_version': recommender.data_version,
+        'processes': args.processes,
+        'elapsed_s': elapsed,
+        'throughput_per_s': len(user_ids) / elapsed if elapsed else 0.0,
+        'shard_p50_s': float(np.percentile(shard_seconds, 50)),
+        'shard_max_s': float(shard_seconds.max()),
+        'shards': timings
+    }
+    write_store(args.output, user_ids, recommendations, metadata=summary)
+    
+    logger.info(f"Materialized recommendations for {len(user_ids)} users in {elapsed:.1f}s "
+                f"({summary['throughput_per_s']:.0f} users/s) over {len(timings)} shards; "
+                f"shard p50 {summary['shard_p50_s']:.2f}s, max {summary['shard_max_s']:.2f}s")
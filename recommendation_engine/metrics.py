@@ -0,0 +1,118 @@
+import os
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Same names as the API's other services, so the existing per-route panels include this one
+REQUEST_COUNT = Counter(
+    'http_requests_total', 'HTTP requests handled', ['route', 'method', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ['route', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+STAGE_LATENCY = Histogram(
+    'recommender_stage_duration_seconds', 'Time spent in each recommender stage', ['stage'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 120, 600)
+)
+DATA_ROWS = Gauge(
+    'recommender_data_rows', 'Rows loaded per table in the published snapshot', ['table'],
+    multiprocess_mode='liveall'
+)
+MATRIX_SIZE = Gauge(
+    'recommender_matrix_size', 'User-attraction matrix dimensions and stored ratings', ['dimension'],
+    multiprocess_mode='liveall'
+)
+SNAPSHOT_VERSION = Gauge(
+    'recommender_snapshot_version', 'Version of the published recommender snapshot',
+    multiprocess_mode='liveall'
+)
+
+def observe_stage(stage, seconds):
+    """
+    Stage observer passed to TouristAttractionRecommender
+    
+    Args:
+        stage: Stage name
+        seconds: Time spent in the stage
+    """
+    STAGE_LATENCY.labels(stage=stage).observe(seconds)
+
+def observe_request(route, method, status, seconds):
+    REQUEST_COUNT.labels(route=route, method=method, status=str(status)).inc()
+    REQUEST_LATENCY.labels(route=route, method=method).observe(seconds)
+
+def record_snapshot(snapshot):
+    """
+    Export the size of a newly published snapshot
+    
+    Args:
+        snapshot: TouristAttractionRecommender that was just published
+    """
+    SNAPSHOT_VERSION.set(snapshot.snapshot_version)
+    for table, frame in (
+        ('tourist_attractions', snapshot.attractions_df),
+        ('user_preferences', snapshot.user_preferences_df),
+        ('reviews', snapshot.reviews_df)
+    ):
+        if frame is not None:
+            DATA_ROWS.labels(table=table).set(len(frame))
+    
+    matrix = snapshot.user_attraction_matrix
+    if matrix is not None:
+        MATRIX_SIZE.labels(dimension='users').set(matrix.shape[0])
+        MATRIX_SIZE.labels(dimension='attractions').set(matrix.shape[1])
+        MATRIX_SIZE.labels(dimension='nnz').set(matrix.nnz)
+
+class CacheCollector:
+    def __init__(self, cache):
+        """
+        Expose ResponseCache statistics at scrape time
+        
+        Args:
+            cache: ResponseCache instance
+        """
+        self.cache = cache
+    
+    def collect(self):
+        stats = self.cache.stats()
+        labels = [stats['backend']]
+        
+        hits = CounterMetricFamily('recommendation_cache_hits', 'Response cache hits', labels=['backend'])
+        hits.add_metric(labels, stats['hits'])
+        misses = CounterMetricFamily('recommendation_cache_misses', 'Response cache misses', labels=['backend'])
+        misses.add_metric(labels, stats['misses'])
+        size = GaugeMetricFamily('recommendation_cache_entries', 'In-process response cache entries',
+                                 labels=['backend'])
+        size.add_metric(labels, stats['size'])
+        return [hits, misses, size]
+
+cache_collectors = []
+
+def register_cache(cache):
+    collector = CacheCollector(cache)
+    REGISTRY.register(collector)
+    cache_collectors.append(collector)
+
+def render():
+    """
+    Render all metrics in the Prometheus text format
+    
+    When PROMETHEUS_MULTIPROC_DIR is set, metrics written by every worker
+    process are aggregated, as required behind gunicorn or the ASGI pool.
+    
+    Returns:
+        Tuple of (body, content type)
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # Cache statistics are per process, so the scraped process reports its own
+        for collector in cache_collectors:
+            registry.register(collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
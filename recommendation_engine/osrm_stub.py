@@ -0,0 +1,160 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from travel_time import TravelTimeCache, estimate_travel_seconds
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Stub durations use a different speed than the cache's fallback estimate, so
+# cached and estimated pairs can be told apart
+STUB_SPEED_KMH = 40
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Serve a stub OSRM /table endpoint, or check TravelTimeCache against it'
+    )
+    parser.add_argument('--port', type=int, default=5001,
+                        help='Port the stub listens on')
+    parser.add_argument('--check', action='store_true',
+                        help='Fill a temporary cache from the stub and verify get_matrix, then exit')
+    parser.add_argument('--attractions', type=int, default=25,
+                        help='Number of random attractions used by --check')
+    parser.add_argument('--table-size', type=int, default=7,
+                        help='Sources and destinations per /table request used by --check')
+    return parser.parse_args()
+
+def stub_durations(coordinates, sources, destinations):
+    """
+    Durations the stub returns for a /table request
+    
+    Args:
+        coordinates: List of (latitude, longitude) pairs
+        sources: Indexes of the source coordinates
+        destinations: Indexes of the destination coordinates
+    
+    Returns:
+        Nested list of (sources, destinations) durations in seconds
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    seconds = estimate_travel_seconds(coordinates[:, 0], coordinates[:, 1], STUB_SPEED_KMH, detour_factor=1.0)
+    return np.round(seconds[np.ix_(sources, destinations)], 1).tolist()
+
+class TableHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # /table/v1/{profile}/{lon,lat;lon,lat;...}?sources=...&destinations=...
+        # urlsplit, unlike urlparse, keeps the ;-separated coordinates in the path
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 4 or parts[0] != 'table':
+            self._send(404, {'code': 'InvalidUrl', 'message': f'Unknown path {url.path}'})
+            return
+        
+        try:
+            coordinates = [
+                (float(lat), float(lon))
+                for lon, lat in (location.split(',') for location in parts[3].split(';'))
+            ]
+            query = parse_qs(url.query)
+            sources = [int(i) for i in query['sources'][0].split(';')] if 'sources' in query else list(range(len(coordinates)))
+            destinations = ([int(i) for i in query['destinations'][0].split(';')]
+                            if 'destinations' in query else list(range(len(coordinates))))
+            durations = stub_durations(coordinates, sources, destinations)
+        except (ValueError, IndexError) as e:
+            self._send(400, {'code': 'InvalidQuery', 'message': str(e)})
+            return
+        
+        self._send(200, {'code': 'Ok', 'durations': durations})
+    
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def check(num_attractions, table_size):
+    """
+    Fill a temporary cache from an in-process stub and verify the lookups
+    
+    Returns:
+        True if every check passed, False otherwise
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TableHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    rng = np.random.default_rng(42)
+    attraction_ids = rng.choice(100000, size=num_attractions, replace=False)
+    latitudes = rng.uniform(-8.8, -8.1, size=num_attractions)
+    longitudes = rng.uniform(114.4, 115.7, size=num_attractions)
+    expected = np.array(stub_durations(list(zip(latitudes, longitudes)),
+                                       range(num_attractions), range(num_attractions)))
+    pairs = num_attractions * (num_attractions - 1)
+    
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TravelTimeCache(
+            os.path.join(directory, 'travel_times.sqlite'),
+            osrm_url=f'http://127.0.0.1:{server.server_address[1]}',
+            table_size=table_size
+        )
+        try:
+            stored = cache.fill(attraction_ids, latitudes, longitudes)
+            if stored != pairs:
+                failures.append(f"fill stored {stored} pairs, expected {pairs}")
+            
+            # A subset in another order must map every pair back to the right cell;
+            # the stub sees coordinates rounded to 6 decimals, hence the tolerance
+            subset = rng.permutation(num_attractions)[:max(2, num_attractions // 2)]
+            matrix, hits = cache.get_matrix(attraction_ids[subset], latitudes[subset], longitudes[subset])
+            if hits != len(subset) * (len(subset) - 1):
+                failures.append(f"get_matrix hit {hits} pairs, expected {len(subset) * (len(subset) - 1)}")
+            if not np.allclose(matrix, expected[np.ix_(subset, subset)], atol=0.5):
+                failures.append("get_matrix durations differ from the stub")
+            
+            # Unknown attractions fall back to the haversine estimate
+            fallback, hits = cache.get_matrix([-1, -2], latitudes[:2], longitudes[:2])
+            estimate = estimate_travel_seconds(latitudes[:2], longitudes[:2], cache.speed_kmh)
+            if hits != 0 or not np.isclose(fallback[0, 1], estimate[0, 1]):
+                failures.append("uncached pairs did not fall back to the estimate")
+            
+            stored = cache.fill(attraction_ids, latitudes, longitudes)
+            if stored != 0:
+                failures.append(f"second fill stored {stored} pairs, expected cached tiles to be skipped")
+            stored = cache.fill(attraction_ids, latitudes, longitudes, refresh=True)
+            if stored != pairs:
+                failures.append(f"refresh stored {stored} pairs, expected {pairs}")
+        finally:
+            cache.close()
+            server.shutdown()
+    
+    for failure in failures:
+        logger.error(failure)
+    if not failures:
+        logger.info(f"Travel-time cache check passed for {num_attractions} attractions "
+                    f"in {table_size} x {table_size} tiles")
+    return not failures
+
+if __name__ == '__main__':
+    args = parse_args()
+    
+    if args.check:
+        raise SystemExit(0 if check(args.attractions, args.table_size) else 1)
+    
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), TableHandler)
+    logger.info(f"Stub OSRM /table endpoint listening on port {args.port}")
+    server.serve_forever()
@@ -0,0 +1,105 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    def __init__(self, output_dir, interval=0.005, max_seconds=300):
+        """
+        Wall-clock sampling profiler that writes collapsed stacks
+        
+        While running, a background thread samples the stacks of all other
+        threads every interval seconds. The result is written in the collapsed
+        format ("frame;frame;frame count") that flamegraph.pl and speedscope
+        read directly.
+        
+        Args:
+            output_dir: Directory profiles are written to
+            interval: Seconds between samples
+            max_seconds: Upper bound on the duration of request-count profiles
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._max_requests = None
+        self._requests = 0
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, seconds=None, requests=None):
+        """
+        Profile for a number of seconds or until a number of requests finished
+        
+        Args:
+            seconds: Profiling duration
+            requests: Number of requests to profile; checked via request_finished()
+        
+        Returns:
+            Path the profile will be written to, or None if one is already running
+        """
+        with self._lock:
+            if self.running:
+                return None
+            
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(
+                self.output_dir, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.collapsed"
+            )
+            self._stop.clear()
+            self._max_requests = requests
+            self._requests = 0
+            self._thread = threading.Thread(
+                target=self._run, args=(path, seconds), name='sampling-profiler', daemon=True
+            )
+            self._thread.start()
+            logger.info(f"Sampling profiler started for "
+                        f"{f'{seconds}s' if seconds else f'{requests} requests'}, writing {path}")
+            return path
+    
+    def request_finished(self):
+        if self._max_requests is None or not self.running:
+            return
+        with self._lock:
+            self._requests += 1
+            if self._requests >= self._max_requests:
+                self._stop.set()
+    
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+    
+    def _run(self, path, seconds):
+        samples = Counter()
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + min(seconds or self.max_seconds, self.max_seconds)
+        num_samples = 0
+        
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    samples[self._collapse(frame)] += 1
+            num_samples += 1
+            self._stop.wait(self.interval)
+        
+        try:
+            with open(path, 'w') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Sampling profiler wrote {num_samples} samples of {len(samples)} stacks to {path}")
+        except Exception as e:
+            logger.error(f"Error writing profile: {str(e)}")
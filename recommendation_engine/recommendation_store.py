@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+
+def write_store(store_dir, user_ids, recommendations, metadata=None):
+    """
+    Write precomputed recommendations to a memory-mappable store directory
+    
+    Like the model artifact, the store is written to a staging directory and
+    swapped in, so workers that have the previous store mapped keep reading
+    it until they reload.
+    
+    Args:
+        store_dir: Destination directory
+        user_ids: Array of user IDs
+        recommendations: (users, top_n) array of attraction IDs aligned with
+            user_ids, padded with -1
+        metadata: Extra JSON-serializable fields for the manifest (optional)
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    order = np.argsort(user_ids, kind='stable')
+    user_ids = user_ids[order]
+    recommendations = np.ascontiguousarray(np.asarray(recommendations, dtype=np.int64)[order])
+    
+    store_dir = os.path.normpath(store_dir)
+    staging_dir = f"{store_dir}.staging-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    
+    np.save(os.path.join(staging_dir, 'user_ids.npy'), user_ids, allow_pickle=False)
+    np.save(os.path.join(staging_dir, 'recommendations.npy'), recommendations, allow_pickle=False)
+    # Dense user ID -> row table gives a constant-time lookup when IDs are compact
+    if len(user_ids) and 0 <= user_ids[0] and user_ids[-1] < 4 * len(user_ids) + 1024:
+        user_rows = np.full(int(user_ids[-1]) + 1, -1, dtype=np.int32)
+        user_rows[user_ids] = np.arange(len(user_ids), dtype=np.int32)
+        np.save(os.path.join(staging_dir, 'user_rows.npy'), user_rows, allow_pickle=False)
+    
+    manifest = dict(metadata or {})
+    manifest.update({
+        'format_version': STORE_FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'users': len(user_ids),
+        'top_n': recommendations.shape[1] if recommendations.ndim == 2 else 0,
+    })
+    with open(os.path.join(staging_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    
+    previous_dir = f"{store_dir}.previous-{os.getpid()}"
+    if os.path.exists(store_dir):
+        os.rename(store_dir, previous_dir)
+    os.rename(staging_dir, store_dir)
+    shutil.rmtree(previous_dir, ignore_errors=True)
+    logger.info(f"Recommendation store with {len(user_ids)} users written to {store_dir}")
+
+class RecommendationStore:
+    def __init__(self, store_dir, max_age_seconds=86400, check_interval=30):
+        """
+        Read-only view of recommendations precomputed by materialize_recommendations.py
+        
+        Arrays are memory-mapped, so every worker shares one copy through the
+        page cache. The manifest is re-checked at most every check_interval
+        seconds and a rewritten store is picked up without a restart.
+        
+        Args:
+            store_dir: Store directory
+            max_age_seconds: Entries older than this are treated as stale
+            check_interval: Seconds between checks for a rewritten store
+        """
+        self.store_dir = store_dir
+        self.max_age_seconds = max_age_seconds
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._state = None
+        self._manifest_mtime = None
+        self._next_check = 0.0
+    
+    @classmethod
+    def from_env(cls):
+        store_dir = os.getenv('RECOMMENDATION_STORE_DIR')
+        if not store_dir:
+            return None
+        return cls(
+            store_dir,
+            max_age_seconds=float(os.getenv('RECOMMENDATION_STORE_MAX_AGE_SECONDS', 86400))
+        )
+    
+    def _load(self):
+        manifest_path = os.path.join(self.store_dir, 'manifest.json')
+        try:
+            mtime = os.path.getmtime(manifest_path)
+        except OSError:
+            self._state = None
+            self._manifest_mtime = None
+            return
+        if mtime == self._manifest_mtime:
+            return
+        
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('format_version') != STORE_FORMAT_VERSION:
+                logger.error(f"Unsupported recommendation store format version {manifest.get('format_version')}")
+                self._state = None
+                return
+            
+            arrays = {
+                name: np.load(os.path.join(self.store_dir, f'{name}.npy'), mmap_mode='r', allow_pickle=False)
+                for name in ('user_ids', 'recommendations', 'user_rows')
+                if os.path.exists(os.path.join(self.store_dir, f'{name}.npy'))
+            }
+            arrays['created_at'] = datetime.fromisoformat(manifest['created_at']).timestamp()
+            self._state = arrays
+            self._manifest_mtime = mtime
+            logger.info(f"Recommendation store loaded from {self.store_dir} "
+                       f"({manifest['users']} users, created {manifest['created_at']})")
+        
+        except Exception as e:
+            logger.error(f"Error loading recommendation store: {str(e)}")
+            self._state = None
+    
+    def _current_state(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._load()
+                    self._next_check = now + self.check_interval
+        return self._state
+    
+    def get(self, user_id, top_n):
+        """
+        Look up the precomputed attraction IDs of a user
+        
+        Args:
+            user_id: User ID
+            top_n: Number of recommendations wanted
+        
+        Returns:
+            List of attraction IDs, or None if the user is missing, the store
+            holds fewer than top_n per user or the store is stale
+        """
+        state = self._current_state()
+        if state is None:
+            return None
+        
+        recommendations = state['recommendations']
+        if top_n > recommendations.shape[1] or time.time() - state['created_at'] > self.max_age_seconds:
+            return None
+        
+        user_rows = state.get('user_rows')
+        if user_rows is not None:
+            row = int(user_rows[user_id]) if 0 <= user_id < len(user_rows) else -1
+        else:
+            user_ids = state['user_ids']
+            row = int(np.searchsorted(user_ids, user_id))
+            if row >= len(user_ids) or user_ids[row] != user_id:
+                row = -1
+        if row < 0:
+            return None
+        
+        attraction_ids = recommendations[row, :top_n]
+        return attraction_ids[attraction_ids >= 0].tolist()
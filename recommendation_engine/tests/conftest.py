@@ -0,0 +1,46 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# The engine modules are flat scripts, imported the same way the API imports them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_synthetic_data import write_attractions, write_preferences, write_reviews
+from main import TouristAttractionRecommender, find_data_file
+
+NUM_ATTRACTIONS = 200
+NUM_USERS = 1000
+NUM_REVIEWS = 20000
+
+def load_recommender(data_dir, **kwargs):
+    """
+    Load a recommender from the attractions/preferences/reviews files in data_dir
+    
+    Args:
+        data_dir: Directory with the data files
+        kwargs: TouristAttractionRecommender constructor arguments
+    
+    Returns:
+        Loaded TouristAttractionRecommender
+    """
+    recommender = TouristAttractionRecommender(**kwargs)
+    files = [find_data_file(data_dir, name) for name in ('attractions', 'preferences', 'reviews')]
+    assert recommender.load_data_from_files(*files)
+    return recommender
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    # Small dataset from the synthetic generator, fixed seed so results are reproducible
+    directory = tmp_path_factory.mktemp('synthetic')
+    rng = np.random.default_rng(7)
+    quality = write_attractions(str(directory / 'attractions.jsonl'), NUM_ATTRACTIONS, rng)
+    write_preferences(str(directory / 'preferences.jsonl'), NUM_USERS, rng, chunk_size=500)
+    write_reviews(str(directory / 'reviews.jsonl'), NUM_REVIEWS, NUM_USERS, NUM_ATTRACTIONS,
+                  quality, 1.1, rng, chunk_size=10000)
+    return str(directory)
+
+@pytest.fixture(scope='session')
+def recommender(data_dir):
+    # Shared across tests; tests that change data work on a clone
+    return load_recommender(data_dir)
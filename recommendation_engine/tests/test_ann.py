@@ -0,0 +1,38 @@
+import pytest
+from evaluate_ann import recall_at_k, similarity_ratio
+
+K = 10
+
+@pytest.fixture(scope='module')
+def exact_neighbours(recommender):
+    return recommender._top_k_similar_rows(recommender.user_attraction_matrix, K)
+
+# Thresholds sit a little below the measured recall for the fixed seed; each
+# configuration compares every user with at most num_tables * block_size others,
+# so recall must also beat that fraction of users picked at random
+@pytest.mark.parametrize('num_tables, block_size, min_recall', [
+    (2, 64, 0.3),
+    (4, 64, 0.45),
+    (8, 64, 0.6),
+])
+def test_lsh_recall_against_exact_neighbours(recommender, exact_neighbours, num_tables, block_size, min_recall):
+    matrix = recommender.user_attraction_matrix
+    exact_rows, exact_scores = exact_neighbours
+    
+    rows, scores = recommender._lsh_top_k_similar_rows(
+        matrix, K, num_tables=num_tables, num_bits=16, block_size=block_size, seed=42
+    )
+    
+    recall = recall_at_k(rows, scores, exact_rows, exact_scores)
+    assert recall >= min_recall
+    assert recall > num_tables * block_size / matrix.shape[0]
+    assert similarity_ratio(scores, exact_scores) >= 0.85
+
+def test_lsh_recall_grows_with_tables(recommender, exact_neighbours):
+    matrix = recommender.user_attraction_matrix
+    recalls = [
+        recall_at_k(*recommender._lsh_top_k_similar_rows(matrix, K, num_tables=num_tables, block_size=64),
+                    *exact_neighbours)
+        for num_tables in (1, 4, 16)
+    ]
+    assert recalls == sorted(recalls)
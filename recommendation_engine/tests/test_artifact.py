@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from main import TouristAttractionRecommender
+
+USER_IDS = [1, 2, 3, 5, 8, 13, 21, 34, 55, 89]
+
+@pytest.fixture(scope='module')
+def exported(recommender, tmp_path_factory):
+    source = recommender.clone()
+    source.train_als_model(factors=8, iterations=5)
+    artifact_dir = str(tmp_path_factory.mktemp('artifact') / 'model')
+    assert source.export_artifact(artifact_dir)
+    
+    loaded = TouristAttractionRecommender()
+    assert loaded.load_artifact(artifact_dir)
+    return source, loaded, artifact_dir
+
+def is_memory_mapped(array):
+    # scipy and numpy may wrap the mapped array in views
+    while array is not None and not isinstance(array, np.memmap):
+        array = array.base
+    return array is not None
+
+def test_artifact_arrays_are_memory_mapped(exported):
+    _, loaded, _ = exported
+    
+    for array in (loaded.user_attraction_matrix.data, loaded.user_attraction_matrix.indices,
+                  loaded.matrix_user_ids, loaded.user_neighbour_rows, loaded.als_user_factors):
+        assert is_memory_mapped(array)
+
+@pytest.mark.parametrize('method, kwargs', [
+    ('get_hybrid_recommendations', {'top_n': 10}),
+    ('get_content_based_recommendations', {'top_n': 10}),
+    ('get_collaborative_recommendations', {'top_n': 10, 'method': 'user'}),
+    ('get_collaborative_recommendations', {'top_n': 10, 'method': 'item'}),
+    ('get_als_recommendations', {'top_n': 10}),
+])
+def test_loaded_artifact_recommends_like_the_source(exported, method, kwargs):
+    source, loaded, _ = exported
+    results = [getattr(source, method)(user_id, **kwargs) for user_id in USER_IDS]
+    assert any(results)
+    
+    for user_id, expected in zip(USER_IDS, results):
+        assert getattr(loaded, method)(user_id, **kwargs) == expected
+
+def test_loaded_artifact_serves_batches_and_similar_attractions(exported):
+    source, loaded, _ = exported
+    
+    assert loaded.get_batch_recommendations(USER_IDS, top_n=10) == \
+        source.get_batch_recommendations(USER_IDS, top_n=10)
+    for attraction_id in (1, 50, 200):
+        assert loaded.get_similar_attractions(attraction_id) == source.get_similar_attractions(attraction_id)
+
+def test_reexport_replaces_artifact_in_place(exported):
+    source, loaded, artifact_dir = exported
+    
+    # Workers may still hold the previous files mapped while a new export is swapped in
+    assert source.export_artifact(artifact_dir)
+    reloaded = TouristAttractionRecommender()
+    assert reloaded.load_artifact(artifact_dir)
+    assert reloaded.get_hybrid_recommendations(1) == loaded.get_hybrid_recommendations(1)
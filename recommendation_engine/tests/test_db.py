@@ -0,0 +1,83 @@
+import pytest
+from mysql.connector import Error
+from db import ConnectionPool
+
+class FakeConnection:
+    def __init__(self, ping_error=None):
+        self.ping_error = ping_error
+        self.closed = False
+    
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        if self.ping_error is not None:
+            raise self.ping_error
+    
+    def close(self):
+        self.closed = True
+
+class FakePool:
+    def __init__(self, connect_error=None, ping_error=None):
+        self.connect_error = connect_error
+        self.ping_error = ping_error
+        self.connections = []
+    
+    def get_connection(self):
+        if self.connect_error is not None:
+            raise self.connect_error
+        self.connections.append(FakeConnection(self.ping_error))
+        return self.connections[-1]
+
+def make_pool(monkeypatch, pool_size=2, **fake_pool_args):
+    pool = ConnectionPool(pool_size=pool_size, acquire_timeout=0.01)
+    fake_pool = FakePool(**fake_pool_args)
+    monkeypatch.setattr(pool, '_get_pool', lambda: fake_pool)
+    return pool, fake_pool
+
+def free_slots(pool):
+    slots = 0
+    while pool._slots.acquire(blocking=False):
+        slots += 1
+    for _ in range(slots):
+        pool._slots.release()
+    return slots
+
+@pytest.mark.parametrize('pool_size', [0, 33])
+def test_pool_size_is_checked_at_creation(monkeypatch, pool_size):
+    monkeypatch.setenv('DB_POOL_SIZE', str(pool_size))
+    with pytest.raises(ValueError, match='DB_POOL_SIZE'):
+        ConnectionPool.from_env()
+
+def test_closing_a_connection_frees_its_slot(monkeypatch):
+    pool, _ = make_pool(monkeypatch)
+    
+    first, second = pool.get_connection(), pool.get_connection()
+    assert free_slots(pool) == 0
+    assert pool.get_connection() is None
+    
+    first.close()
+    first.close()
+    assert free_slots(pool) == 1
+    second.close()
+    assert free_slots(pool) == 2
+
+@pytest.mark.parametrize('fake_pool_args', [
+    {'connect_error': Error('server gone')},
+    {'ping_error': Error('server gone')},
+])
+def test_mysql_errors_free_the_slot(monkeypatch, fake_pool_args):
+    pool, fake_pool = make_pool(monkeypatch, **fake_pool_args)
+    
+    assert pool.get_connection() is None
+    assert free_slots(pool) == 2
+    assert all(connection.closed for connection in fake_pool.connections)
+
+@pytest.mark.parametrize('fake_pool_args', [
+    {'connect_error': ValueError('pool_size too large')},
+    {'ping_error': KeyboardInterrupt()},
+])
+def test_other_errors_free_the_slot(monkeypatch, fake_pool_args):
+    pool, fake_pool = make_pool(monkeypatch, **fake_pool_args)
+    
+    with pytest.raises((ValueError, KeyboardInterrupt)):
+        pool.get_connection()
+    assert free_slots(pool) == 2
+    assert all(connection.closed for connection in fake_pool.connections)
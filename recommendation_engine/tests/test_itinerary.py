@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from main import TouristAttractionRecommender
+from travel_time import haversine_matrix
+
+def route_length_km(attractions):
+    if len(attractions) < 2:
+        return 0.0
+    distances = haversine_matrix(
+        [attraction['latitude'] for attraction in attractions],
+        [attraction['longitude'] for attraction in attractions]
+    )
+    return float(sum(distances[i, i + 1] for i in range(len(attractions) - 1)))
+
+@pytest.mark.parametrize('day_end', ['21:00', '14:00'])
+@pytest.mark.parametrize('user_id', [1, 2, 3, 5, 8, 13])
+def test_reported_distances_match_scheduled_visits(recommender, user_id, day_end):
+    itinerary = recommender.generate_itinerary(
+        user_id, '2026-01-01', '2026-01-03', optimize_route=True, day_end=day_end
+    )
+    assert itinerary
+    
+    total = 0.0
+    for day in itinerary['days']:
+        assert len(day['attractions']) <= 3
+        distance = route_length_km(day['attractions'])
+        assert day['travel_distance_km'] == pytest.approx(distance, abs=0.01)
+        total += distance
+    assert itinerary['total_travel_distance_km'] == pytest.approx(total, abs=0.05)
+
+@pytest.mark.parametrize('optimize_route', [False, True])
+def test_every_selected_visit_is_scheduled_once_or_listed(recommender, optimize_route):
+    itinerary = recommender.generate_itinerary(
+        1, '2026-01-01', '2026-01-03', optimize_route=optimize_route, day_end='14:00'
+    )
+    
+    scheduled = [
+        attraction['attraction_id'] for day in itinerary['days'] for attraction in day['attractions']
+    ]
+    unscheduled = [attraction['attraction_id'] for attraction in itinerary['unscheduled_attractions']]
+    assert len(set(scheduled)) == len(scheduled)
+    assert not set(scheduled) & set(unscheduled)
+    assert len(scheduled) + len(unscheduled) == 9
+    
+    # The top-ranked attraction always starts a day, so it is never left out
+    top = recommender.get_hybrid_recommendations(1, top_n=1)[0]['id']
+    assert top in scheduled
+
+def nearest_neighbour_length(distances):
+    route = [0]
+    while len(route) < len(distances):
+        candidates = [node for node in range(len(distances)) if node not in route]
+        route.append(min(candidates, key=lambda node: distances[route[-1], node]))
+    return float(sum(distances[route[i], route[i + 1]] for i in range(len(route) - 1)))
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('num_nodes', [3, 8, 25])
+def test_two_opt_never_lengthens_nearest_neighbour_route(seed, num_nodes):
+    rng = np.random.default_rng(seed)
+    distances = haversine_matrix(rng.uniform(-8.8, -8.1, num_nodes), rng.uniform(114.4, 115.7, num_nodes))
+    
+    route, length = TouristAttractionRecommender._optimize_route(distances)
+    
+    assert route[0] == 0
+    assert sorted(route.tolist()) == list(range(num_nodes))
+    assert length == pytest.approx(float(distances[route[:-1], route[1:]].sum()))
+    assert length <= nearest_neighbour_length(distances) + 1e-9
+
+@pytest.mark.parametrize('num_attractions, num_days, attractions_per_day', [
+    (9, 3, 3), (7, 3, 3), (12, 2, 4), (20, 3, 3)
+])
+def test_plan_route_days_respects_the_daily_cap(recommender, num_attractions, num_days, attractions_per_day):
+    rng = np.random.default_rng(num_attractions)
+    coordinates = np.column_stack([rng.uniform(-8.8, -8.1, num_attractions),
+                                   rng.uniform(114.4, 115.7, num_attractions)])
+    attractions = [{'id': rank, 'latitude': lat, 'longitude': lon}
+                   for rank, (lat, lon) in enumerate(coordinates)]
+    
+    day_groups, day_distances = recommender._plan_route_days(
+        attractions, coordinates, num_days, attractions_per_day
+    )
+    
+    assert len(day_groups) == num_days
+    planned = [attraction['id'] for day in day_groups for attraction in day]
+    assert len(set(planned)) == len(planned) == min(num_attractions, num_days * attractions_per_day)
+    for day, distance in zip(day_groups, day_distances):
+        assert len(day) <= attractions_per_day
+        if day:
+            # Each day starts at its highest ranked attraction
+            assert day[0]['id'] == min(attraction['id'] for attraction in day)
+        assert distance == pytest.approx(route_length_km(day))
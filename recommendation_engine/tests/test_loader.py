@@ -0,0 +1,77 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load_recommender
+from main import TouristAttractionRecommender, find_data_file
+
+RECORDS = [
+    {'id': 1, 'name': 'Pura [Besakih], Bali', 'images': ['a.jpg', 'b.jpg'], 'avg_rating': 4.8},
+    {'id': 2, 'name': 'Pantai "Kuta"', 'images': [], 'avg_rating': 4.5, 'tags': {'beach': True}},
+    {'id': 3, 'name': 'Gunung Batur\n', 'images': ['c.jpg'], 'avg_rating': None},
+    {'id': 4, 'name': 'Monumen Nasional ' + 'x' * 100, 'images': [], 'avg_rating': 4.6},
+]
+
+def write_json_array(path, records):
+    with open(path, 'w') as f:
+        f.write('  \n[\n')
+        f.write(',\n'.join('  ' + json.dumps(record) for record in records))
+        f.write('\n]\n')
+
+def write_json_lines(path, records):
+    with open(path, 'w') as f:
+        f.write('\n')
+        for record in records:
+            f.write(json.dumps(record) + '\n\n')
+
+@pytest.mark.parametrize('writer', [write_json_array, write_json_lines])
+@pytest.mark.parametrize('buffer_size', [1, 2, 7, 64, 1 << 20])
+def test_records_split_across_buffers_are_decoded(tmp_path, writer, buffer_size):
+    path = str(tmp_path / 'records.json')
+    writer(path, RECORDS)
+    
+    records = list(TouristAttractionRecommender._iter_json_records(path, buffer_size=buffer_size))
+    
+    assert records == RECORDS
+
+def test_empty_and_truncated_arrays(tmp_path):
+    empty = tmp_path / 'empty.json'
+    empty.write_text(' ' * 50 + '[ ]')
+    assert list(TouristAttractionRecommender._iter_json_records(str(empty), buffer_size=8)) == []
+    
+    truncated = tmp_path / 'truncated.json'
+    truncated.write_text(json.dumps(RECORDS)[:-1])
+    with pytest.raises(ValueError):
+        list(TouristAttractionRecommender._iter_json_records(str(truncated), buffer_size=8))
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 100000])
+def test_read_json_frame_casts_and_concatenates_chunks(tmp_path, chunk_size):
+    path = str(tmp_path / 'records.jsonl')
+    write_json_lines(path, RECORDS)
+    dtypes = {'id': np.int32, 'avg_rating': np.float32}
+    
+    frame = TouristAttractionRecommender()._read_json_frame(path, dtypes=dtypes, chunk_size=chunk_size)
+    
+    expected = pd.DataFrame(RECORDS)[['id', 'avg_rating']].astype(dtypes)
+    pd.testing.assert_frame_equal(frame, expected)
+
+def test_find_data_file_prefers_json_lines(tmp_path):
+    (tmp_path / 'reviews.json').write_text('[]')
+    assert find_data_file(str(tmp_path), 'reviews') == str(tmp_path / 'reviews.json')
+    
+    (tmp_path / 'reviews.jsonl').write_text('')
+    assert find_data_file(str(tmp_path), 'reviews') == str(tmp_path / 'reviews.jsonl')
+    
+    # With neither file present the .json path is returned
+    assert find_data_file(str(tmp_path), 'attractions') == str(tmp_path / 'attractions.json')
+
+def test_json_array_and_json_lines_exports_load_the_same(tmp_path, data_dir, recommender):
+    for name in ('attractions', 'preferences', 'reviews'):
+        with open(find_data_file(data_dir, name)) as f:
+            write_json_array(str(tmp_path / f'{name}.json'), [json.loads(line) for line in f if line.strip()])
+    
+    loaded = load_recommender(str(tmp_path))
+    
+    for attribute in ('attractions_df', 'user_preferences_df', 'reviews_df'):
+        pd.testing.assert_frame_equal(getattr(loaded, attribute), getattr(recommender, attribute))
+    assert (loaded.user_attraction_matrix != recommender.user_attraction_matrix).nnz == 0
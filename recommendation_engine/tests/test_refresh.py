@@ -0,0 +1,131 @@
+import json
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from main import TouristAttractionRecommender
+
+LOADED_AT = datetime(2026, 1, 1, 12, 0, 0)
+CHANGED_AT = datetime(2026, 1, 1, 12, 5, 0)
+
+class FakeCursor:
+    def __init__(self, tables):
+        self.tables = tables
+        self.rows = []
+    
+    def execute(self, query, params=None):
+        columns = [column.strip() for column in re.search(r'SELECT (.*) FROM', query).group(1).split(',')]
+        frame = self.tables[re.search(r'FROM (\w+)', query).group(1)]
+        if params:
+            frame = frame[frame['updated_at'] >= params[0]]
+        self.rows = list(frame[columns].itertuples(index=False, name=None))
+    
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+    
+    def close(self):
+        pass
+
+class FakeConnection:
+    """In-memory stand-in for a MySQL connection, one DataFrame per table"""
+    
+    def __init__(self, tables):
+        self.tables = tables
+    
+    def cursor(self, buffered=True):
+        return FakeCursor(self.tables)
+    
+    def upsert(self, table, rows, key, updated_at):
+        updates = pd.DataFrame(rows).assign(updated_at=updated_at)
+        kept = self.tables[table][~self.tables[table][key].isin(updates[key])]
+        self.tables[table] = pd.concat([kept, updates], ignore_index=True)
+
+@pytest.fixture
+def database(recommender):
+    # The synthetic data as MySQL returns it: JSON columns as strings, every row stamped
+    encode = lambda frame, columns: frame.assign(**{
+        column: frame[column].map(json.dumps) for column in columns
+    }).assign(updated_at=LOADED_AT)
+    return FakeConnection({
+        'tourist_attractions': encode(recommender.attractions_df, ['images']),
+        'user_preferences': encode(recommender.user_preferences_df,
+                                   ['preferred_categories', 'avoided_categories']),
+        'reviews': encode(recommender.reviews_df, []),
+    })
+
+def load_from_db(connection):
+    recommender = TouristAttractionRecommender(db_connection=connection)
+    assert recommender.load_data_from_db()
+    return recommender
+
+def reviews_of(connection, user_id):
+    reviews = connection.tables['reviews']
+    return reviews[reviews['user_id'] == user_id]
+
+def test_refresh_marks_only_changed_users(database):
+    recommender = load_from_db(database)
+    
+    # Changes land in the watermark second, so unchanged rows of that second are re-read too
+    review = reviews_of(database, 1).iloc[0]
+    database.upsert('reviews', [{'id': review['id'], 'user_id': 1,
+                                 'tourist_attraction_id': review['tourist_attraction_id'],
+                                 'rating': 6 - review['rating']}], 'id', LOADED_AT)
+    database.upsert('user_preferences', [{'user_id': 3, 'preferred_categories': '["Alam"]',
+                                          'avoided_categories': '[]'}], 'user_id', LOADED_AT)
+    
+    snapshot = recommender.clone()
+    assert snapshot.refresh_data_from_db()
+    assert snapshot.changed_user_ids == {1, 3}
+    assert snapshot.user_preference_index[3][0] == ['Alam']
+    
+    # Nothing changed since, so a second refresh marks no further users
+    assert snapshot.refresh_data_from_db()
+    assert snapshot.changed_user_ids == {1, 3}
+
+def test_refresh_on_clone_matches_full_reload(database):
+    original = load_from_db(database)
+    original_matrix = original.user_attraction_matrix.copy()
+    original_shape = original_matrix.shape
+    original_recommendations = original.get_hybrid_recommendations(1, top_n=10)
+    
+    # Changed ratings, a new rating by an existing user, and a new user rating a new attraction;
+    # the new IDs are the largest so a full reload puts them in the same positions
+    rated = reviews_of(database, 1)
+    unrated = sorted(set(database.tables['tourist_attractions']['id']) - set(rated['tourist_attraction_id']))
+    next_review_id = int(database.tables['reviews']['id'].max()) + 1
+    new_attraction = dict(original.attraction_records[1], id=1001, name='Pantai Baru', images='[]')
+    new_user = int(original.matrix_user_ids.max()) + 1
+    database.upsert('reviews', [
+        {'id': rated.iloc[0]['id'], 'user_id': 1,
+         'tourist_attraction_id': rated.iloc[0]['tourist_attraction_id'], 'rating': 6 - rated.iloc[0]['rating']},
+        {'id': next_review_id, 'user_id': 1, 'tourist_attraction_id': unrated[0], 'rating': 5},
+        {'id': next_review_id + 1, 'user_id': new_user, 'tourist_attraction_id': 1001, 'rating': 5},
+        {'id': next_review_id + 2, 'user_id': new_user, 'tourist_attraction_id': unrated[1], 'rating': 4},
+    ], 'id', CHANGED_AT)
+    database.upsert('tourist_attractions', [new_attraction], 'id', CHANGED_AT)
+    database.upsert('user_preferences', [{'user_id': new_user, 'preferred_categories': '["Pantai"]',
+                                          'avoided_categories': '[]'}], 'user_id', CHANGED_AT)
+    
+    snapshot = original.clone()
+    assert snapshot.refresh_data_from_db()
+    reloaded = load_from_db(database)
+    
+    assert snapshot.changed_user_ids == {1, new_user}
+    assert snapshot.user_attraction_matrix.shape == (original_shape[0] + 1, original_shape[1] + 1)
+    np.testing.assert_array_equal(snapshot.matrix_user_ids, reloaded.matrix_user_ids)
+    np.testing.assert_array_equal(snapshot.matrix_attraction_ids, reloaded.matrix_attraction_ids)
+    assert (snapshot.user_attraction_matrix != reloaded.user_attraction_matrix).nnz == 0
+    
+    for user_id in (1, new_user):
+        assert snapshot.get_hybrid_recommendations(user_id, top_n=10) == \
+            reloaded.get_hybrid_recommendations(user_id, top_n=10)
+    assert snapshot.get_similar_attractions(1001) == reloaded.get_similar_attractions(1001)
+    
+    # The original snapshot keeps serving the data it was loaded with
+    assert original.user_attraction_matrix.shape == original_shape
+    assert (original.user_attraction_matrix != original_matrix).nnz == 0
+    assert new_user not in original.user_index and 1001 not in original.attraction_records
+    assert original.get_hybrid_recommendations(1, top_n=10) == original_recommendations
+    assert original.changed_user_ids == frozenset()
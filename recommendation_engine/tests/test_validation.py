@@ -0,0 +1,45 @@
+import pytest
+from validation import is_valid_admin_token, parse_batch_request
+
+def test_valid_batch_request():
+    assert parse_batch_request({'user_ids': [1, 2], 'limit': 3}) == ([1, 2], 3, None)
+    assert parse_batch_request({'user_ids': [7]}) == ([7], 5, None)
+
+@pytest.mark.parametrize('data', [
+    None,
+    {},
+    {'user_ids': 1},
+    {'user_ids': [1, '2']},
+    {'user_ids': [True]},
+    {'user_ids': [0]},
+    {'user_ids': [2 ** 40]},
+    {'user_ids': [1], 'limit': '3'},
+    {'user_ids': [1], 'limit': False},
+    {'user_ids': [1], 'limit': 0},
+    {'user_ids': [1], 'limit': 10 ** 6},
+])
+def test_invalid_batch_request(data):
+    user_ids, limit, error = parse_batch_request(data)
+    assert error
+    assert user_ids is None and limit is None
+
+def test_batch_size_limit(monkeypatch):
+    monkeypatch.setenv('MAX_BATCH_SIZE', '2')
+    assert parse_batch_request({'user_ids': [1, 2, 3]})[2]
+
+@pytest.mark.parametrize('admin_token, token, expected', [
+    ('s3cret', 's3cret', True),
+    ('s3cret', 's3cre', False),
+    ('s3cret', 'S3CRET', False),
+    ('s3cret', None, False),
+    ('s3cret', 'sécret', False),
+    ('', '', False),
+    (None, '', False),
+    (None, None, False),
+])
+def test_admin_token(monkeypatch, admin_token, token, expected):
+    if admin_token is None:
+        monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    else:
+        monkeypatch.setenv('ADMIN_TOKEN', admin_token)
+    assert is_valid_admin_token(token) is expected
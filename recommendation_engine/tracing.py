@@ -0,0 +1,57 @@
+import contextvars
+import time
+from collections import OrderedDict
+
+# Stage timings of the current request, or None when it is not being traced
+_current_trace = contextvars.ContextVar('stage_trace', default=None)
+
+def start_trace():
+    """
+    Start collecting stage timings for the current request or task
+    
+    Returns:
+        Token to pass to finish_trace
+    """
+    return _current_trace.set({'start': time.perf_counter(), 'stages': []})
+
+def is_tracing():
+    return _current_trace.get() is not None
+
+def record_stage(stage, seconds):
+    """
+    Stage observer that appends to the current trace, if any
+    
+    Args:
+        stage: Stage name
+        seconds: Time spent in the stage
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace['stages'].append((stage, seconds))
+
+def finish_trace(token):
+    """
+    Stop tracing and summarize the collected timings
+    
+    Args:
+        token: Token returned by start_trace
+    
+    Returns:
+        Dictionary with the total time, each stage in call order and per-stage totals
+    """
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is None:
+        return None
+    return summarize(trace['stages'], time.perf_counter() - trace['start'])
+
+def summarize(stages, total_seconds):
+    totals = OrderedDict()
+    for stage, seconds in stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    
+    return {
+        'total_ms': round(total_seconds * 1000, 3),
+        'stages': [{'stage': stage, 'ms': round(seconds * 1000, 3)} for stage, seconds in stages],
+        'stage_totals_ms': {stage: round(seconds * 1000, 3) for stage, seconds in totals.items()}
+    }
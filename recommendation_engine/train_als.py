@@ -0,0 +1,44 @@
+import argparse
+import logging
+import os
+from api import build_snapshot
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the ALS recommendation model offline')
+    parser.add_argument('--data-dir', default=os.getenv('DATA_DIR', 'data'),
+                        help='Directory with attractions/preferences/reviews files, used when the database is unavailable')
+    parser.add_argument('--output', default=os.getenv('ALS_MODEL_PATH', 'data/als_model.npz'),
+                        help='Destination .npz file for the trained factors')
+    parser.add_argument('--factors', type=int, default=int(os.getenv('ALS_FACTORS', 32)),
+                        help='Number of latent factors')
+    parser.add_argument('--regularization', type=float, default=0.1,
+                        help='L2 regularization strength')
+    parser.add_argument('--iterations', type=int, default=15,
+                        help='Number of ALS iterations')
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    
+    # Load from the database or JSON/JSON Lines files exactly like the API does, never from an old artifact
+    os.environ['DATA_DIR'] = args.data_dir
+    recommender = build_snapshot(use_artifact=False)
+    if recommender is None:
+        raise SystemExit("Failed to load training data")
+    
+    if not recommender.train_als_model(
+        factors=args.factors,
+        regularization=args.regularization,
+        iterations=args.iterations
+    ):
+        raise SystemExit("Failed to train ALS model")
+    
+    if not recommender.save_als_model(args.output):
+        raise SystemExit("Failed to save ALS model")
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.request import urlopen
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Mean Earth radius used for haversine distances
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_matrix(latitudes, longitudes):
+    """
+    Compute pairwise great-circle distances in kilometres
+    
+    Args:
+        latitudes: Array of latitudes in degrees
+        longitudes: Array of longitudes in degrees
+    
+    Returns:
+        Symmetric (n, n) distance matrix
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def estimate_travel_seconds(latitudes, longitudes, speed_kmh, detour_factor=1.3):
+    """
+    Estimate pairwise travel times from great-circle distance
+    
+    Args:
+        latitudes: Array of latitudes in degrees
+        longitudes: Array of longitudes in degrees
+        speed_kmh: Average travel speed
+        detour_factor: Ratio of road distance to straight-line distance
+    
+    Returns:
+        (n, n) matrix of travel times in seconds
+    """
+    return haversine_matrix(latitudes, longitudes) * detour_factor / speed_kmh * 3600
+
+class TravelTimeCache:
+    def __init__(self, cache_path, osrm_url=None, profile='driving', speed_kmh=30,
+                 request_timeout=10, table_size=100):
+        """
+        Persistent pairwise travel-time cache between attractions
+        
+        Travel times are stored in SQLite keyed by (from, to) attraction ID and
+        bulk-filled from an OSRM-compatible /table endpoint ahead of time.
+        Lookups never call OSRM; misses fall back to a haversine x speed estimate.
+        
+        Args:
+            cache_path: SQLite file holding the cached travel times
+            osrm_url: Base URL of the OSRM server used by fill() (optional)
+            profile: OSRM routing profile
+            speed_kmh: Average speed of the haversine fallback
+            request_timeout: Seconds to wait for an OSRM response
+            table_size: Maximum number of sources and of destinations per /table request
+        """
+        self.cache_path = cache_path
+        self.osrm_url = osrm_url.rstrip('/') if osrm_url else None
+        self.profile = profile
+        self.speed_kmh = speed_kmh
+        self.request_timeout = request_timeout
+        self.table_size = table_size
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS travel_times ("
+            "from_id INTEGER NOT NULL, to_id INTEGER NOT NULL, profile TEXT NOT NULL, "
+            "seconds REAL NOT NULL, PRIMARY KEY (profile, from_id, to_id)) WITHOUT ROWID"
+        )
+        self._connection.commit()
+    
+    @classmethod
+    def from_env(cls):
+        cache_path = os.getenv('TRAVEL_TIME_CACHE_PATH')
+        if not cache_path:
+            return None
+        return cls(
+            cache_path,
+            osrm_url=os.getenv('OSRM_API_URL'),
+            profile=os.getenv('OSRM_PROFILE', 'driving'),
+            speed_kmh=float(os.getenv('TRAVEL_SPEED_KMH', 30)),
+            request_timeout=float(os.getenv('OSRM_TIMEOUT_SECONDS', 10))
+        )
+    
+    def get_matrix(self, attraction_ids, latitudes, longitudes):
+        """
+        Look up pairwise travel times, estimating the ones not in the cache
+        
+        Args:
+            attraction_ids: Attraction IDs
+            latitudes: Latitudes aligned with attraction_ids
+            longitudes: Longitudes aligned with attraction_ids
+        
+        Returns:
+            Tuple of ((n, n) travel times in seconds, number of cache hits)
+        """
+        attraction_ids = [int(attraction_id) for attraction_id in attraction_ids]
+        matrix = estimate_travel_seconds(latitudes, longitudes, self.speed_kmh)
+        np.fill_diagonal(matrix, 0)
+        if len(attraction_ids) < 2:
+            return matrix, 0
+        
+        position = {attraction_id: i for i, attraction_id in enumerate(attraction_ids)}
+        placeholders = ','.join('?' * len(attraction_ids))
+        try:
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT from_id, to_id, seconds FROM travel_times WHERE profile = ? "
+                    f"AND from_id IN ({placeholders}) AND to_id IN ({placeholders})",
+                    [self.profile] + attraction_ids + attraction_ids
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading travel time cache: {str(e)}")
+            return matrix, 0
+        
+        hits = 0
+        for from_id, to_id, seconds in rows:
+            if from_id != to_id:
+                matrix[position[from_id], position[to_id]] = seconds
+                hits += 1
+        return matrix, hits
+    
+    def _request_table(self, coordinates, sources, destinations):
+        locations = ';'.join(f"{lon:.6f},{lat:.6f}" for lat, lon in coordinates)
+        url = (
+            f"{self.osrm_url}/table/v1/{self.profile}/{locations}"
+            f"?sources={';'.join(map(str, sources))}"
+            f"&destinations={';'.join(map(str, destinations))}"
+            f"&annotations=duration"
+        )
+        with urlopen(url, timeout=self.request_timeout) as response:
+            payload = json.loads(response.read().decode('utf-8'))
+        if payload.get('code') != 'Ok':
+            raise ValueError(f"OSRM returned {payload.get('code')}: {payload.get('message')}")
+        return payload['durations']
+    
+    def fill(self, attraction_ids, latitudes, longitudes, refresh=False):
+        """
+        Bulk-fill the cache from the OSRM /table endpoint
+        
+        Pairs are requested in table_size x table_size tiles; tiles whose pairs
+        are all cached already are skipped unless refresh is set.
+        
+        Args:
+            attraction_ids: Attraction IDs
+            latitudes: Latitudes aligned with attraction_ids
+            longitudes: Longitudes aligned with attraction_ids
+            refresh: Re-request pairs that are already cached
+        
+        Returns:
+            Number of pairs stored
+        """
+        if not self.osrm_url:
+            logger.error("OSRM URL is not configured")
+            return 0
+        
+        attraction_ids = [int(attraction_id) for attraction_id in attraction_ids]
+        coordinates = list(zip(latitudes, longitudes))
+        blocks = [
+            range(start, min(start + self.table_size, len(attraction_ids)))
+            for start in range(0, len(attraction_ids), self.table_size)
+        ]
+        
+        stored = 0
+        start_time = time.perf_counter()
+        for source_block in blocks:
+            for destination_block in blocks:
+                source_ids = [attraction_ids[i] for i in source_block]
+                destination_ids = [attraction_ids[i] for i in destination_block]
+                if not refresh and self._is_cached(source_ids, destination_ids):
+                    continue
+                
+                # Each tile only sends the coordinates it needs
+                tile = list(source_block) + [i for i in destination_block if i not in source_block]
+                tile_position = {index: i for i, index in enumerate(tile)}
+                try:
+                    durations = self._request_table(
+                        [coordinates[i] for i in tile],
+                        [tile_position[i] for i in source_block],
+                        [tile_position[i] for i in destination_block]
+                    )
+                except Exception as e:
+                    logger.error(f"Error requesting OSRM travel times: {str(e)}")
+                    continue
+                
+                rows = [
+                    (from_id, to_id, self.profile, float(seconds))
+                    for from_id, row in zip(source_ids, durations)
+                    for to_id, seconds in zip(destination_ids, row)
+                    if seconds is not None and from_id != to_id
+                ]
+                with self._lock:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO travel_times (from_id, to_id, profile, seconds) "
+                        "VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                    self._connection.commit()
+                stored += len(rows)
+        
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"Stored {stored} travel times for {len(attraction_ids)} attractions "
+                    f"in {elapsed:.1f}s")
+        return stored
+    
+    def _is_cached(self, source_ids, destination_ids):
+        expected = len(source_ids) * len(destination_ids) - len(set(source_ids) & set(destination_ids))
+        with self._lock:
+            (count,) = self._connection.execute(
+                f"SELECT COUNT(*) FROM travel_times WHERE profile = ? "
+                f"AND from_id IN ({','.join('?' * len(source_ids))}) "
+                f"AND to_id IN ({','.join('?' * len(destination_ids))})",
+                [self.profile] + source_ids + destination_ids
+            ).fetchone()
+        return count >= expected
+    
+    def close(self):
+        with self._lock:
+            self._connection.close()
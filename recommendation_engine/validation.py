@@ -0,0 +1,60 @@
+import hmac
+import os
+
+# IDs are stored as 32-bit integers in the rating matrix and the precomputed store
+MAX_ID = 2 ** 31 - 1
+
+def is_int_in_range(value, minimum, maximum):
+    # bool is a subclass of int, so JSON true/false must be rejected explicitly
+    return isinstance(value, int) and not isinstance(value, bool) and minimum <= value <= maximum
+
+def parse_batch_request(data):
+    """
+    Validate the body of a batch recommendations request
+    
+    Shared by the Flask and ASGI apps so both reject the same bodies.
+    
+    Args:
+        data: Decoded JSON body
+    
+    Returns:
+        Tuple of (user IDs, limit, error message); the error message is None
+        when the body is valid
+    """
+    if not isinstance(data, dict) or 'user_ids' not in data:
+        return None, None, 'Field user_ids is required'
+    
+    user_ids = data['user_ids']
+    limit = data.get('limit', 5)
+    max_batch_size = int(os.getenv('MAX_BATCH_SIZE', 10000))
+    max_limit = int(os.getenv('MAX_RECOMMENDATION_LIMIT', 100))
+    
+    if not isinstance(user_ids, list) or not all(is_int_in_range(user_id, 1, MAX_ID) for user_id in user_ids):
+        return None, None, 'Field user_ids must be a list of positive integers'
+    
+    if len(user_ids) > max_batch_size:
+        return None, None, f'At most {max_batch_size} user IDs are allowed per request'
+    
+    if not is_int_in_range(limit, 1, max_limit):
+        return None, None, f'Field limit must be an integer between 1 and {max_limit}'
+    
+    return user_ids, limit, None
+
+def is_valid_admin_token(token):
+    """
+    Check a request's admin token against ADMIN_TOKEN
+    
+    Admin endpoints are disabled while ADMIN_TOKEN is unset or empty. The
+    comparison takes constant time so the token cannot be guessed from
+    response timings.
+    
+    Args:
+        token: Value of the X-Admin-Token header, or None
+    
+    Returns:
+        True if the token matches ADMIN_TOKEN, False otherwise
+    """
+    admin_token = os.getenv('ADMIN_TOKEN')
+    if not admin_token or token is None:
+        return False
+    return hmac.compare_digest(token.encode('utf-8'), admin_token.encode('utf-8'))